@@ -1,7 +1,35 @@
 """ APIs useful functions."""
+import base64
+import binascii
+import codecs
+import csv
+import io
+import json
+import re
 from datetime import datetime, timedelta, timezone
+from bson import json_util
+from flask import Response, stream_with_context
+from flask_smorest import abort
+from flask_smorest.pagination import PaginationMixin
 from marshmallow import post_load, post_dump, Schema, validates_schema, ValidationError
-from marshmallow.fields import DateTime, Date
+from marshmallow.fields import Bool, DateTime, Date, Field, Int, Str
+from marshmallow.validate import OneOf, Range
+
+from backend.model.read_model import fetch
+
+# Response header carrying the cursor of the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Request body mimetypes read as newline delimited JSON
+NDJSON_MIMETYPES = ["application/x-ndjson", "application/jsonlines"]
+
+WHITESPACE = re.compile(r"\s*")
+# longest JSON token end, "false" or an escaped surrogate pair, reported as an
+# error when split between two chunks
+PARTIAL_TOKEN_SIZE = 12
+
+# Export formats and their mimetypes
+EXPORT_MIMETYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
 
 
 class DateRangeQuerySchema(Schema):
@@ -81,3 +109,348 @@ class DatetimeRangeQuerySchema(Schema):
         if data and "start" in data and "end" in data and data["start"] > data["end"]:
             raise ValidationError("The start datetime must be before the end datetime.")
 
+
+def schema_projection(schema) -> list:
+    """Return the document fields dumped by a response schema.
+
+    Used with QuerySet.only() to fetch and hydrate only what the response needs.
+    """
+    if isinstance(schema, type):
+        schema = schema()
+    return [
+        field.attribute or name
+        for name, field in schema.fields.items()
+        if not field.load_only
+    ]
+
+
+def etag_data(items: list, headers: dict = None) -> dict:
+    """Return the data identifying the version of the response items.
+
+    Used to compute the response ETag from the documents ids and versions,
+    without dumping the items.
+    """
+    return {
+        "items": [[str(item["id"]), item["version"]] for item in items],
+        "headers": headers or {},
+    }
+
+
+def encode_cursor(values: list) -> str:
+    """ Encode the sort key values of the last returned item in an opaque token."""
+    return base64.urlsafe_b64encode(json_util.dumps(values).encode()).decode()
+
+
+def decode_cursor(token: str) -> list:
+    """Decode a token built with encode_cursor.
+
+    The values are sort key values, not documents or lists: they could be
+    taken for query operators.
+    """
+    try:
+        values = json_util.loads(base64.urlsafe_b64decode(token.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError) as error:
+        raise ValidationError("Invalid cursor.") from error
+    if not isinstance(values, list) or any(
+        isinstance(value, (dict, list)) for value in values
+    ):
+        raise ValidationError("Invalid cursor.")
+    return values
+
+
+def check_cursor(values: list, types: list) -> list:
+    """Return the values of a decoded cursor, abort with a 422 if they do not
+    have the types of the sort keys, in order.
+
+    The values are used in raw queries, they must be checked before.
+    """
+    if len(values) != len(types) or not all(
+        isinstance(value, value_type) and not isinstance(value, bool)
+        for value, value_type in zip(values, types)
+    ):
+        abort(422, errors={"query": {"after": ["Invalid cursor."]}})
+    return values
+
+
+class Cursor(Field):
+    """ Opaque pagination cursor field."""
+
+    def _serialize(self, value, attr, obj, **kwargs):
+        if value is None:
+            return None
+        return encode_cursor(value)
+
+    def _deserialize(self, value, attr, data, **kwargs):
+        if not isinstance(value, str):
+            raise ValidationError("Invalid cursor.")
+        return decode_cursor(value)
+
+
+class KeysetPaginationQuerySchema(Schema):
+    """Basic marshmallow schema to handle pagination query parameters.
+
+    Supports the classic page/page_size pagination and a keyset pagination,
+    used when the cursor of the previous page is provided in `after`.
+    """
+
+    page = Int(missing=1, validate=Range(min=1), description="The page number")
+    page_size = Int(
+        missing=10, validate=Range(min=1, max=100), description="The page size"
+    )
+    after = Cursor(
+        description="The cursor returned in the {} header of the previous page".format(
+            NEXT_CURSOR_HEADER
+        ),
+    )
+    count = Bool(
+        missing=True,
+        description="If false, skip the total count (always skipped with a cursor)",
+        example=False,
+    )
+
+
+def pagination_headers(page: int, page_size: int, item_count: int) -> dict:
+    """ Return the headers holding the pagination metadata of a page."""
+    # pylint: disable=protected-access
+    metadata = PaginationMixin._make_pagination_metadata(page, page_size, item_count)
+    return {PaginationMixin.PAGINATION_HEADER_FIELD_NAME: json.dumps(metadata)}
+
+
+def keyset_filter(sort_fields: list, values: list) -> dict:
+    """Build the raw query selecting the items sorted after the given values.
+
+    The fields prefixed with "-" are sorted in descending order.
+    """
+    fields = [field.lstrip("-") for field in sort_fields]
+    clauses = []
+    for i, field in enumerate(sort_fields):
+        clause = {prev: value for prev, value in zip(fields[:i], values)}
+        clause[fields[i]] = {"$lt" if field.startswith("-") else "$gt": values[i]}
+        clauses.append(clause)
+
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+
+def paginate_keyset(queryset, args: dict, sort_keys: list, sort_name: str = None):
+    """Paginate a queryset sorted on unique keys.
+
+    sort_keys is the list of (document field, item attribute, value type)
+    triples to sort on, the last one must be unique (typically
+    ("_id", "id", ObjectId)). The attributes prefixed with "-" are sorted in
+    descending order. When the queryset has several sorts, sort_name is stored
+    in the cursors, which are rejected by the other sorts.
+
+    Returns the page items and the response headers holding the pagination
+    metadata and the cursor of the next page.
+    """
+    page_size = args["page_size"]
+    headers = {}
+
+    queryset = queryset.order_by(*[attribute for _, attribute, _ in sort_keys])
+
+    cursor_prefix = [] if sort_name is None else [sort_name]
+
+    if "after" in args:
+        after = check_cursor(
+            args["after"],
+            [str] * len(cursor_prefix) + [value_type for _, _, value_type in sort_keys],
+        )
+        if after[: len(cursor_prefix)] != cursor_prefix:
+            abort(422, errors={"query": {"after": ["Invalid cursor."]}})
+        queryset = queryset.filter(
+            __raw__=keyset_filter(
+                [
+                    "-" + field if attribute.startswith("-") else field
+                    for field, attribute, _ in sort_keys
+                ],
+                after[len(cursor_prefix) :],
+            )
+        )
+    else:
+        if args["count"]:
+            headers.update(
+                pagination_headers(args["page"], page_size, queryset.count())
+            )
+        queryset = queryset.skip((args["page"] - 1) * page_size)
+
+    # fetch one more item to know if there is a next page
+    items = fetch(queryset.limit(page_size + 1))
+    if len(items) > page_size:
+        items = items[:page_size]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(
+            cursor_prefix
+            + [items[-1][attribute.lstrip("-")] for _, attribute, _ in sort_keys]
+        )
+
+    return items, headers
+
+
+def iter_ndjson(stream):
+    """Iterate over the records of a newline delimited JSON stream.
+
+    Yields (record, error) pairs, error being set for the invalid JSON lines.
+    The blank lines are skipped, they are not records.
+    """
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line), None
+        except UnicodeDecodeError:
+            yield None, "Invalid UTF-8 at line {}.".format(line_number)
+        except json.JSONDecodeError as error:
+            yield None, "{} at line {} column {}.".format(
+                error.msg, line_number, error.colno
+            )
+
+
+def iter_json_array(stream, chunk_size: int = 65536, max_item_size: int = 1048576):
+    """Iterate over the items of a JSON array stream, without loading it.
+
+    Yields (record, error) pairs. The stream is not read any further after a
+    JSON syntax error, which is yielded last: only the chunks holding the
+    invalid item are read. The items longer than max_item_size characters are
+    errors.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    # offset is the number of characters read before the buffer
+    buffer, position, offset, eof = "", 0, 0, False
+    # next expected token: "[", first item or "]", item, "," or "]"
+    expected = "["
+
+    def read():
+        nonlocal buffer, position, offset, eof
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        offset += position
+        buffer = buffer[position:] + text_decoder.decode(chunk, final=eof)
+        position = 0
+
+    while True:
+        position = WHITESPACE.match(buffer, position).end()
+        if position == len(buffer):
+            if eof:
+                yield None, "Unexpected end of JSON array."
+                return
+            read()
+            continue
+
+        char = buffer[position]
+        if expected == "[":
+            if char != "[":
+                yield None, "Expected a JSON array."
+                return
+            position += 1
+            expected = "first"
+        elif expected in ("first", ",") and char == "]":
+            return
+        elif expected == ",":
+            if char != ",":
+                yield None, "Expected ',' or ']' in JSON array."
+                return
+            position += 1
+            expected = "item"
+        else:
+            try:
+                record, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError as error:
+                # the item may continue in the next chunk
+                if not eof and (
+                    error.msg.startswith("Unterminated string")
+                    or len(buffer) - error.pos <= PARTIAL_TOKEN_SIZE
+                ):
+                    if len(buffer) - position > max_item_size:
+                        yield None, "JSON array item longer than {} characters.".format(
+                            max_item_size
+                        )
+                        return
+                    read()
+                    continue
+                yield None, "{} at character {}.".format(error.msg, offset + error.pos)
+                return
+            # a number may continue in the next chunk
+            if not eof and end == len(buffer):
+                read()
+                continue
+            yield record, None
+            position = end
+            expected = ","
+
+
+def iter_json_records(request, chunk_size: int = 65536):
+    """Iterate over the records of a request body, read as a stream.
+
+    The body is either newline delimited JSON or a JSON array.
+    Yields (record, error) pairs, error being set for invalid JSON.
+    """
+    if request.mimetype in NDJSON_MIMETYPES:
+        return iter_ndjson(request.stream)
+    return iter_json_array(request.stream, chunk_size)
+
+
+class ExportQuerySchema(Schema):
+    """ Basic marshmallow schema to handle the export format query parameter."""
+
+    format = Str(
+        missing="ndjson",
+        validate=OneOf(list(EXPORT_MIMETYPES)),
+        description="The export format (ndjson or csv)",
+        example="csv",
+    )
+
+
+def iter_ndjson_rows(items, schema):
+    """ Yield the items dumped by the schema as newline delimited JSON."""
+    for item in items:
+        yield json.dumps(schema.dump(item)) + "\n"
+
+
+def iter_csv_rows(items, schema):
+    """Yield the items dumped by the schema as CSV rows, after a header row.
+
+    The lists and nested objects are written as JSON in their cell.
+    """
+    columns = [
+        field.data_key or name
+        for name, field in schema.fields.items()
+        if not field.load_only
+    ]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def row(values):
+        writer.writerow(values)
+        line = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return line
+
+    yield row(columns)
+    for item in items:
+        data = schema.dump(item)
+        yield row(
+            [
+                json.dumps(value) if isinstance(value, (dict, list)) else value
+                for value in (data.get(column) for column in columns)
+            ]
+        )
+
+
+def export_response(items, schema, export_format: str, filename: str) -> Response:
+    """Stream the items dumped by the schema in the export format.
+
+    The items are dumped while the response is sent, an items generator reading
+    a database cursor keeps the memory used constant.
+    """
+    rows = iter_csv_rows if export_format == "csv" else iter_ndjson_rows
+    return Response(
+        stream_with_context(rows(items, schema)),
+        mimetype=EXPORT_MIMETYPES[export_format],
+        headers={
+            "Content-Disposition": 'attachment; filename="{}.{}"'.format(
+                filename, export_format
+            )
+        },
+    )
@@ -1,9 +1,19 @@
 """ App initialization module."""
 import os
+import sys
 from flask import Flask
-from backend import config, exercise, training
-from backend.extension import api, socketio, mongo, jwt
+from backend import config, exercise, logs, monitoring, schedule, training
+from backend.extension import (
+    api,
+    socketio,
+    mongo,
+    jwt,
+    exercise_cache,
+    metrics,
+    pool_monitor,
+)
 from backend.config import Struct
+from backend.openapi import spec_json
 
 
 def create_app(configs: Struct = None):
@@ -18,6 +28,7 @@ def create_app(configs: Struct = None):
         configs = config.load_config_as_object(additional_config_files=configs)
 
     app.config.from_object(configs)
+    logs.configure_logging(app.config)
 
     register_extensions(app)
     register_blueprints(app)
@@ -32,12 +43,32 @@ def register_extensions(app):
     jwt.init_app(app)
     app.logger.debug("jwt.init_app successfully processed.")
 
+    # connect on the first query, in the worker process and its greenlets, not
+    # when the app is created
+    app.config["MONGODB_SETTINGS"].setdefault("connect", False)
+    # listen to the MongoClient pool events
+    pool_monitor.init_app(app)
+    # time the requests and count their MongoDB commands
+    metrics.init_app(app)
     mongo.init_app(app)
     app.logger.debug("mongo.init_app successfully processed.")
 
-    socketio.init_app(app)
+    # async mode selected from the installed packages (gevent in production)
+    # unless configured
+    # the Socket.IO and Engine.IO events are only logged in development
+    verbose = app.config.get("LOGGING_PROFILE", logs.DEVELOPMENT) != logs.PRODUCTION
+    socketio.init_app(
+        app,
+        async_mode=app.config.get("SOCKETIO_ASYNC_MODE"),
+        message_queue=app.config.get("SOCKETIO_MESSAGE_QUEUE"),
+        logger=verbose,
+        engineio_logger=verbose,
+    )
     app.logger.debug("socketio.init_app successfully processed.")
 
+    exercise_cache.init_app(app)
+    app.logger.debug("exercise_cache.init_app successfully processed.")
+
 
 def register_blueprints(app):
     """ Store App APIs blueprints."""
@@ -60,6 +91,24 @@ def register_blueprints(app):
     # register bluprints
     api.register_blueprint(exercise.blueprint.bp)
     api.register_blueprint(training.blueprint.bp)
+    api.register_blueprint(schedule.blueprint.bp)
+    api.register_blueprint(monitoring.blueprint.bp)
+
+
+def generate_openapi(output_file: str = None):
+    """Write the OpenAPI spec to a file, by default the command line argument
+    or openapi.json. The file can be served as OPENAPI_SPEC_FILE.
+    """
+    if output_file is None:
+        output_file = sys.argv[1] if len(sys.argv) > 1 else "openapi.json"
+
+    configs = config.load_config_as_object(additional_config_files=os.getenv("CONFIG"))
+    # build the spec from the views
+    configs.OPENAPI_SPEC_FILE = None
+    create_app(configs)
+
+    with open(output_file, "w") as outfile:
+        outfile.write(spec_json(api.spec))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,181 @@
+"""Process-local cache of the exercises catalogue.
+
+The processes share a version of the cache in MongoDB, incremented by the
+writes invalidating it, to drop the entries invalidated by the other workers.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from bson import json_util
+from bson.objectid import ObjectId
+
+from backend.model.data_model import CacheVersion, Exercise
+from backend.model.read_model import to_read_model
+
+logger = logging.getLogger(__name__)
+
+# cache regions
+EXERCISE = "exercise"
+QUERY = "query"
+
+
+class ExerciseCache:
+    """LRU cache of the exercises read models and of the exercises list results.
+
+    The writes made through the exercises API invalidate the cache, in all the
+    processes: the shared version is read at most every sync_interval seconds,
+    and the entries are dropped when it changed. Entries also expire after a
+    TTL, as a safety net for the writes made outside the API.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 300, sync_interval=1):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.sync_interval = sync_interval
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # shared version of the entries, None if unknown
+        self._version = None
+        # monotonic time of the next shared version read
+        self._next_sync = 0
+
+    def init_app(self, app):
+        """ Configure the cache from the app configuration and empty it."""
+        self.max_size = app.config.get("EXERCISE_CACHE_MAX_SIZE", self.max_size)
+        self.ttl = app.config.get("EXERCISE_CACHE_TTL", self.ttl)
+        self.sync_interval = app.config.get(
+            "EXERCISE_CACHE_SYNC_INTERVAL", self.sync_interval
+        )
+        self.clear()
+
+    def _sync(self):
+        """Drop the entries if the shared version changed since they were cached.
+
+        The version is not read before the first sync_interval: the entries
+        cached until then are dropped by the first read.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next_sync:
+                return
+            self._next_sync = now + self.sync_interval
+
+        raw = (
+            CacheVersion.objects(name=EXERCISE)  # pylint: disable=no-member
+            .only("version")
+            .as_pymongo()
+            .first()
+        )
+        version = raw["version"] if raw else 0
+        with self._lock:
+            if version != self._version:
+                logger.debug("Exercises cache version %s, entries dropped", version)
+                self._entries.clear()
+                self._version = version
+
+    def _get(self, key):
+        """ Return the value cached for the key, or None, and count hit or miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def _set(self, key, value):
+        """ Cache the value, evicting the least recently used entries."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get_many(self, exercise_ids) -> dict:
+        """Return the read models of the exercises by id.
+
+        The exercises missing in the cache are fetched with a single query.
+        Unknown ids are not in the returned dict.
+        """
+        self._sync()
+        exercises = {}
+        missing_ids = []
+        for exercise_id in exercise_ids:
+            exercise = self._get((EXERCISE, exercise_id))
+            if exercise is None:
+                missing_ids.append(exercise_id)
+            else:
+                exercises[exercise_id] = exercise
+
+        if missing_ids:
+            logger.debug("Fetch %d exercises missing in cache", len(missing_ids))
+            for raw in Exercise.objects(  # pylint: disable=no-member
+                id__in=[ObjectId(exercise_id) for exercise_id in missing_ids]
+            ).as_pymongo():
+                exercise = to_read_model(Exercise, raw)
+                exercises[str(exercise["id"])] = exercise
+                self._set((EXERCISE, str(exercise["id"])), exercise)
+
+        return exercises
+
+    def get(self, exercise_id: str):
+        """ Return the read model of an exercise, or None if it does not exist."""
+        return self.get_many([exercise_id]).get(exercise_id)
+
+    def get_query(self, args: dict, loader):
+        """ Return the cached result of a list query, or load and cache it."""
+        self._sync()
+        key = (QUERY, json_util.dumps(args, sort_keys=True))
+        result = self._get(key)
+        if result is None:
+            result = loader()
+            self._set(key, result)
+        return result
+
+    def invalidate(self, exercise_id: str = None):
+        """Drop an exercise, if specified, and all the cached list results.
+
+        The shared version is incremented, the other processes drop their
+        entries on their next sync.
+        """
+        version = (
+            CacheVersion.objects(name=EXERCISE)  # pylint: disable=no-member
+            .modify(upsert=True, new=True, inc__version=1)
+            .version
+        )
+        with self._lock:
+            self._entries.pop((EXERCISE, exercise_id), None)
+            for key in [key for key in self._entries if key[0] == QUERY]:
+                del self._entries[key]
+            # the entries are up to date unless another process wrote meanwhile
+            if self._version == version - 1:
+                self._version = version
+
+    def clear(self):
+        """ Empty the cache and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+            self._next_sync = time.monotonic() + self.sync_interval
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        """ Return the cache counters."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+            }
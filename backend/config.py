@@ -1,17 +1,36 @@
 """ Configuration loading for YAML files."""
 import os
 import re
-from typing import Iterable
+from copy import deepcopy
+from functools import lru_cache
+from typing import Iterable, Tuple
 import logging
 from logging.config import dictConfig
-from confuse import Configuration
+from confuse import ConfigSource, Configuration
+from confuse.yaml_util import load_yaml_string
 
-INDEX_MERGED_YAML = 0
+DEFAULT_CONFIG_FILE = os.path.join(os.path.dirname(__file__), "default_config.yml")
+
+# number of resolved configurations kept in cache
+CONFIG_CACHE_SIZE = 16
 
 # Adapt for new environment variable links
 dic_env_var = {
     # database settings
-    "MONGODB_SETTINGS": {"host": "MONGO_URI"},
+    "MONGODB_SETTINGS": {
+        "host": "MONGO_URI",
+        # connection pool
+        "maxPoolSize": "MONGO_MAX_POOL_SIZE",
+        "minPoolSize": "MONGO_MIN_POOL_SIZE",
+        "maxIdleTimeMS": "MONGO_MAX_IDLE_TIME_MS",
+        "waitQueueTimeoutMS": "MONGO_WAIT_QUEUE_TIMEOUT_MS",
+        # timeouts
+        "connectTimeoutMS": "MONGO_CONNECT_TIMEOUT_MS",
+        "socketTimeoutMS": "MONGO_SOCKET_TIMEOUT_MS",
+        "serverSelectionTimeoutMS": "MONGO_SERVER_SELECTION_TIMEOUT_MS",
+        # wire protocol compression (e.g. "zstd,snappy,zlib")
+        "compressors": "MONGO_COMPRESSORS",
+    },
 }
 
 ### Adapt to make fields merging available
@@ -73,21 +92,23 @@ def fill_dict_env(entry):
     )
 
 
-def merge_files(files):
-    """ Merge fiels with references."""
-    global INDEX_MERGED_YAML
+def merge_files(files: Iterable[str]) -> str:
+    """ Merge files with references, in memory."""
+    contents = []
+    for names in files:
+        with open(names) as infile:
+            contents.append(infile.read())
+    return "\n\n".join(contents)
 
-    if len(files) == 1:
-        return files[0]
-    merge_file = "merged_yaml_{}.yml".format(INDEX_MERGED_YAML)
-    INDEX_MERGED_YAML += 1
 
-    with open(merge_file, "w+") as outfile:
-        for names in files:
-            with open(names) as infile:
-                outfile.write(infile.read())
-            outfile.write("\n\n")
-    return merge_file
+def split_config_files(additional_config_files: str) -> list:
+    """Split a files list: files are separated by ',', files merged with
+    references are joined by '|'.
+    """
+    return [
+        re.split(r" *\| *", files)
+        for files in re.split(" *, *", additional_config_files)
+    ]
 
 
 def flatten(list_items: list):
@@ -102,10 +123,11 @@ def flatten(list_items: list):
 
 
 def load_config(
-    additional_config_files: Iterable[str] = None, additional_config_dict: dict = None
+    additional_config_files: Iterable = None, additional_config_dict: dict = None
 ):
     """
     Load configuration from multiple YAML files and dictionaries.
+    Each additional file can be a list of files merged with references.
     Override priority (highest in the list overrides others fields):
     - Dictionaries (from last to first)
     - Files (from last to first)
@@ -113,14 +135,22 @@ def load_config(
     """
 
     cfg = Configuration("backend", read=False)
-    module_dir = os.path.dirname(__file__)
-
-    cfg.set_file(os.path.join(module_dir, "default_config.yml"))
+    cfg.set_file(DEFAULT_CONFIG_FILE)
 
     if additional_config_files:
         for config in additional_config_files:
-            if os.path.getsize(config) != 0:
-                cfg.set_file(config)
+            if isinstance(config, str):
+                if os.path.getsize(config) != 0:
+                    cfg.set_file(config)
+                continue
+            content = merge_files(config)
+            if content.strip():
+                cfg.set(
+                    ConfigSource(
+                        load_yaml_string(content, " | ".join(config), cfg.loader),
+                        " | ".join(config),
+                    )
+                )
 
     if additional_config_dict:
         cfg.set_args(additional_config_dict)
@@ -132,37 +162,67 @@ def load_config(
     return cfg
 
 
+def env_var_names(entry) -> list:
+    """ Return the names of the environment variables of dic_env_var."""
+    if isinstance(entry, str):
+        return [entry]
+    return [name for value in entry.values() for name in env_var_names(value)]
+
+
+def files_key(files: Iterable[str]) -> Tuple[tuple, ...]:
+    """ Return the paths and modification times of files, as a cache key."""
+    return tuple((path, os.stat(path).st_mtime_ns) for path in files)
+
+
+@lru_cache(maxsize=CONFIG_CACHE_SIZE)
+def load_cached_config(
+    config_files: tuple, default_config: tuple, env_vars: tuple
+) -> dict:
+    """Load the configuration of groups of files merged with references.
+
+    Cached by the files paths and modification times, default_config.yml
+    included, and by the environment variables values, which are only given as
+    keys.
+    """
+    cfg = load_config([[path for path, _ in files] for files in config_files] or None)
+    logger.debug(
+        "Loaded configuration with env vars: %s",
+        [name for name, value in env_vars if value is not None],
+    )
+    # the dictionaries are merged across the sources, keys by keys
+    return cfg.flatten()
+
+
 def load_config_as_object(
     additional_config_files: str = None, additional_config_dict: dict = None
 ):
-    """ Load configuration from YAML files and dictionaries to object."""
-    global INDEX_MERGED_YAML
+    """Load configuration from YAML files and dictionaries to object.
+
+    The configurations without dictionaries are cached, the worker forks and
+    the tests reuse them until the files are modified.
+    """
     logger.debug(
         "Found configuration: Files:'%s', Dicts: %s.",
         additional_config_files,
         additional_config_dict,
     )
     if additional_config_files is not None:
-
-        additional_config_files_cleaned = re.split(" *, *", additional_config_files)
-
+        additional_config_files_cleaned = split_config_files(additional_config_files)
         logger.debug("Config files parsed as : %s", additional_config_files_cleaned)
-        for i in range(  # pylint: disable=consider-using-enumerate
-            len(additional_config_files_cleaned)
-        ):
-            additional_config_files_cleaned[i] = merge_files(
-                re.split(r" *\| *", additional_config_files_cleaned[i])
-            )
     else:
-        additional_config_files_cleaned = None
-
-    cfg = load_config(additional_config_files_cleaned, additional_config_dict)
-    for i in range(INDEX_MERGED_YAML):
-        os.remove("merged_yaml_{}.yml".format(i))
-    INDEX_MERGED_YAML = 0
-    res_cfg = {}
-    for key in cfg:
-        res_cfg[key] = cfg[key].get()
-    logger.debug("Cleaned temporary YAML files and merging keys.")
+        additional_config_files_cleaned = []
+
+    if additional_config_dict:
+        res_cfg = load_config(
+            additional_config_files_cleaned, additional_config_dict
+        ).flatten()
+    else:
+        res_cfg = load_cached_config(
+            tuple(files_key(files) for files in additional_config_files_cleaned),
+            files_key([DEFAULT_CONFIG_FILE]),
+            tuple((name, os.getenv(name)) for name in env_var_names(dic_env_var)),
+        )
+
     logger.debug("Loaded successfully configuration.")
-    return Struct(**res_cfg)
+    # the app modifies its configuration, the cached one is copied
+    return Struct(**deepcopy(res_cfg))
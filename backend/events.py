@@ -0,0 +1,160 @@
+"""Real-time change events, pushed to the Socket.IO clients.
+
+Clients connect to the WS_NAMESPACE namespace and subscribe to the trainings
+of a category, or to the exercises. The API broadcasts a compact event to the
+subscribers on each change, instead of being polled.
+"""
+import logging
+
+from flask_socketio import Namespace, join_room, leave_room
+from marshmallow import Schema, ValidationError, validates_schema
+from marshmallow.fields import Bool, Str
+
+from backend.extension import socketio
+
+logger = logging.getLogger(__name__)
+
+# Socket.IO namespace of the change events
+WS_NAMESPACE = "/ws/v1"
+
+# events names
+TRAINING_EVENT = "training"
+TRAINING_SERIES_EVENT = "training_series"
+EXERCISE_EVENT = "exercise"
+
+# changes actions
+CREATED = "created"
+MODIFIED = "modified"
+DELETED = "deleted"
+IMPORTED = "imported"
+
+# room of the exercises subscribers
+EXERCISES_ROOM = "exercises"
+
+
+def category_room(category: str) -> str:
+    """ Return the room of the subscribers to the trainings of a category."""
+    return "category/{}".format(category)
+
+
+class SubscriptionSchema(Schema):
+    """ Schema for the subscribe and unsubscribe events data."""
+
+    # Training category
+    category = Str(description="The training category", example="18U")
+    # exercises changes
+    exercises = Bool(description="If true, the exercises changes", example=True)
+
+    @validates_schema
+    def validate_subscription(  # pylint: disable=no-self-use,unused-argument
+        self, data, **kwargs
+    ):
+        """ Check a category or the exercises are specified."""
+        if "category" not in data and not data.get("exercises"):
+            raise ValidationError("A category or the exercises must be specified.")
+
+
+def subscription_rooms(data) -> list:
+    """ Return the rooms of a subscription, raise ValidationError if invalid."""
+    subscription = SubscriptionSchema().load(data or {})
+    rooms = []
+    if "category" in subscription:
+        rooms.append(category_room(subscription["category"]))
+    if subscription.get("exercises"):
+        rooms.append(EXERCISES_ROOM)
+    return rooms
+
+
+class ChangesNamespace(Namespace):
+    """ Namespace of the change events subscriptions."""
+
+    def on_subscribe(self, data):  # pylint: disable=no-self-use
+        """Join the rooms of a subscription.
+
+        Returns the joined rooms, or the validation errors, as acknowledgement.
+        """
+        try:
+            rooms = subscription_rooms(data)
+        except ValidationError as error:
+            return {"errors": error.messages}
+
+        for room in rooms:
+            join_room(room)
+        logger.debug("Subscribed to %s", rooms)
+        return {"rooms": rooms}
+
+    def on_unsubscribe(self, data):  # pylint: disable=no-self-use
+        """ Leave the rooms of a subscription."""
+        try:
+            rooms = subscription_rooms(data)
+        except ValidationError as error:
+            return {"errors": error.messages}
+
+        for room in rooms:
+            leave_room(room)
+        logger.debug("Unsubscribed from %s", rooms)
+        return {"rooms": rooms}
+
+
+socketio.on_namespace(ChangesNamespace(WS_NAMESPACE))
+
+
+def notify_training(action: str, training, categories=()):
+    """Broadcast a training change to its category subscribers.
+
+    The subscribers of the other categories given, typically the category of
+    a training before its modification, are notified too.
+    """
+    event = {
+        "action": action,
+        "id": str(training["id"]),
+        "category": training["category"],
+        "date_time": training["date_time"].isoformat(),
+        "version": training["version"],
+    }
+    for category in sorted({training["category"], *categories}):
+        socketio.emit(
+            TRAINING_EVENT, event, namespace=WS_NAMESPACE, room=category_room(category)
+        )
+
+
+def notify_training_series(action: str, training_series, categories=()):
+    """ Broadcast a training series change to its category subscribers."""
+    event = {
+        "action": action,
+        "id": str(training_series["id"]),
+        "category": training_series["category"],
+        "version": training_series["version"],
+    }
+    for category in sorted({training_series["category"], *categories}):
+        socketio.emit(
+            TRAINING_SERIES_EVENT,
+            event,
+            namespace=WS_NAMESPACE,
+            room=category_room(category),
+        )
+
+
+def notify_exercise(action: str, exercise):
+    """ Broadcast an exercise change to the exercises subscribers."""
+    socketio.emit(
+        EXERCISE_EVENT,
+        {
+            "action": action,
+            "id": str(exercise["id"]),
+            "section": exercise["section"],
+            "version": exercise["version"],
+        },
+        namespace=WS_NAMESPACE,
+        room=EXERCISES_ROOM,
+    )
+
+
+def notify_exercises_import(inserted: int):
+    """ Broadcast an exercises bulk import to the exercises subscribers."""
+    socketio.emit(
+        EXERCISE_EVENT,
+        {"action": IMPORTED, "inserted": inserted},
+        namespace=WS_NAMESPACE,
+        room=EXERCISES_ROOM,
+    )
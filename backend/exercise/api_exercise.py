@@ -4,25 +4,51 @@ import logging
 from datetime import datetime
 from bson.objectid import ObjectId
 
-from flask_smorest import Page
 from flask.views import MethodView
 from flask_jwt_extended import jwt_required
-from flask import Response
-from marshmallow import Schema
-from marshmallow.fields import Str, Int
+from flask import Response, current_app, request
+from flask_smorest import abort
+from marshmallow import Schema, ValidationError, validates_schema
+from marshmallow.fields import Dict, Float, Str, Int, List, Nested
+from marshmallow.validate import Length, OneOf, Range
+from pymongo.errors import BulkWriteError
 
 from .blueprint import bp
 from backend.model.data_model import Exercise
+from backend.model.read_model import to_read_model
+from backend.events import (
+    CREATED,
+    DELETED,
+    notify_exercise,
+    notify_exercises_import,
+)
+from backend.extension import exercise_cache
+from backend.apihelpers import (
+    EXPORT_MIMETYPES,
+    NEXT_CURSOR_HEADER,
+    ExportQuerySchema,
+    KeysetPaginationQuerySchema,
+    check_cursor,
+    encode_cursor,
+    etag_data,
+    export_response,
+    iter_json_records,
+    paginate_keyset,
+    pagination_headers,
+)
 
 logger = logging.getLogger(__name__)
 
-
-class CursorPage(Page):
-    """ Page management."""
-
-    @property
-    def item_count(self):
-        return self.collection.count()
+# exercises list sorts: (document field, item attribute, value type) keys of
+# the keyset pagination, the id keeps the order unique and follows the
+# direction of the sort, so that the indexes are scanned forward or backward
+EXERCISE_SORTS = {
+    "id": [("_id", "id", ObjectId)],
+    "dificulty": [("dificulty", "dificulty", int), ("_id", "id", ObjectId)],
+    "-dificulty": [("dificulty", "-dificulty", int), ("_id", "-id", ObjectId)],
+    "duration": [("duration", "duration", int), ("_id", "id", ObjectId)],
+    "-duration": [("duration", "-duration", int), ("_id", "-id", ObjectId)],
+}
 
 
 class ExerciseArgsSchema(Schema):
@@ -61,17 +87,170 @@ class ExerciseSchema(ExerciseArgsSchema):
     _id = Str(required=True, data_key="id", attribute="id")
 
 
-class ExerciseListArgsSchema(Schema):
+class ExerciseListArgsSchema(KeysetPaginationQuerySchema):
     """ Query schema for exercises list API."""
 
     # exercise section
     section = Str(description="The training section", example="infield")
+    # minimum exercise dificulty
+    dificulty_min = Int(
+        validate=Range(min=0, max=5),
+        description="The minimum exercise dificulty (0-5)",
+        example=2,
+    )
+    # maximum exercise dificulty
+    dificulty_max = Int(
+        validate=Range(min=0, max=5),
+        description="The maximum exercise dificulty (0-5)",
+        example=4,
+    )
+    # minimum exercise duration
+    duration_min = Int(
+        validate=Range(min=0),
+        description="The minimum exercise duration in minutes",
+        example=10,
+    )
+    # maximum exercise duration
+    duration_max = Int(
+        validate=Range(min=0),
+        description="The maximum exercise duration in minutes",
+        example=30,
+    )
+    # exercises order
+    sort = Str(
+        missing="id",
+        validate=OneOf(list(EXERCISE_SORTS)),
+        description="The exercises order, descending if prefixed with -",
+        example="-dificulty",
+    )
+
+    @validates_schema
+    def validate_ranges(  # pylint: disable=no-self-use,unused-argument
+        self, data, **kwargs
+    ):
+        """ Check the minimums do not exceed the maximums."""
+        for field in ("dificulty", "duration"):
+            minimum = data.get(field + "_min")
+            maximum = data.get(field + "_max")
+            if minimum is not None and maximum is not None and minimum > maximum:
+                raise ValidationError(
+                    "{0}_min must not exceed {0}_max.".format(field), field + "_min"
+                )
+
+
+class ExerciseSearchArgsSchema(KeysetPaginationQuerySchema):
+    """ Query schema for exercises search API."""
+
+    # searched words
+    q = Str(
+        required=True,
+        validate=Length(min=1, max=200),
+        description="The searched words, in the exercises names and descriptions",
+        example="backhand rolling",
+    )
+    # exercise section
+    section = Str(description="The training section", example="infield")
+
+
+class ExerciseSearchResultSchema(ExerciseSchema):
+    """ Schema for an exercises search result."""
+
+    # text search relevance
+    score = Float(description="The text search score", example=6.25)
+
+
+class ExerciseExportArgsSchema(ExportQuerySchema):
+    """ Query schema for exercises export API."""
+
+    # exercise section
+    section = Str(description="The training section", example="infield")
+
+
+class ExerciseImportErrorSchema(Schema):
+    """ Schema for an exercise import error."""
+
+    # index of the record in the request body: array item or non-blank NDJSON
+    # line, from 0
+    index = Int(
+        required=True,
+        description="The record index: array item or non-blank NDJSON line, from 0",
+        example=3,
+    )
+    # validation or insertion errors
+    errors = Dict(
+        required=True,
+        description="The exercise errors",
+        example={"dificulty": ["Missing data for required field."]},
+    )
+
+
+class ExerciseImportResultSchema(Schema):
+    """ Schema for an exercises import result."""
+
+    # number of inserted exercises
+    inserted = Int(required=True, description="Inserted exercises", example=998)
+    # errors of the exercises not inserted
+    errors = List(Nested(ExerciseImportErrorSchema), required=True)
+
+
+def new_exercise(data: dict) -> Exercise:
+    """ Build a new exercise document from loaded ExerciseArgsSchema data."""
+    return Exercise(
+        name=data["name"],
+        section=data["section"],
+        dificulty=data["dificulty"],
+        duration=data["duration"],
+        description=data["description"],
+        creation_date=datetime.now().date(),
+        video=data["video"],
+    )
+
+
+def insert_exercises(batch: list, errors: list) -> int:
+    """Insert a batch of (index, exercise) with a single query.
+
+    The exercises failing to be inserted are added to the errors, the others are
+    still inserted. Returns the number of inserted exercises.
+    """
+    collection = Exercise._get_collection()  # pylint: disable=protected-access
+    try:
+        result = collection.insert_many(
+            [exercise.to_mongo() for _, exercise in batch], ordered=False
+        )
+        return len(result.inserted_ids)
+    except BulkWriteError as error:
+        for write_error in error.details["writeErrors"]:
+            errors.append(
+                {
+                    "index": batch[write_error["index"]][0],
+                    "errors": {"_schema": [write_error["errmsg"]]},
+                }
+            )
+        return error.details["nInserted"]
+
+
+def filter_exercises(args: dict):
+    """ Return the queryset of the exercises selected by the list arguments."""
+    query = {}
+
+    if "section" in args:
+        logger.debug("section=%s", args["section"])
+        query["section"] = args["section"]
+
+    for field in ("dificulty", "duration"):
+        if field + "_min" in args:
+            query[field + "__gte"] = args[field + "_min"]
+        if field + "_max" in args:
+            query[field + "__lte"] = args[field + "_max"]
+
+    return Exercise.objects(**query)  # pylint: disable=no-member
 
 
 @bp.route("")
 class ExercisesList(MethodView):
     """ API to list exercises """
 
+    @bp.etag
     @bp.arguments(
         ExerciseListArgsSchema, location="query",
     )
@@ -80,23 +259,119 @@ class ExercisesList(MethodView):
     )  # pylint: disable=no-self-use
     @bp.doc(security=[{"bearerAuth": []}], responses={401: "UNAUTHORIZED"})
     # TODO: authentification
-    @bp.paginate(CursorPage)
     # @jwt_required
     def get(self, args):
         """List all exercises
         Select all the exercises.
         If section specified, select the exercises from the section.
+        If dificulty or duration bounds specified, select the exercises in the
+        bounds.
+        Pages are selected with page/page_size, or with the cursor returned in
+        the X-Next-Cursor header of the previous page.
         """
         logger.debug("get exercise list ")
-        query = {}
-
-        if "section" in args:
-            logger.debug("section=%s", args["section"])
-            query["section"] = args["section"]
+        exercises = filter_exercises(args)
+
+        # keyset pagination served by the _id and (dificulty, _id),
+        # (duration, _id) indexes, or their (section, ...) prefixed versions
+        # when a section is selected, the cursors hold their sort
+        items, headers = exercise_cache.get_query(
+            args,
+            lambda: paginate_keyset(
+                exercises, args, EXERCISE_SORTS[args["sort"]], args["sort"]
+            ),
+        )
+        bp.set_etag(etag_data(items, headers))
+
+        return items, headers
+
+
+def search_exercises(args: dict):
+    """Return the page of exercises matching the searched words, sorted by text
+    score and id, and the pagination headers.
+
+    The score is only known by the aggregation pipeline, so the pages after a
+    cursor are selected after the score is computed.
+    """
+    page_size = args["page_size"]
+    headers = {}
+    collection = Exercise._get_collection()  # pylint: disable=protected-access
+
+    # served by the name and description text index
+    match = {"$text": {"$search": args["q"]}}
+    if "section" in args:
+        match["section"] = args["section"]
+
+    pipeline = [
+        {"$match": match},
+        {"$addFields": {"score": {"$meta": "textScore"}}},
+    ]
+    if "after" in args:
+        after_score, after_id = check_cursor(args["after"], [(float, int), ObjectId])
+        pipeline.append(
+            {
+                "$match": {
+                    "$or": [
+                        {"score": {"$lt": after_score}},
+                        {"score": after_score, "_id": {"$gt": after_id}},
+                    ]
+                }
+            }
+        )
+        skip = 0
+    else:
+        if args["count"]:
+            headers.update(
+                pagination_headers(
+                    args["page"], page_size, collection.count_documents(match)
+                )
+            )
+        skip = (args["page"] - 1) * page_size
+
+    pipeline.append({"$sort": {"score": -1, "_id": 1}})
+    if skip:
+        pipeline.append({"$skip": skip})
+    # fetch one more item to know if there is a next page
+    pipeline.append({"$limit": page_size + 1})
+
+    items = [to_read_model(Exercise, raw) for raw in collection.aggregate(pipeline)]
+    if len(items) > page_size:
+        items = items[:page_size]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(
+            [items[-1]["score"], items[-1]["id"]]
+        )
+
+    return items, headers
+
+
+@bp.route("/search")
+class ExercisesSearch(MethodView):
+    @bp.etag
+    @bp.arguments(
+        ExerciseSearchArgsSchema, location="query",
+    )
+    @bp.response(
+        ExerciseSearchResultSchema(many=True),
+        description="The exercises matching the searched words, most relevant first",
+    )  # pylint: disable=no-self-use
+    @bp.doc(security=[{"bearerAuth": []}], responses={401: "UNAUTHORIZED"})
+    # TODO: authentification
+    # @jwt_required
+    def get(self, args):
+        """Search exercises
+        Full-text search of the words in the exercises names and descriptions,
+        ranked by relevance, from a section if specified.
+        Pages are selected with page/page_size, or with the cursor returned in
+        the X-Next-Cursor header of the previous page.
+        """
+        logger.debug("Search exercises, args: %s", args)
 
-        exercises = Exercise.objects(**query)  # pylint: disable=no-member
+        items, headers = exercise_cache.get_query(
+            dict(args, search=True), lambda: search_exercises(args)
+        )
+        bp.set_etag(etag_data(items, headers))
 
-        return exercises
+        return items, headers
 
 
 @bp.route(
@@ -113,6 +388,7 @@ class ExercisesList(MethodView):
 class SingleExercise(MethodView):
     """ API to get/remove an exercise """
 
+    @bp.etag
     @bp.response(ExerciseSchema)  # pylint: disable=no-self-use
     @bp.doc(security=[{"bearerAuth": []}], responses={401: "UNAUTHORIZED"})
     # TODO: authentification
@@ -122,11 +398,12 @@ class SingleExercise(MethodView):
 
         logger.debug("Get exercise with id=%s", exercise_id)
 
-        exercises = Exercise.objects.get_or_404(
-            id=ObjectId(exercise_id)
-        )  # pylint: disable=no-member
+        exercise = exercise_cache.get(exercise_id)
+        if exercise is None:
+            abort(404)
+        bp.set_etag(etag_data([exercise]))
 
-        return exercises
+        return exercise
 
     @bp.doc(security=[{"bearerAuth": []}], responses={401: "UNAUTHORIZED"})
     # TODO: authentification
@@ -136,9 +413,12 @@ class SingleExercise(MethodView):
 
         logger.debug("Delete exercise with id=%s", exercise_id)
 
-        Exercise.objects.get_or_404(
+        exercise = Exercise.objects.get_or_404(  # pylint: disable=no-member
             id=ObjectId(exercise_id)
-        ).delete()  # pylint: disable=no-member
+        )
+        exercise.delete()
+        exercise_cache.invalidate(exercise_id)
+        notify_exercise(DELETED, exercise)
 
         return Response(status=200)
 
@@ -159,17 +439,119 @@ class Exercises(MethodView):
     def put(self, put_data):
         """Create a new  exercise,return exercise in json"""
 
-        logger.debug("Create a new exercise, data:")
-        logger.debug(str(put_data))
+        logger.debug("Create a new exercise, data: %s", put_data)
 
-        exercise = Exercise(
-            name=put_data["name"],
-            section=put_data["section"],
-            dificulty=put_data["dificulty"],
-            duration=put_data["duration"],
-            description=put_data["description"],
-            creation_date=datetime.now().date(),
-            video=put_data["video"],
-        ).save()
+        exercise = new_exercise(put_data).save()
+        exercise_cache.invalidate(str(exercise.id))
+        notify_exercise(CREATED, exercise)
 
         return exercise
+
+
+@bp.route("/import")
+class ExercisesImport(MethodView):
+    """ API to import exercises in bulk """
+
+    @bp.response(
+        ExerciseImportResultSchema, description="The import result in json",
+    )  # pylint: disable=no-self-use
+    @bp.doc(
+        security=[{"bearerAuth": []}],
+        responses={401: "UNAUTHORIZED"},
+        requestBody={
+            "description": "The exercises, as a JSON array or newline delimited JSON",
+            "content": {
+                "application/json": {"schema": ExerciseArgsSchema(many=True)},
+                "application/x-ndjson": {"schema": ExerciseArgsSchema},
+            },
+        },
+    )
+    # TODO: authentification
+    # @jwt_required
+    def post(self):
+        """Import exercises in bulk
+        The request body is read as a stream, each exercise is validated and the
+        valid ones are inserted by batches. The invalid exercises are reported
+        with their record index in the request body, the JSON syntax errors
+        give the NDJSON line or the array character. The array is not read
+        after a JSON syntax error.
+        """
+        batch_size = current_app.config["EXERCISE_IMPORT_BATCH_SIZE"]
+        logger.debug("Import exercises, batch size=%d", batch_size)
+
+        schema = ExerciseArgsSchema()
+        inserted = 0
+        errors = []
+        batch = []
+        for index, (record, error) in enumerate(iter_json_records(request)):
+            if error is None:
+                try:
+                    batch.append((index, new_exercise(schema.load(record))))
+                except ValidationError as validation_error:
+                    errors.append({"index": index, "errors": validation_error.messages})
+            else:
+                errors.append({"index": index, "errors": {"_schema": [error]}})
+
+            if len(batch) >= batch_size:
+                inserted += insert_exercises(batch, errors)
+                batch = []
+
+        if batch:
+            inserted += insert_exercises(batch, errors)
+        exercise_cache.invalidate()
+        if inserted:
+            notify_exercises_import(inserted)
+
+        logger.debug("Imported %d exercises, %d errors", inserted, len(errors))
+        errors.sort(key=lambda error: error["index"])
+        return {"inserted": inserted, "errors": errors}
+
+
+@bp.route("/export")
+class ExercisesExport(MethodView):
+    """ API to export exercises """
+
+    @bp.arguments(
+        ExerciseExportArgsSchema, location="query",
+    )
+    @bp.doc(
+        security=[{"bearerAuth": []}],
+        responses={
+            200: {
+                "description": "The exercises, as newline delimited JSON or CSV",
+                "content": {
+                    EXPORT_MIMETYPES["ndjson"]: {"schema": ExerciseSchema},
+                    EXPORT_MIMETYPES["csv"]: {"schema": {"type": "string"}},
+                },
+            },
+            401: "UNAUTHORIZED",
+        },
+    )
+    # TODO: authentification
+    # @jwt_required
+    def get(self, args):  # pylint: disable=no-self-use
+        """Export the exercises
+        The exercises, from a section if specified, are streamed while they are
+        read from the database.
+        """
+        logger.debug("Export exercises, args: %s", args)
+        query = {}
+
+        if "section" in args:
+            query["section"] = args["section"]
+
+        # served by the _id and (section, _id) indexes, read by batches
+        exercises = (
+            Exercise.objects(**query)  # pylint: disable=no-member
+            .order_by("id")
+            .no_cache()
+            .batch_size(current_app.config["EXPORT_BATCH_SIZE"])
+            .as_pymongo()
+        )
+
+        return export_response(
+            (to_read_model(Exercise, raw) for raw in exercises),
+            ExerciseSchema(),
+            args["format"],
+            "exercises",
+        )
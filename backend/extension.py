@@ -2,10 +2,17 @@
 Each extension is initialized in the app factory located in app.py."""
 from flask_jwt_extended import JWTManager
 from flask_mongoengine import MongoEngine
-from flask_smorest import Api
 from flask_socketio import SocketIO
 
+from backend.cache import ExerciseCache
+from backend.metrics import Metrics
+from backend.openapi import Api
+from backend.pool_monitor import PoolMonitor
+
 jwt = JWTManager()
 mongo = MongoEngine()
 api = Api()
-socketio = SocketIO(logger=True, engineio_logger=True)
\ No newline at end of file
+socketio = SocketIO()
+exercise_cache = ExerciseCache()
+pool_monitor = PoolMonitor()
+metrics = Metrics(pool_monitor, exercise_cache)
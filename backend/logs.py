@@ -0,0 +1,151 @@
+""" Logging profiles.
+
+The development profile is the logging configuration of backend.config. The
+production profile serializes and writes JSON lines from a background OS
+thread, also under gevent monkey-patching: the request threads (or greenlets)
+only merge the messages and put the records in a queue.
+"""
+import atexit
+import copy
+import importlib
+import json
+import logging
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+try:
+    from gevent import monkey
+except ImportError:  # pragma: no cover
+    monkey = None
+
+DEVELOPMENT = "development"
+PRODUCTION = "production"
+
+# loggers silenced by the production profile
+QUIET_LOGGERS = ["socketio", "engineio", "werkzeug", "boto3"]
+
+# listener of the production profile queue
+_listener = None
+
+# formatter of the exceptions of the queued records
+_exception_formatter = logging.Formatter()
+
+
+def _original(module: str, name: str):
+    """ The standard library object, not its gevent monkey-patch."""
+    if monkey is not None:
+        return monkey.get_original(module, name)
+    return getattr(importlib.import_module(module), name)
+
+
+class JsonFormatter(logging.Formatter):
+    """ Format the records as JSON lines."""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "process": record.process,
+            "thread": record.threadName,
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, default=str)
+
+
+class LogQueueHandler(QueueHandler):
+    """Queue handler leaving the JSON serialization to the listener thread.
+
+    The message is merged with its arguments, and the exception formatted,
+    before the record is queued: the request goes on modifying the objects
+    passed to the logging call.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class LogQueueListener(QueueListener):
+    """Queue listener running in an OS thread, not a greenlet, under gevent
+    monkey-patching: the writes cannot block the worker event loop.
+    """
+
+    def __init__(self, log_queue, *handlers, respect_handler_level=False):
+        super().__init__(
+            log_queue, *handlers, respect_handler_level=respect_handler_level
+        )
+        # the handlers locks are only used by the listener thread
+        for handler in self.handlers:
+            handler.lock = _original("_thread", "RLock")()
+        self._stopped = None
+
+    def start(self):
+        self._stopped = _original("_thread", "allocate_lock")()
+        self._stopped.acquire()
+        _original("_thread", "start_new_thread")(self._run, ())
+
+    def _run(self):
+        try:
+            self._monitor()
+        finally:
+            self._stopped.release()
+
+    def stop(self):
+        if self._stopped is not None:
+            self.enqueue_sentinel()
+            self._stopped.acquire()
+            self._stopped = None
+
+
+def stop_listener():
+    """ Write the queued records and stop the production listener."""
+    global _listener  # pylint: disable=global-statement
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def configure_logging(config, stream=None):
+    """Apply the LOGGING_PROFILE of the app configuration.
+
+    The production profile logs the backend at LOG_LEVEL, the other loggers at
+    WARNING, and turns off the Socket.IO and Engine.IO chatter.
+    """
+    if config.get("LOGGING_PROFILE", DEVELOPMENT) != PRODUCTION:
+        return
+
+    global _listener  # pylint: disable=global-statement
+    stop_listener()
+
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(JsonFormatter())
+    log_queue = _original("queue", "SimpleQueue")()
+    _listener = LogQueueListener(log_queue, handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for root_handler in list(root.handlers):
+        root.removeHandler(root_handler)
+    root.addHandler(LogQueueHandler(log_queue))
+    root.setLevel(logging.WARNING)
+
+    logging.getLogger("backend").setLevel(config.get("LOG_LEVEL") or logging.INFO)
+    for name in QUIET_LOGGERS:
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    _listener.start()
+
+
+atexit.register(stop_listener)
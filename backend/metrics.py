@@ -0,0 +1,274 @@
+""" Prometheus metrics of the API requests and of their MongoDB commands.
+
+The metrics are collected in the process memory and exposed in the Prometheus
+text format. Each gunicorn worker exposes its own metrics.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+
+from flask import current_app, g, has_request_context, request
+from pymongo.monitoring import CommandListener
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# requests durations buckets, in seconds
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# MongoDB commands per request buckets
+COMMANDS_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# metrics help and type, in exposition order
+METRICS = {
+    "http_requests_total": ("Number of HTTP requests.", "counter"),
+    "http_request_duration_seconds": ("HTTP requests durations.", "histogram"),
+    "http_request_mongodb_commands": (
+        "Number of MongoDB commands per HTTP request.",
+        "histogram",
+    ),
+    "mongodb_commands_total": ("Number of MongoDB commands.", "counter"),
+    "mongodb_command_failures_total": ("Number of failed MongoDB commands.", "counter"),
+    "mongodb_command_duration_seconds_total": (
+        "Total duration of the MongoDB commands.",
+        "counter",
+    ),
+    "mongodb_pool_connections": ("Open pooled connections.", "gauge"),
+    "mongodb_pool_checked_out": ("Checked out pooled connections.", "gauge"),
+    "mongodb_pool_max_checked_out": (
+        "Maximum checked out pooled connections.",
+        "gauge",
+    ),
+    "mongodb_pool_check_outs_total": ("Number of connections check outs.", "counter"),
+    "mongodb_pool_timeouts_total": ("Number of check outs timeouts.", "counter"),
+    "exercise_cache_hits_total": ("Number of exercises cache hits.", "counter"),
+    "exercise_cache_misses_total": ("Number of exercises cache misses.", "counter"),
+    "exercise_cache_entries": ("Number of exercises cache entries.", "gauge"),
+}
+
+# pool metrics of the PoolMonitor stats
+POOL_METRICS = {
+    "mongodb_pool_connections": "connections",
+    "mongodb_pool_checked_out": "checked_out",
+    "mongodb_pool_max_checked_out": "max_checked_out",
+    "mongodb_pool_check_outs_total": "check_outs",
+    "mongodb_pool_timeouts_total": "timeouts",
+}
+
+# cache metrics of the ExerciseCache stats
+CACHE_METRICS = {
+    "exercise_cache_hits_total": "hits",
+    "exercise_cache_misses_total": "misses",
+    "exercise_cache_entries": "size",
+}
+
+
+def escape(value) -> str:
+    """ Escape a label value."""
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def format_labels(labels: tuple) -> str:
+    """ Return the labels of a sample, from (name, value) pairs."""
+    if not labels:
+        return ""
+    return "{{{}}}".format(
+        ",".join('{}="{}"'.format(name, escape(value)) for name, value in labels)
+    )
+
+
+def format_value(value) -> str:
+    """ Return a sample value."""
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def request_labels() -> tuple:
+    """Return the blueprint and route labels of the current request.
+
+    The route is the URL rule, not the URL, to bound the number of series.
+    """
+    if not has_request_context():
+        return (("blueprint", ""), ("route", ""))
+    rule = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    return (("blueprint", request.blueprint or ""), ("route", rule))
+
+
+class Metrics(CommandListener):
+    """Metrics extension.
+
+    Times the requests with before and teardown request hooks, counts their
+    MongoDB commands as a command listener of the app MongoClient, and serves
+    the metrics, with the connection pool and exercises cache ones, on
+    METRICS_PATH.
+    """
+
+    def __init__(self, pool_monitor=None, cache=None):
+        self.pool_monitor = pool_monitor
+        self.cache = cache
+        # counters by (name, labels)
+        self._counters = {}
+        # histograms by (name, labels): buckets counts, sum and count
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Register the requests hooks, the command listener and the metrics
+        endpoint, if enabled.
+
+        Must be called before the MongoEngine extension is initialized.
+        """
+        self.clear()
+        if not app.config.get("METRICS_ENABLED", True):
+            return
+
+        app.config["MONGODB_SETTINGS"].setdefault("event_listeners", []).append(self)
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.teardown_request(self.teardown_request)
+        app.add_url_rule(
+            app.config.get("METRICS_PATH") or "/metrics", "metrics", self.metrics_view,
+        )
+
+    def clear(self):
+        """ Reset the metrics."""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def inc(self, name: str, labels: tuple, value=1):
+        """ Increment a counter."""
+        with self._lock:
+            self._counters[name, labels] = self._counters.get((name, labels), 0) + value
+
+    def observe(self, name: str, labels: tuple, value, buckets: tuple):
+        """ Add an observation to an histogram."""
+        with self._lock:
+            histogram = self._histograms.get((name, labels))
+            if histogram is None:
+                histogram = self._histograms[name, labels] = {
+                    "buckets": buckets,
+                    "counts": [0] * len(buckets),
+                    "sum": 0,
+                    "count": 0,
+                }
+            index = bisect_left(buckets, value)
+            if index < len(buckets):
+                histogram["counts"][index] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    def before_request(self):  # pylint: disable=no-self-use
+        """ Start timing the request."""
+        g.metrics_start = time.perf_counter()
+        g.mongodb_commands = 0
+
+    def after_request(self, response):  # pylint: disable=no-self-use
+        """ Keep the response status, recorded when the request is torn down."""
+        g.metrics_status = response.status_code
+        return response
+
+    def teardown_request(self, exc=None):
+        """Record the request duration and number of MongoDB commands.
+
+        after_request is skipped when the request raises an unhandled
+        exception, the request is then recorded with a 500 status.
+        """
+        start = g.get("metrics_start")
+        if start is None:
+            return
+
+        status = 500 if exc is not None else g.get("metrics_status", 500)
+        labels = request_labels() + (("method", request.method),)
+        self.inc("http_requests_total", labels + (("status", status),))
+        self.observe(
+            "http_request_duration_seconds",
+            labels,
+            time.perf_counter() - start,
+            DURATION_BUCKETS,
+        )
+        self.observe(
+            "http_request_mongodb_commands",
+            labels,
+            g.get("mongodb_commands", 0),
+            COMMANDS_BUCKETS,
+        )
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._count_command(event)
+
+    def failed(self, event):
+        self._count_command(event)
+        self.inc(
+            "mongodb_command_failures_total",
+            request_labels() + (("command", event.command_name),),
+        )
+
+    def _count_command(self, event):
+        """ Count a command, in the current request if any."""
+        labels = request_labels() + (("command", event.command_name),)
+        self.inc("mongodb_commands_total", labels)
+        self.inc(
+            "mongodb_command_duration_seconds_total",
+            labels,
+            event.duration_micros / 1e6,
+        )
+        if has_request_context() and "mongodb_commands" in g:
+            g.mongodb_commands += 1
+
+    def samples(self):
+        """Yield the (metric, name, labels, value) samples of the metrics.
+
+        Histograms are yielded with their cumulative buckets, sum and count.
+        """
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                (key, dict(histogram, counts=list(histogram["counts"])))
+                for key, histogram in self._histograms.items()
+            )
+
+        for (name, labels), value in counters:
+            yield name, name, labels, value
+
+        for (name, labels), histogram in histograms:
+            cumulative = 0
+            for bound, count in zip(histogram["buckets"], histogram["counts"]):
+                cumulative += count
+                yield name, name + "_bucket", labels + (("le", bound),), cumulative
+            yield name, name + "_bucket", labels + (("le", "+Inf"),), histogram["count"]
+            yield name, name + "_sum", labels, histogram["sum"]
+            yield name, name + "_count", labels, histogram["count"]
+
+        if self.pool_monitor is not None:
+            stats = self.pool_monitor.stats()
+            for name, key in POOL_METRICS.items():
+                yield name, name, (), stats[key]
+
+        if self.cache is not None:
+            stats = self.cache.stats()
+            for name, key in CACHE_METRICS.items():
+                yield name, name, (), stats[key]
+
+    def render(self) -> str:
+        """ Return the metrics in the Prometheus text format."""
+        by_metric = {}
+        for metric, name, labels, value in self.samples():
+            by_metric.setdefault(metric, []).append(
+                "{}{} {}".format(name, format_labels(labels), format_value(value))
+            )
+
+        lines = []
+        for metric, (help_text, metric_type) in METRICS.items():
+            if metric in by_metric:
+                lines.append("# HELP {} {}".format(metric, help_text))
+                lines.append("# TYPE {} {}".format(metric, metric_type))
+                lines.extend(by_metric[metric])
+        return "\n".join(lines) + "\n"
+
+    def metrics_view(self):
+        """ Serve the metrics."""
+        return current_app.response_class(self.render(), content_type=CONTENT_TYPE)
@@ -30,6 +30,30 @@ class Exercise(Document):
     creation_date = DateTimeField(required=True)
     # url video
     video = StringField()
+    # document version, incremented on each modification
+    version = IntField(default=0)
+
+    meta = {
+        "indexes": [
+            # serves the exercises list filtered by section and sorted by id
+            ("section", "id"),
+            # serve the exercises list filtered by section and sorted by
+            # dificulty or duration (equality, sort, then range filter keys),
+            # the id keeps the order unique
+            ("section", "dificulty", "id"),
+            ("section", "duration", "id"),
+            # serve the exercises list of all the sections sorted by
+            # dificulty or duration
+            ("dificulty", "id"),
+            ("duration", "id"),
+            # serves the exercises search, the names weigh more
+            {
+                "fields": ["$name", "$description"],
+                "default_language": "english",
+                "weights": {"name": 5, "description": 1},
+            },
+        ]
+    }
 
 
 class Stage(EmbeddedDocument):
@@ -62,4 +86,93 @@ class Training(Document):
     stages = ListField(EmbeddedDocumentField(Stage))
     # tags
     tags = ListField(StringField())
+    # document version, incremented on each modification
+    version = IntField(default=0)
+
+    meta = {
+        # serves the per-category date range queries (list and next training)
+        "indexes": [("category", "date_time", "id")]
+    }
+
+
+class Recurrence(EmbeddedDocument):
+    """
+    Define a recurrence rule (RRULE-like)
+    """
+
+    # recurrence frequency (DAILY or WEEKLY)
+    freq = StringField(required=True, choices=("DAILY", "WEEKLY"))
+    # number of days or weeks between two periods
+    interval = IntField(default=1)
+    # week days of the occurrences (0 is monday), defaults to the first one's
+    by_weekday = ListField(IntField())
+    # maximum number of occurrences
+    count = IntField()
+    # datetime after which there is no occurrence
+    until = DateTimeField()
+
+
+class OccurrenceOverride(EmbeddedDocument):
+    """
+    Define the changes of a training series occurrence
+    """
+
+    # datetime of the overridden occurrence
+    original_date_time = DateTimeField(required=True)
+    # new occurrence datetime
+    date_time = DateTimeField()
+    # new occurrence place
+    place = StringField()
+    # new occurrence stages
+    stages = ListField(EmbeddedDocumentField(Stage))
+    # new occurrence tags
+    tags = ListField(StringField())
+
+
+class TrainingSeries(Document):
+    """
+    Define a recurring Training, its occurrences are expanded when read
+    """
+
+    # Training category
+    category = StringField(required=True)
+    # first occurrence datetime
+    date_time = DateTimeField(required=True)
+    # Training place
+    place = StringField(required=True)
+    # number of stages
+    nb_stages = IntField(required=True)
+    # the list of stages
+    stages = ListField(EmbeddedDocumentField(Stage))
+    # tags
+    tags = ListField(StringField())
+    # recurrence rule
+    recurrence = EmbeddedDocumentField(Recurrence, required=True)
+    # datetimes of the cancelled occurrences
+    exceptions = ListField(DateTimeField())
+    # changed occurrences
+    overrides = ListField(EmbeddedDocumentField(OccurrenceOverride))
+    # last occurrence datetime of the recurrence rule, none if endless
+    last_occurrence = DateTimeField()
+    # datetimes range of the occurrences, overrides included (none if endless)
+    first_date_time = DateTimeField(required=True)
+    last_date_time = DateTimeField()
+    # document version, incremented on each modification
+    version = IntField(default=0)
+
+    meta = {
+        # serves the per-category date range queries
+        "indexes": [("category", "first_date_time")]
+    }
+
+
+class CacheVersion(Document):
+    """
+    Define the shared version of a process cache, incremented by the writes
+    invalidating it
+    """
 
+    # cache name
+    name = StringField(primary_key=True)
+    # cache version
+    version = IntField(default=0)
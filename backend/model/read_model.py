@@ -0,0 +1,74 @@
+""" Read models for Mongo documents.
+
+When the RAW_READS setting is enabled, the read endpoints skip the MongoEngine
+documents hydration: the queries return the raw pymongo documents, turned
+into plain dicts shaped like the documents so the response schemas dump them
+the same way.
+"""
+from flask import abort, current_app
+
+
+def raw_reads_enabled() -> bool:
+    """ Check if the read endpoints use the raw documents read path."""
+    return current_app.config.get("RAW_READS", False)
+
+
+def to_read_model(document_cls, raw: dict) -> dict:
+    """Turn a raw pymongo document into a read model of the document class.
+
+    The id is exposed as `id` and the missing fields take their default value,
+    as they would on a MongoEngine document.
+    """
+    read_model = dict(raw)
+    read_model["id"] = read_model.pop("_id", None)
+
+    for name in document_cls._fields.keys() - read_model.keys():
+        default = document_cls._fields[name].default
+        read_model[name] = default() if callable(default) else default
+
+    return read_model
+
+
+def fetch(queryset) -> list:
+    """ Run the query, return the documents or their read models."""
+    if not raw_reads_enabled():
+        return list(queryset)
+
+    document_cls = queryset._document  # pylint: disable=protected-access
+    return [to_read_model(document_cls, raw) for raw in queryset.as_pymongo()]
+
+
+def iter_fetch(queryset, batch_size: int):
+    """Run the query, yield the documents or their read models as they are read
+    by batches of batch_size: the results are not kept in memory.
+    """
+    queryset = queryset.no_cache().batch_size(batch_size)
+    if not raw_reads_enabled():
+        yield from queryset
+        return
+
+    document_cls = queryset._document  # pylint: disable=protected-access
+    for raw in queryset.as_pymongo():
+        yield to_read_model(document_cls, raw)
+
+
+def fetch_first(queryset):
+    """ Return the first document, or its read model, of the query or None."""
+    if not raw_reads_enabled():
+        return queryset.first()
+
+    raw = queryset.as_pymongo().first()
+    if raw is None:
+        return None
+    return to_read_model(queryset._document, raw)  # pylint: disable=protected-access
+
+
+def fetch_one_or_404(queryset):
+    """ Return the document, or its read model, matched by the query or abort 404."""
+    if not raw_reads_enabled():
+        return queryset.get_or_404()
+
+    read_model = fetch_first(queryset)
+    if read_model is None:
+        abort(404)
+    return read_model
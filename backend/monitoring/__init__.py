@@ -0,0 +1,2 @@
+"""Monitoring module"""
+from . import api_monitoring  # noqa
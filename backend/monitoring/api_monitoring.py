@@ -0,0 +1,59 @@
+"""Runtime statistics API."""
+import logging
+
+from flask.views import MethodView
+
+# from flask_jwt_extended import jwt_required
+from marshmallow import Schema
+from marshmallow.fields import Float, Int
+
+from .blueprint import bp
+from backend.extension import pool_monitor
+
+
+logger = logging.getLogger(__name__)
+
+
+class PoolStatsSchema(Schema):
+    """ Schema for the MongoDB connection pool statistics."""
+
+    # configured maximum number of connections per pool
+    max_pool_size = Int(
+        allow_none=True, description="Maximum connections per pool", example=100
+    )
+    # number of pools, one per server
+    pools = Int(description="Number of pools", example=1)
+    # open connections
+    connections = Int(description="Number of open connections", example=12)
+    # connections in use
+    checked_out = Int(description="Number of checked out connections", example=3)
+    # peak of the connections in use
+    max_checked_out = Int(
+        description="Maximum number of checked out connections", example=10
+    )
+    # successful check outs
+    check_outs = Int(description="Number of check outs", example=4520)
+    # failed check outs, timeouts included
+    check_out_failures = Int(description="Number of failed check outs", example=0)
+    # check outs timed out waiting for a connection
+    timeouts = Int(description="Number of check outs timeouts", example=0)
+    # mean wait time for a connection
+    mean_wait_ms = Float(description="Mean check out wait time (ms)", example=0.2)
+    # longest wait time for a connection
+    max_wait_ms = Float(description="Maximum check out wait time (ms)", example=35.1)
+
+
+@bp.route("/pool")
+class ApiPoolStats(MethodView):
+    @bp.response(
+        PoolStatsSchema(), description="The connection pool statistics in json"
+    )  # pylint: disable=no-self-use
+    @bp.doc(security=[{"bearerAuth": []}], responses={401: "UNAUTHORIZED"})
+    # TODO: authentification
+    # @jwt_required
+    def get(self):
+        """Get the MongoDB connection pool statistics
+        Counters of the pool of the current process, since its start.
+        """
+        logger.debug("Get pool stats")
+        return pool_monitor.stats()
@@ -0,0 +1,10 @@
+""" API entrypoints for the monitoring."""
+
+from flask_smorest import Blueprint
+
+bp = Blueprint(
+    "monitoring",
+    __name__,
+    url_prefix="/api/v1/monitoring",
+    description="This endpoint allows to retrieve the backend runtime statistics.",
+)
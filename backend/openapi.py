@@ -0,0 +1,62 @@
+""" OpenAPI spec generation and pre-built spec serving."""
+import json
+import logging
+import os
+
+import flask_smorest
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+
+def spec_json(spec) -> str:
+    """ Return the JSON document of an OpenAPI spec, keys order preserved."""
+    return json.dumps(spec.to_dict(), indent=2)
+
+
+class Api(flask_smorest.Api):
+    """Api serving a pre-built OpenAPI spec, if configured.
+
+    When the OPENAPI_SPEC_FILE file exists, the blueprints views are not
+    introspected to build the spec, the file is served as is. It is written by
+    generate_openapi from the same code, at build time.
+    """
+
+    def __init__(self, app=None, *, spec_kwargs=None):
+        self.prebuilt_spec = None
+        super().__init__(app, spec_kwargs=spec_kwargs)
+
+    def init_app(self, app, *, spec_kwargs=None):
+        """ Initialize Api with application, loading the pre-built spec if any."""
+        self.prebuilt_spec = None
+        spec_file = app.config.get("OPENAPI_SPEC_FILE")
+        if spec_file:
+            if os.path.isfile(spec_file):
+                with open(spec_file) as infile:
+                    self.prebuilt_spec = infile.read()
+                logger.debug("Serve the pre-built OpenAPI spec %s", spec_file)
+            else:
+                logger.warning("OpenAPI spec %s not found, built instead", spec_file)
+        super().init_app(app, spec_kwargs=spec_kwargs)
+
+    def _register_responses(self):
+        """ Register the responses in the spec, unless pre-built."""
+        if self.prebuilt_spec is None:
+            super()._register_responses()
+
+    def register_blueprint(self, blp, **options):
+        """Register a blueprint in the application, and in the spec unless
+        pre-built.
+        """
+        if self.prebuilt_spec is None:
+            super().register_blueprint(blp, **options)
+        else:
+            self._app.register_blueprint(blp, **options)
+
+    def _openapi_json(self):
+        """ Serve JSON spec file."""
+        if self.prebuilt_spec is None:
+            return super()._openapi_json()
+        return current_app.response_class(
+            self.prebuilt_spec, mimetype="application/json"
+        )
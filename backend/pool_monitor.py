@@ -0,0 +1,125 @@
+""" MongoDB connection pool instrumentation."""
+import logging
+import threading
+import time
+
+from pymongo.monitoring import ConnectionCheckOutFailedReason, ConnectionPoolListener
+
+logger = logging.getLogger(__name__)
+
+
+class PoolMonitor(ConnectionPoolListener):
+    """Connection pool events listener of the app MongoClient.
+
+    Counts the connections checked out of the pools, the time spent waiting
+    for them and the check out timeouts, to size the pools against the number
+    of gunicorn workers and greenlets.
+    """
+
+    def __init__(self):
+        self.max_pool_size = None
+        self._counters = {}
+        # check out start time of the current thread (greenlet under gevent)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.clear()
+
+    def init_app(self, app):
+        """Register the listener in the app MongoClient settings, if enabled.
+
+        Must be called before the MongoEngine extension is initialized.
+        """
+        self.clear()
+        if app.config.get("MONGODB_POOL_MONITORING", True):
+            app.config["MONGODB_SETTINGS"].setdefault("event_listeners", []).append(
+                self
+            )
+
+    def clear(self):
+        """ Reset the counters."""
+        with self._lock:
+            self._counters = {
+                "pools": 0,
+                "connections": 0,
+                "checked_out": 0,
+                "max_checked_out": 0,
+                "check_outs": 0,
+                "check_out_failures": 0,
+                "timeouts": 0,
+                "wait_time": 0.0,
+                "max_wait_time": 0.0,
+            }
+
+    def _count(self, **increments):
+        """ Add the increments to the counters."""
+        with self._lock:
+            for key, increment in increments.items():
+                self._counters[key] = max(0, self._counters[key] + increment)
+            self._counters["max_checked_out"] = max(
+                self._counters["max_checked_out"], self._counters["checked_out"]
+            )
+
+    def pool_created(self, event):
+        """ Count the pool and keep its maximum size."""
+        self.max_pool_size = event.options.get("maxPoolSize", self.max_pool_size)
+        self._count(pools=1)
+
+    def pool_cleared(self, event):
+        logger.warning("Connection pool of %s cleared", event.address)
+
+    def pool_closed(self, event):
+        self._count(pools=-1)
+
+    def connection_created(self, event):
+        self._count(connections=1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._count(connections=-1)
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.monotonic()
+
+    def connection_check_out_failed(self, event):
+        self._local.started = None
+        if event.reason == ConnectionCheckOutFailedReason.TIMEOUT:
+            logger.warning("Connection check out from %s timed out", event.address)
+            self._count(check_out_failures=1, timeouts=1)
+        else:
+            self._count(check_out_failures=1)
+
+    def connection_checked_out(self, event):
+        started = getattr(self._local, "started", None)
+        self._local.started = None
+        wait_time = 0.0 if started is None else time.monotonic() - started
+        with self._lock:
+            self._counters["max_wait_time"] = max(
+                self._counters["max_wait_time"], wait_time
+            )
+        self._count(checked_out=1, check_outs=1, wait_time=wait_time)
+
+    def connection_checked_in(self, event):
+        self._count(checked_out=-1)
+
+    def stats(self) -> dict:
+        """ Return the pool counters, the wait times in milliseconds."""
+        with self._lock:
+            counters = dict(self._counters)
+        return {
+            "max_pool_size": self.max_pool_size,
+            "pools": counters["pools"],
+            "connections": counters["connections"],
+            "checked_out": counters["checked_out"],
+            "max_checked_out": counters["max_checked_out"],
+            "check_outs": counters["check_outs"],
+            "check_out_failures": counters["check_out_failures"],
+            "timeouts": counters["timeouts"],
+            "mean_wait_ms": (
+                counters["wait_time"] * 1000 / counters["check_outs"]
+                if counters["check_outs"]
+                else 0.0
+            ),
+            "max_wait_ms": counters["max_wait_time"] * 1000,
+        }
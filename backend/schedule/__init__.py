@@ -0,0 +1,2 @@
+"""Calendar module"""
+from . import api_calendar  # noqa
@@ -0,0 +1,180 @@
+"""Trainings calendar API."""
+import logging
+from datetime import datetime, time, timedelta
+
+from flask.views import MethodView
+
+# from flask_jwt_extended import jwt_required
+from marshmallow import Schema
+from marshmallow.fields import Bool, Date, Int, List, Nested, Str
+from marshmallow.validate import Regexp
+
+from .blueprint import bp
+from backend.model.data_model import Training
+from backend.training.api_training import TrainingListArgsSchema
+from backend.training.series import fetch_series, iter_occurrences
+
+
+logger = logging.getLogger(__name__)
+
+
+class CalendarQuerySchema(TrainingListArgsSchema):
+    """ Query schema for calendar API."""
+
+    # week grid
+    week = Bool(
+        missing=False,
+        description="If true retrieves the week grid, else the month grid",
+        example=True,
+    )
+    # caller UTC offset
+    utc_offset = Str(
+        missing="+00:00",
+        validate=Regexp(r"^[+-](0\d|1[0-4]):[0-5]\d$"),
+        description="The caller UTC offset ('+HH:MM'), days are in its timezone",
+        example="+02:00",
+    )
+
+
+class CalendarDaySchema(Schema):
+    """ Schema for a calendar day."""
+
+    # day date
+    date = Date(description="The day date ('YYYY-MM-DD')", example="2020-04-01")
+    # day in the requested month or week
+    in_period = Bool(description="If the day is in the requested period", example=True)
+    # number of trainings
+    nb_trainings = Int(description="Number of trainings", example=1)
+    # total stages duration in minutes
+    minutes = Int(description="Total stages duration in minutes", example=90)
+    # trainings places
+    places = List(Str(), example=["Hawks Stadium"])
+
+
+class CalendarSchema(Schema):
+    """ Schema for a calendar grid."""
+
+    # first day of the period
+    start = Date(description="The period first day", example="2020-04-01")
+    # last day of the period
+    end = Date(description="The period last day", example="2020-04-30")
+    # caller UTC offset
+    utc_offset = Str(description="The days UTC offset", example="+02:00")
+    # weeks of the grid, from monday to sunday
+    weeks = List(List(Nested(CalendarDaySchema)))
+
+
+def parse_utc_offset(utc_offset: str) -> timedelta:
+    """ Return the timedelta of a '+HH:MM' UTC offset."""
+    hours, minutes = utc_offset[1:].split(":")
+    offset = timedelta(hours=int(hours), minutes=int(minutes))
+    return -offset if utc_offset[0] == "-" else offset
+
+
+def grid_bounds(day, week: bool):
+    """Return the first and last days of the week or month of a day, and the
+    first and last days of its grid, from monday to sunday.
+    """
+    if week:
+        start = day - timedelta(days=day.weekday())
+        end = start + timedelta(days=6)
+    else:
+        start = day.replace(day=1)
+        end = (start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+    grid_start = start - timedelta(days=start.weekday())
+    grid_end = end + timedelta(days=6 - end.weekday())
+    return start, end, grid_start, grid_end
+
+
+def calendar_pipeline(match: dict, utc_offset: str) -> list:
+    """ Return the aggregation pipeline summing the trainings per day."""
+    return [
+        {"$match": match},
+        {
+            "$group": {
+                "_id": {
+                    "$dateToString": {
+                        "format": "%Y-%m-%d",
+                        "date": "$date_time",
+                        "timezone": utc_offset,
+                    }
+                },
+                "nb_trainings": {"$sum": 1},
+                "minutes": {"$sum": {"$sum": "$stages.duration"}},
+                "places": {"$addToSet": "$place"},
+            }
+        },
+    ]
+
+
+@bp.route("")
+class ApiCalendar(MethodView):
+    @bp.etag
+    @bp.arguments(CalendarQuerySchema(), location="query")
+    @bp.response(
+        CalendarSchema(), description="The calendar grid in json",
+    )  # pylint: disable=no-self-use
+    @bp.doc(security=[{"bearerAuth": []}], responses={401: "UNAUTHORIZED"})
+    # TODO: authentification
+    # @jwt_required
+    def get(self, args):
+        """Get the trainings calendar
+        Returns the grid of the month, or of the week if week is true, of the
+        date (default today), with the trainings summary of each day.
+        """
+        logger.debug("Get calendar, args: %s", args)
+
+        offset = parse_utc_offset(args["utc_offset"])
+        day = args.get("date", (datetime.utcnow() + offset).date())
+        start, end, grid_start, grid_end = grid_bounds(day, args["week"])
+
+        # grid bounds in UTC
+        utc_start = datetime.combine(grid_start, time()) - offset
+        utc_end = datetime.combine(grid_end + timedelta(days=1), time()) - offset
+
+        # served by the (category, date_time, _id) index
+        match = {
+            "category": args["category"],
+            "date_time": {"$gte": utc_start, "$lt": utc_end},
+        }
+        groups = Training._get_collection().aggregate(  # pylint: disable=no-member
+            calendar_pipeline(match, args["utc_offset"])
+        )
+        buckets = {group["_id"]: group for group in groups}
+
+        # the series occurrences are not stored
+        for occurrence in iter_occurrences(
+            fetch_series(args["category"], utc_start, utc_end), utc_start, utc_end
+        ):
+            bucket = buckets.setdefault(
+                (occurrence["date_time"] + offset).date().isoformat(),
+                {"nb_trainings": 0, "minutes": 0, "places": []},
+            )
+            bucket["nb_trainings"] += 1
+            bucket["minutes"] += sum(
+                stage["duration"] for stage in occurrence["stages"]
+            )
+            if occurrence["place"] not in bucket["places"]:
+                bucket["places"].append(occurrence["place"])
+
+        days = []
+        for index in range((grid_end - grid_start).days + 1):
+            date = grid_start + timedelta(days=index)
+            bucket = buckets.get(date.isoformat(), {})
+            days.append(
+                {
+                    "date": date,
+                    "in_period": start <= date <= end,
+                    "nb_trainings": bucket.get("nb_trainings", 0),
+                    "minutes": bucket.get("minutes", 0),
+                    "places": sorted(bucket.get("places", [])),
+                }
+            )
+
+        return {
+            "start": start,
+            "end": end,
+            "utc_offset": args["utc_offset"],
+            "weeks": [days[index : index + 7] for index in range(0, len(days), 7)],
+        }
@@ -0,0 +1,10 @@
+""" API entrypoints for the calendar."""
+
+from flask_smorest import Blueprint
+
+bp = Blueprint(
+    "calendar",
+    __name__,
+    url_prefix="/api/v1/calendar",
+    description="This endpoint allows to retrieve the trainings calendar.",
+)
@@ -1,2 +1,4 @@
 """Training module"""
 from . import api_training  # noqa
+from . import api_series  # noqa
+from . import api_stats  # noqa
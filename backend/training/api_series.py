@@ -0,0 +1,294 @@
+"""Recurring trainings management API."""
+import logging
+
+from flask.views import MethodView
+from flask_smorest import abort
+
+# from flask_jwt_extended import jwt_required
+from marshmallow import Schema, ValidationError, validates_schema
+from marshmallow.fields import Str, Int, List, Nested, DateTime
+from marshmallow.validate import OneOf, Range
+
+from .blueprint import bp
+from .api_training import StageSchema, create_stages
+from .series import DAILY, WEEKLY, compute_bounds, is_occurrence, to_utc
+from backend.events import CREATED, DELETED, MODIFIED, notify_training_series
+from backend.model.data_model import OccurrenceOverride, Recurrence, TrainingSeries
+from backend.model.read_model import to_read_model
+
+
+logger = logging.getLogger(__name__)
+
+# maximum number of occurrences of a series with a count
+SERIES_MAX_COUNT = 10000
+
+
+class RecurrenceSchema(Schema):
+    """ Schema for Recurrence """
+
+    # recurrence frequency
+    freq = Str(
+        required=True,
+        validate=OneOf([DAILY, WEEKLY]),
+        description="The recurrence frequency (DAILY or WEEKLY)",
+        example="WEEKLY",
+    )
+    # number of days or weeks between two periods
+    interval = Int(
+        missing=1,
+        validate=Range(min=1),
+        description="Number of days or weeks between two periods",
+        example=1,
+    )
+    # week days of the occurrences
+    by_weekday = List(
+        Int(validate=Range(min=0, max=6)),
+        description="Week days of the occurrences (0 is monday)",
+        example=[1, 3],
+    )
+    # maximum number of occurrences
+    count = Int(
+        validate=Range(min=1, max=SERIES_MAX_COUNT),
+        description="Number of occurrences",
+        example=10,
+    )
+    # datetime after which there is no occurrence
+    until = DateTime(
+        description="Datetime after which there is no occurrence",
+        example="2020-06-30T20:00:00.000Z",
+    )
+
+    @validates_schema
+    def validate_end(self, data, **kwargs):
+        """ Check the series end is given by count or until, not both."""
+        if "count" in data and "until" in data:
+            raise ValidationError("count and until can not be both set.", "count")
+
+
+class OccurrenceOverrideSchema(Schema):
+    """ Schema for OccurrenceOverride """
+
+    # datetime of the overridden occurrence
+    original_date_time = DateTime(
+        required=True,
+        description="The datetime of the overridden occurrence",
+        example="2020-04-08T18:00:00.000Z",
+    )
+    # new occurrence datetime
+    date_time = DateTime(
+        description="The new occurrence datetime", example="2020-04-09T18:00:00.000Z"
+    )
+    # new occurrence place
+    place = Str(description="The new occurrence place", example="Hawks Stadium")
+    # new occurrence stages
+    stages = List(Nested(StageSchema))
+    # new occurrence tags
+    tags = List(Str())
+
+
+class TrainingSeriesSchema(Schema):
+    """ Schema for TrainingSeries """
+
+    # series id
+    _id = Str(dump_only=True, data_key="id", attribute="id")
+    # Training category
+    category = Str(required=True, description="The training category", example="15U")
+    # first occurrence datetime
+    date_time = DateTime(
+        required=True,
+        description="The first occurrence datetime ('YYYY-MM-DD HH:MM:SS')",
+        example="2020-04-01T18:00:00.000Z",
+    )
+    # Training place
+    place = Str(
+        required=True, description="The training place", example="Hawks Stadium"
+    )
+    # number of stages
+    nb_stages = Int(
+        required=True, description="Number of stages in the training", example=1
+    )
+    # the list of stages
+    stages = List(Nested(StageSchema))
+    # tags
+    tags = List(Str())
+    # recurrence rule
+    recurrence = Nested(RecurrenceSchema, required=True)
+    # datetimes of the cancelled occurrences
+    exceptions = List(DateTime(), description="Datetimes of cancelled occurrences")
+    # changed occurrences
+    overrides = List(Nested(OccurrenceOverrideSchema))
+    # document version
+    version = Int(dump_only=True, description="The series version", example=0)
+
+
+def create_series(series: dict) -> TrainingSeries:
+    """Build a TrainingSeries document.
+
+    The exceptions and overrides are verified to match occurrences of the
+    recurrence rule, the occurrences datetimes range is stored for the queries.
+    """
+    overrides = series.get("overrides", [])
+    series_stages, *overrides_stages = create_stages(
+        series["stages"], *[override.get("stages", []) for override in overrides]
+    )
+
+    recurrence = dict(series["recurrence"])
+    if "until" in recurrence:
+        recurrence["until"] = to_utc(recurrence["until"])
+
+    training_series = TrainingSeries(
+        category=series["category"],
+        date_time=to_utc(series["date_time"]),
+        place=series["place"],
+        nb_stages=series["nb_stages"],
+        stages=series_stages,
+        tags=series.get("tags", []),
+        recurrence=Recurrence(**recurrence),
+        exceptions=sorted(
+            {to_utc(date_time) for date_time in series.get("exceptions", [])}
+        ),
+        overrides=[
+            OccurrenceOverride(
+                original_date_time=to_utc(override["original_date_time"]),
+                date_time=to_utc(override["date_time"])
+                if "date_time" in override
+                else None,
+                place=override.get("place"),
+                stages=override_stages,
+                tags=override.get("tags", []),
+            )
+            for override, override_stages in zip(overrides, overrides_stages)
+        ],
+    )
+
+    read_model = to_read_model(TrainingSeries, training_series.to_mongo().to_dict())
+    (
+        training_series.last_occurrence,
+        training_series.first_date_time,
+        training_series.last_date_time,
+    ) = compute_bounds(read_model)
+    read_model["last_occurrence"] = training_series.last_occurrence
+
+    not_occurrences = sorted(
+        {
+            date_time
+            for date_time in training_series.exceptions
+            + [override.original_date_time for override in training_series.overrides]
+            if not is_occurrence(read_model, date_time)
+        }
+    )
+    if not_occurrences:
+        abort(
+            422,
+            message="Not occurrences of the series",
+            errors={
+                "not_occurrences": [
+                    date_time.isoformat() for date_time in not_occurrences
+                ]
+            },
+        )
+
+    return training_series
+
+
+@bp.route("/series")
+class ApiNewTrainingSeries(MethodView):
+    @bp.arguments(
+        TrainingSeriesSchema, description="The new training series in json",
+    )
+    @bp.response(
+        TrainingSeriesSchema, description="The new training series in json",
+    )  # pylint: disable=no-self-use
+    @bp.doc(security=[{"bearerAuth": []}], responses={401: "UNAUTHORIZED"})
+    # TODO: authentification
+    # @jwt_required
+    def put(self, put_data):
+        """Create a new training series, return the series in json
+        Its occurrences are listed with the trainings.
+        """
+        logger.debug("Create a new training series")
+        logger.debug("data: %s", put_data)
+
+        training_series = create_series(put_data)
+        training_series.save()
+        notify_training_series(CREATED, training_series)
+        return training_series
+
+
+@bp.route(
+    "/series/<series_id>",
+    parameters=[
+        {
+            "name": "series_id",
+            "description": "The id of the training series",
+            "example": "507f1f77bcf86cd799439011",
+            "in": "path",
+        }
+    ],
+)
+class ApiTrainingSeries(MethodView):
+    """ API to get / delete / update a training series """
+
+    @bp.arguments(
+        TrainingSeriesSchema, description="The training series to modify in json",
+    )
+    @bp.response(
+        TrainingSeriesSchema, description="The modified training series in json",
+    )  # pylint: disable=no-self-use
+    @bp.doc(security=[{"bearerAuth": []}], responses={401: "UNAUTHORIZED"})
+    # TODO: authentification
+    # @jwt_required
+    def post(self, post_data, series_id):
+        """Modify a training series, return the series in json"""
+        logger.debug("Modify training series id=%s", series_id)
+        logger.debug("data: %s", post_data)
+
+        new_series = create_series(post_data)
+
+        # pylint: disable=no-member
+        training_series = TrainingSeries.objects.get_or_404(id=series_id)
+        category = training_series.category
+        training_series.modify(
+            category=new_series.category,
+            date_time=new_series.date_time,
+            place=new_series.place,
+            nb_stages=new_series.nb_stages,
+            stages=new_series.stages,
+            tags=new_series.tags,
+            recurrence=new_series.recurrence,
+            exceptions=new_series.exceptions,
+            overrides=new_series.overrides,
+            last_occurrence=new_series.last_occurrence,
+            first_date_time=new_series.first_date_time,
+            last_date_time=new_series.last_date_time,
+            inc__version=1,
+        )
+        notify_training_series(MODIFIED, training_series, [category])
+
+        return training_series
+
+    @bp.doc(security=[{"bearerAuth": []}], responses={401: "UNAUTHORIZED"})
+    # TODO: authentification
+    # @jwt_required
+    def delete(self, series_id):
+        """Delete a training series and all its occurrences"""
+        logger.debug("Delete training series id=%s", series_id)
+
+        # pylint: disable=no-member
+        training_series = TrainingSeries.objects.get_or_404(id=series_id)
+        training_series.delete()
+        notify_training_series(DELETED, training_series)
+
+        return {}
+
+    @bp.response(TrainingSeriesSchema())
+    @bp.doc(security=[{"bearerAuth": []}], responses={401: "UNAUTHORIZED"})
+    # TODO: authentification
+    # @jwt_required
+    def get(self, series_id):
+        """Get a training series"""
+        logger.debug("Get training series id=%s", series_id)
+
+        return TrainingSeries.objects.get_or_404(  # pylint: disable=no-member
+            id=series_id
+        )
@@ -0,0 +1,275 @@
+"""Trainings load analytics API."""
+import logging
+from datetime import datetime, time, timedelta
+
+from flask.views import MethodView
+from flask_smorest import abort
+
+# from flask_jwt_extended import jwt_required
+from marshmallow import Schema, ValidationError, validates_schema
+from marshmallow.fields import Dict, Int, Str
+
+from .blueprint import bp
+from .series import fetch_series, iter_occurrences
+from backend.apihelpers import DateRangeQuerySchema
+from backend.extension import exercise_cache
+from backend.model.data_model import Exercise, Training
+
+
+logger = logging.getLogger(__name__)
+
+# longest period of a stats query, in days
+TRAINING_STATS_MAX_DAYS = 366
+# maximum number of groups computed by each branch of the stats pipeline,
+# keeps the single result document far below the 16MB limit, larger stats are
+# rejected
+TRAINING_STATS_MAX_GROUPS = 5000
+
+
+class TrainingStatsQuerySchema(DateRangeQuerySchema):
+    """ Query schema for trainings stats API."""
+
+    # Training category
+    category = Str(
+        description="The training category, all if not specified", example="18U"
+    )
+
+    @validates_schema
+    def validate_period(  # pylint: disable=no-self-use,unused-argument
+        self, data, **kwargs
+    ):
+        """ Validate the stats period length."""
+        if (
+            "start" in data
+            and "end" in data
+            and data["end"] - data["start"] > timedelta(days=TRAINING_STATS_MAX_DAYS)
+        ):
+            raise ValidationError(
+                "The period must not exceed {} days.".format(TRAINING_STATS_MAX_DAYS)
+            )
+
+
+class TrainingWeekStatsSchema(Schema):
+    """ Schema for the trainings stats of a category on an ISO week."""
+
+    # ISO week
+    week = Str(description="The ISO week ('YYYY-Www')", example="2020-W14")
+    # Training category
+    category = Str(description="The training category", example="15U")
+    # number of trainings
+    nb_trainings = Int(description="Number of trainings", example=3)
+    # total stages duration in minutes
+    minutes = Int(description="Total stages duration in minutes", example=270)
+    # exercises duration in minutes per section
+    minutes_per_section = Dict(
+        keys=Str(),
+        values=Int(),
+        description="Exercises duration in minutes per section",
+        example={"infield": 120, "outfield": 90},
+    )
+    # exercises duration in minutes per dificulty
+    minutes_per_dificulty = Dict(
+        keys=Str(),
+        values=Int(),
+        description="Exercises duration in minutes per dificulty (0-5)",
+        example={"2": 60, "4": 150},
+    )
+
+
+def stats_pipeline(match: dict) -> list:
+    """Return the aggregation pipeline computing the trainings stats.
+
+    The trainings are grouped by ISO week and category in one branch, their
+    exercises, looked up by id, are grouped by section and dificulty in the
+    other one. Each branch returns at most TRAINING_STATS_MAX_GROUPS + 1 groups,
+    to detect the stats exceeding the limit.
+    """
+    group_sort = {"_id.week": 1, "_id.category": 1}
+    return [
+        {"$match": match},
+        {
+            "$project": {
+                "category": 1,
+                "week": {"$dateToString": {"format": "%G-W%V", "date": "$date_time"}},
+                "stages.duration": 1,
+                "stages.exercises": 1,
+            }
+        },
+        {
+            "$facet": {
+                "trainings": [
+                    {
+                        "$group": {
+                            "_id": {"week": "$week", "category": "$category"},
+                            "nb_trainings": {"$sum": 1},
+                            "minutes": {"$sum": {"$sum": "$stages.duration"}},
+                        }
+                    },
+                    {"$sort": group_sort},
+                    {"$limit": TRAINING_STATS_MAX_GROUPS + 1},
+                ],
+                "exercises": [
+                    {"$unwind": "$stages"},
+                    {"$unwind": "$stages.exercises"},
+                    # the stages store the exercises ids as strings, the invalid
+                    # ones match no exercise
+                    {
+                        "$addFields": {
+                            "exercise_id": {
+                                "$convert": {
+                                    "input": "$stages.exercises",
+                                    "to": "objectId",
+                                    "onError": None,
+                                    "onNull": None,
+                                }
+                            }
+                        }
+                    },
+                    {
+                        "$lookup": {
+                            "from": Exercise._get_collection_name(),
+                            "localField": "exercise_id",
+                            "foreignField": "_id",
+                            "as": "exercise",
+                        }
+                    },
+                    {"$unwind": "$exercise"},
+                    {
+                        "$group": {
+                            "_id": {
+                                "week": "$week",
+                                "category": "$category",
+                                "section": "$exercise.section",
+                                "dificulty": "$exercise.dificulty",
+                            },
+                            "minutes": {"$sum": "$exercise.duration"},
+                        }
+                    },
+                    {"$sort": group_sort},
+                    {"$limit": TRAINING_STATS_MAX_GROUPS + 1},
+                ],
+            }
+        },
+    ]
+
+
+def week_stats(stats: dict, week: str, category: str) -> dict:
+    """ Return the stats of a category on a week, created if needed."""
+    return stats.setdefault(
+        (week, category),
+        {
+            "week": week,
+            "category": category,
+            "nb_trainings": 0,
+            "minutes": 0,
+            "minutes_per_section": {},
+            "minutes_per_dificulty": {},
+        },
+    )
+
+
+def add_exercise_minutes(stats: dict, section: str, dificulty: int, minutes: int):
+    """ Add exercises minutes to the stats of a week."""
+    for key, value in (
+        ("minutes_per_section", section),
+        ("minutes_per_dificulty", str(dificulty)),
+    ):
+        stats[key][value] = stats[key].get(value, 0) + minutes
+
+
+def add_occurrences_stats(stats: dict, occurrences: list):
+    """Add the series occurrences, which are not stored, to the stats.
+
+    The exercises of the occurrences are read with a single batched lookup.
+    """
+    exercises = exercise_cache.get_many(
+        {
+            exercise_id
+            for occurrence in occurrences
+            for stage in occurrence["stages"]
+            for exercise_id in stage["exercises"]
+        }
+    )
+    for occurrence in occurrences:
+        year, week, _ = occurrence["date_time"].isocalendar()
+        occurrence_stats = week_stats(
+            stats, "{}-W{:02d}".format(year, week), occurrence["category"]
+        )
+        occurrence_stats["nb_trainings"] += 1
+        for stage in occurrence["stages"]:
+            occurrence_stats["minutes"] += stage["duration"]
+            for exercise_id in stage["exercises"]:
+                exercise = exercises.get(exercise_id)
+                if exercise is not None:
+                    add_exercise_minutes(
+                        occurrence_stats,
+                        exercise["section"],
+                        exercise["dificulty"],
+                        exercise["duration"],
+                    )
+
+
+@bp.route("/stats")
+class ApiTrainingStats(MethodView):
+    @bp.arguments(TrainingStatsQuerySchema(), location="query")
+    @bp.response(
+        TrainingWeekStatsSchema(many=True),
+        description="The trainings stats per ISO week and category",
+    )  # pylint: disable=no-self-use
+    @bp.doc(security=[{"bearerAuth": []}], responses={401: "UNAUTHORIZED"})
+    # TODO: authentification
+    # @jwt_required
+    def get(self, args):
+        """Get the trainings load stats
+        Number of trainings, stages minutes and exercises minutes per section
+        and per dificulty, by ISO week and category, computed in a single
+        aggregation query.
+        Stats exceeding the groups limit are rejected, rather than truncated.
+        """
+        logger.debug("Get trainings stats, args: %s", args)
+
+        start = datetime.combine(args["start"], time())
+        end = datetime.combine(args["end"], time())
+        match = {"date_time": {"$gte": start, "$lt": end}}
+        if "category" in args:
+            match["category"] = args["category"]
+
+        (result,) = Training._get_collection().aggregate(  # pylint: disable=no-member
+            stats_pipeline(match)
+        )
+        if any(
+            len(result[branch]) > TRAINING_STATS_MAX_GROUPS
+            for branch in ("trainings", "exercises")
+        ):
+            abort(
+                422,
+                message="The stats exceed {} groups, select a shorter period or a "
+                "category.".format(TRAINING_STATS_MAX_GROUPS),
+            )
+
+        stats = {}
+        for group in result["trainings"]:
+            group_stats = week_stats(
+                stats, group["_id"]["week"], group["_id"]["category"]
+            )
+            group_stats["nb_trainings"] = group["nb_trainings"]
+            group_stats["minutes"] = group["minutes"]
+        for group in result["exercises"]:
+            if (group["_id"]["week"], group["_id"]["category"]) in stats:
+                add_exercise_minutes(
+                    stats[group["_id"]["week"], group["_id"]["category"]],
+                    group["_id"]["section"],
+                    group["_id"]["dificulty"],
+                    group["minutes"],
+                )
+
+        add_occurrences_stats(
+            stats,
+            list(
+                iter_occurrences(
+                    fetch_series(args.get("category"), start, end), start, end
+                )
+            ),
+        )
+
+        return [stats[key] for key in sorted(stats)]
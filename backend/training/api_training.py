@@ -1,23 +1,50 @@
 """Exercises management API."""
+import heapq
 import logging
 from functools import reduce
 from datetime import datetime, timezone
 from bson.objectid import ObjectId
 
+from flask import current_app
 from flask.views import MethodView
+from flask_smorest import abort
 
 # from flask_jwt_extended import jwt_required
-from marshmallow import Schema
+from marshmallow import Schema, pre_dump
 from marshmallow.fields import Str, Int, List, Nested, Date, DateTime, Bool
+from marshmallow.validate import OneOf, Range
 from mongoengine.queryset.visitor import Q
 
 from .blueprint import bp
-from backend.model.data_model import Exercise, Stage, Training
-from backend.apihelpers import DatetimeRangeQuerySchema
+from backend.events import CREATED, DELETED, MODIFIED, notify_training
+from backend.extension import exercise_cache
+from backend.model.data_model import Stage, Training
+from backend.model.read_model import fetch_first, fetch_one_or_404, to_read_model
+from backend.apihelpers import (
+    EXPORT_MIMETYPES,
+    DatetimeRangeQuerySchema,
+    ExportQuerySchema,
+    KeysetPaginationQuerySchema,
+    etag_data,
+    export_response,
+    schema_projection,
+)
+from .series import (
+    MILLISECOND,
+    fetch_series,
+    iter_occurrences,
+    paginate_trainings,
+    sort_key,
+    to_utc,
+)
 
 
 logger = logging.getLogger(__name__)
 
+# default and maximum number of trainings per page in the trainings list
+TRAINING_LIST_PAGE_SIZE = 50
+TRAINING_LIST_MAX_PAGE_SIZE = 100
+
 
 class ResumedExerciseSchema(Schema):
     # Exercise id
@@ -31,6 +58,13 @@ class ResumedExerciseSchema(Schema):
     # training duration in minutes
     duration = Int(description="The training durationin minutes", example=30)
 
+    @pre_dump
+    def wrap_id(self, exercise, **kwargs):  # pylint: disable=no-self-use
+        """ Dump the stored exercise ids, not expanded, as {"id": id}."""
+        if isinstance(exercise, str):
+            return {"id": exercise}
+        return exercise
+
 
 class StageSchema(Schema):
     """ Schema for Stage """
@@ -73,6 +107,15 @@ class TrainingIdSchema(Schema):
     _id = Str(required=True, data_key="id", attribute="id")
 
 
+class TrainingExpandQuerySchema(Schema):
+    # expanded references
+    expand = Str(
+        validate=OneOf(["exercises"]),
+        description="Set to 'exercises' to inline the stages exercises",
+        example="exercises",
+    )
+
+
 class TrainingListArgsSchema(Schema):
     # Training category
     category = Str(required=True, description="The training category", example="15U")
@@ -82,28 +125,83 @@ class TrainingListArgsSchema(Schema):
     week = Bool(description="if true retrieves nex five days trainings", example=True)
 
 
-def create_training(training: dict):
-    training_stages = []
-    for stage in training["stages"]:
-        stage_exercises = []
-        nb_exercises = 0
-        longest_duration = 0
-        for exercise in stage["exercises"]:
-            # verify that the exercise exists
-            ex = Exercise.objects.get_or_404(
-                id=ObjectId(exercise["id"])
-            )  # pylint: disable=no-member
-            stage_exercises.append(exercise["id"])
-            nb_exercises += 1
-            if longest_duration < ex.duration:
-                longest_duration = ex.duration
-
-        training_stage = Stage(
-            duration=longest_duration,
-            nb_exercises=nb_exercises,
-            exercises=stage_exercises,
+def create_stages(*stages_lists) -> list:
+    """Build the Stage documents of lists of stages.
+
+    All the exercises are verified to exist with a single query.
+    Returns a list of Stage documents per list of stages.
+    """
+    exercise_ids = {
+        exercise["id"]
+        for stages in stages_lists
+        for stage in stages
+        for exercise in stage["exercises"]
+    }
+    durations = {
+        exercise_id: exercise["duration"]
+        for exercise_id, exercise in exercise_cache.get_many(exercise_ids).items()
+    }
+    missing_ids = sorted(exercise_ids - durations.keys())
+    if missing_ids:
+        abort(
+            404,
+            message="Exercises not found: {}".format(", ".join(missing_ids)),
+            errors={"missing_exercises": missing_ids},
         )
-        training_stages.append(training_stage)
+
+    stages_documents = []
+    for stages in stages_lists:
+        training_stages = []
+        for stage in stages:
+            stage_exercises = [exercise["id"] for exercise in stage["exercises"]]
+            longest_duration = max(
+                (durations[exercise_id] for exercise_id in stage_exercises), default=0,
+            )
+
+            training_stage = Stage(
+                duration=longest_duration,
+                nb_exercises=len(stage_exercises),
+                exercises=stage_exercises,
+            )
+            training_stages.append(training_stage)
+        stages_documents.append(training_stages)
+
+    return stages_documents
+
+
+def fetch_stages_exercises(trainings) -> dict:
+    """Return the read models of the exercises of the trainings stages, sorted by id.
+
+    The exercises missing in the cache are fetched with a single query.
+    """
+    exercises = exercise_cache.get_many(
+        {
+            exercise_id
+            for training in trainings
+            for stage in training["stages"]
+            for exercise_id in stage["exercises"]
+        }
+    )
+    return dict(sorted(exercises.items()))
+
+
+def expand_stages(training, exercises: dict) -> list:
+    """ Return the stages of a training, their exercises ids replaced by read models."""
+    return [
+        {
+            "duration": stage["duration"],
+            "nb_exercises": stage["nb_exercises"],
+            "exercises": [
+                exercises.get(exercise_id, exercise_id)
+                for exercise_id in stage["exercises"]
+            ],
+        }
+        for stage in training["stages"]
+    ]
+
+
+def create_training(training: dict):
+    (training_stages,) = create_stages(training["stages"])
 
     return Training(
         category=training["category"],
@@ -142,19 +240,24 @@ class ApiTraining(MethodView):
         """Modify a training, return training in json"""
 
         logger.debug("Modify training id=%s", training_id)
-        logger.debug("data:")
-        logger.debug(str(post_data))
+        logger.debug("data: %s", post_data)
 
         new_training = create_training(post_data)
 
-        training = Training.objects.get_or_404(id=training_id).modify(
+        training = Training.objects.get_or_404(
+            id=training_id
+        )  # pylint: disable=no-member
+        category = training.category
+        training.modify(
             category=new_training.category,
             date_time=new_training.date_time,
             place=new_training.place,
             nb_stages=len(new_training.stages),
             stages=new_training.stages,
             tags=new_training.tags,
-        )  # pylint: disable=no-member"""
+            inc__version=1,
+        )
+        notify_training(MODIFIED, training, [category])
 
         return training
 
@@ -166,31 +269,69 @@ class ApiTraining(MethodView):
 
         logger.debug("Delete training id=%s", training_id)
 
-        Training.objects.get_or_404(
+        training = Training.objects.get_or_404(
             id=training_id
-        ).delete()  # pylint: disable=no-member"""
+        )  # pylint: disable=no-member
+        training.delete()
+        notify_training(DELETED, training)
 
         return {}
 
+    @bp.etag
+    @bp.arguments(TrainingExpandQuerySchema, location="query")
     @bp.response(TrainingSchema())
     @bp.doc(security=[{"bearerAuth": []}], responses={401: "UNAUTHORIZED"})
     # TODO: authentification
     # @jwt_required
-    def get(self, training_id):
-        """Get a training """
+    def get(self, args, training_id):
+        """Get a training
+        With expand=exercises, the stages exercises are inlined.
+        """
 
         logger.debug("Get training id=%s", training_id)
 
-        training = Training.objects.get_or_404(
-            id=ObjectId(training_id)
-        )  # pylint: disable=no-member"""
+        if args.get("expand") == "exercises":
+            training = fetch_one_or_404(
+                Training.objects(id=ObjectId(training_id))  # pylint: disable=no-member
+            )
+            exercises = fetch_stages_exercises([training])
+            bp.set_etag(etag_data([training] + list(exercises.values())))
+
+            return {
+                "category": training["category"],
+                "date_time": training["date_time"],
+                "place": training["place"],
+                "nb_stages": training["nb_stages"],
+                "stages": expand_stages(training, exercises),
+                "tags": training["tags"],
+            }
+
+        # check the ETag from the training version before loading the training
+        version = fetch_one_or_404(
+            Training.objects(  # pylint: disable=no-member
+                id=ObjectId(training_id)
+            ).only("version")
+        )
+        bp.set_etag(etag_data([version]))
+
+        training = fetch_one_or_404(
+            Training.objects(id=ObjectId(training_id))  # pylint: disable=no-member
+        )
 
         return training
 
 
-class GetTrainingListQuerySchema(DatetimeRangeQuerySchema):
+class GetTrainingListQuerySchema(
+    DatetimeRangeQuerySchema, KeysetPaginationQuerySchema, TrainingExpandQuerySchema
+):
     # Training category
     category = Str(description="The training category", example="18U", default="18U")
+    # page size, bounded to keep the memory used per request under control
+    page_size = Int(
+        missing=TRAINING_LIST_PAGE_SIZE,
+        validate=Range(min=1, max=TRAINING_LIST_MAX_PAGE_SIZE),
+        description="The page size",
+    )
 
 
 class ResumedTrainingSchema(Schema):
@@ -208,6 +349,12 @@ class ResumedTrainingSchema(Schema):
     place = Str(
         required=True, description="The training place", example="Hawks Stadium"
     )
+    # the list of stages, only with expand=exercises
+    stages = List(Nested(StageSchema), attribute="expanded_stages", data_key="stages")
+
+
+# document fields needed to dump a ResumedTrainingSchema, stages not expanded
+RESUMED_TRAINING_FIELDS = schema_projection(ResumedTrainingSchema(exclude=["stages"]))
 
 
 @bp.route("")
@@ -224,13 +371,14 @@ class ApiNewTraining(MethodView):
     def put(self, put_data):
         """Create a new  training, return training in json"""
         logger.debug("Create a new training")
-        logger.debug("data:")
-        logger.debug(str(put_data))
+        logger.debug("data: %s", put_data)
 
         training = create_training(put_data)
         training.save()
+        notify_training(CREATED, training)
         return training
 
+    @bp.etag
     @bp.arguments(GetTrainingListQuerySchema(), location="query")
     @bp.response(
         ResumedTrainingSchema(many=True), description="The next trainings list in json",
@@ -239,10 +387,13 @@ class ApiNewTraining(MethodView):
     # TODO: authentification
     # @jwt_required
     def get(self, args):
-        """get training list"""
+        """get training list
+        Pages are selected with page/page_size, or with the cursor returned in
+        the X-Next-Cursor header of the previous page, faster for the far
+        pages.
+        """
         logger.debug("Get list of trainings")
-        logger.debug("args:")
-        logger.debug(str(args))
+        logger.debug("args: %s", args)
 
         queries = []
 
@@ -264,7 +415,38 @@ class ApiNewTraining(MethodView):
         elif len(queries) >= 2:
             query = reduce(lambda q1, q2: q1 & q2, queries)
 
-        return Training.objects(query)  # pylint: disable=no-member
+        expand = args.get("expand") == "exercises"
+        trainings = Training.objects(query).only(  # pylint: disable=no-member
+            *RESUMED_TRAINING_FIELDS, "version", *(["stages"] if expand else [])
+        )
+
+        all_series = fetch_series(
+            args["category"], to_utc(args["start"]), to_utc(args["end"])
+        )
+
+        # keyset pagination served by the (category, date_time, _id) index
+        items, headers = paginate_trainings(trainings, all_series, args)
+
+        if expand:
+            # all the exercises of the page are fetched with a single query
+            exercises = fetch_stages_exercises(items)
+            bp.set_etag(etag_data(items + list(exercises.values()), headers))
+            return (
+                [
+                    {
+                        "category": item["category"],
+                        "date_time": item["date_time"],
+                        "place": item["place"],
+                        "expanded_stages": expand_stages(item, exercises),
+                    }
+                    for item in items
+                ],
+                headers,
+            )
+
+        bp.set_etag(etag_data(items, headers))
+
+        return items, headers
 
 
 class NexTrainingSchema(Schema):
@@ -286,24 +468,113 @@ class ApiNextTraining(MethodView):
     def get(self, args):
         """get next training"""
         logger.debug("Get next training")
-        logger.debug("args:")
-        logger.debug(str(args))
+        logger.debug("args: %s", args)
 
         now = datetime.now(timezone.utc)
-        query = Q(date_time__gte=now)
-
-        trainings = Training.objects(query)  # pylint: disable=no-member
-
-        next_training_date = None
-        next_training = None
-        for training in trainings:
-            if training["date_time"].astimezone(timezone.utc) > now:
-                if training["category"] == args["category"]:
-                    if next_training is None:
-                        next_training = training
-                        next_training_date = training["date_time"]
-                    elif training["date_time"] < next_training_date:
-                        next_training = training
-                        next_training_date = training["date_time"]
-
-        return next_training
+
+        # served by the (category, date_time) index
+        next_training = fetch_first(
+            Training.objects(  # pylint: disable=no-member
+                category=args["category"], date_time__gt=now
+            )
+            .only(*RESUMED_TRAINING_FIELDS)
+            .order_by("date_time")
+        )
+        next_occurrence = next(
+            iter_occurrences(
+                fetch_series(args["category"], to_utc(now)), to_utc(now) + MILLISECOND
+            ),
+            None,
+        )
+
+        return min(
+            [item for item in (next_training, next_occurrence) if item is not None],
+            key=sort_key,
+            default=None,
+        )
+
+
+class StageExportSchema(Schema):
+    """ Schema for exported Stage """
+
+    # Stage duration in minutes
+    duration = Int(description="The stage duration in minutes", example=30)
+    # number of exercises in the stage
+    nb_exercises = Int(description="Number of exercises in the stage", example=4)
+    # exercises ids
+    exercises = List(Str(), example=["507f1f77bcf86cd799439011"])
+
+
+class TrainingExportSchema(Schema):
+    """ Schema for exported Training """
+
+    # training id
+    _id = Str(data_key="id", attribute="id")
+    # series id, for the occurrences of a training series
+    series = Str(description="The training series id", example=None)
+    # Training category
+    category = Str(description="The training category", example="15U")
+    # Training  datetime
+    date_time = DateTime(
+        description="The training datetime", example="2020-04-01T08:06:47.890Z",
+    )
+    # Training place
+    place = Str(description="The training place", example="Hawks Stadium")
+    # number of stages
+    nb_stages = Int(description="Number of stages in the training", example=1)
+    # the list of stages
+    stages = List(Nested(StageExportSchema))
+    # tags
+    tags = List(Str())
+
+
+class TrainingExportQuerySchema(DatetimeRangeQuerySchema, ExportQuerySchema):
+    # Training category
+    category = Str(description="The training category", required=True, example="18U")
+
+
+@bp.route("/export")
+class ApiTrainingExport(MethodView):
+    @bp.arguments(TrainingExportQuerySchema(), location="query")
+    @bp.doc(
+        security=[{"bearerAuth": []}],
+        responses={
+            200: {
+                "description": "The trainings, as newline delimited JSON or CSV",
+                "content": {
+                    EXPORT_MIMETYPES["ndjson"]: {"schema": TrainingExportSchema},
+                    EXPORT_MIMETYPES["csv"]: {"schema": {"type": "string"}},
+                },
+            },
+            401: "UNAUTHORIZED",
+        },
+    )
+    # TODO: authentification
+    # @jwt_required
+    def get(self, args):  # pylint: disable=no-self-use
+        """Export the trainings
+        The trainings of the datetimes range, series occurrences included, are
+        streamed sorted by datetime while they are read from the database.
+        """
+        logger.debug("Export trainings, args: %s", args)
+        start, end = to_utc(args["start"]), to_utc(args["end"])
+
+        # served by the (category, date_time, _id) index, read by batches
+        trainings = (
+            Training.objects(  # pylint: disable=no-member
+                category=args["category"], date_time__gte=start, date_time__lt=end
+            )
+            .order_by("date_time", "id")
+            .no_cache()
+            .batch_size(current_app.config["EXPORT_BATCH_SIZE"])
+            .as_pymongo()
+        )
+        items = heapq.merge(
+            (to_read_model(Training, raw) for raw in trainings),
+            iter_occurrences(fetch_series(args["category"], start, end), start, end),
+            key=sort_key,
+        )
+
+        return export_response(
+            items, TrainingExportSchema(), args["format"], "trainings"
+        )
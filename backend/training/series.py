@@ -0,0 +1,361 @@
+""" Training series occurrences expansion.
+
+The series are stored once with their recurrence rule, their occurrences are
+expanded on read, only inside the requested datetimes window. The functions
+work on the series read models (see backend.model.read_model), occurrences
+are returned as training read models.
+
+Occurrences repeat at the same UTC time.
+"""
+import heapq
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+
+from bson.errors import InvalidId
+from bson.objectid import ObjectId
+from flask import current_app
+from flask_smorest import abort
+from mongoengine.queryset.visitor import Q
+
+from backend.apihelpers import (
+    NEXT_CURSOR_HEADER,
+    check_cursor,
+    encode_cursor,
+    pagination_headers,
+)
+from backend.model.data_model import TrainingSeries
+from backend.model.read_model import fetch, iter_fetch, to_read_model
+
+WEEKLY = "WEEKLY"
+DAILY = "DAILY"
+
+# smallest datetime step stored by mongo
+MILLISECOND = timedelta(milliseconds=1)
+
+# fields of an occurrence which can be overridden
+OVERRIDDEN_FIELDS = ["date_time", "place", "stages", "tags"]
+
+
+def to_utc(date_time: datetime) -> datetime:
+    """ Return a datetime as stored by mongo: naive UTC, truncated to milliseconds."""
+    if date_time.tzinfo is not None:
+        date_time = date_time.astimezone(timezone.utc).replace(tzinfo=None)
+    return date_time.replace(microsecond=date_time.microsecond // 1000 * 1000)
+
+
+def sort_key(training):
+    """ Key of the trainings and occurrences sorted by datetime and id."""
+    return training["date_time"], str(training["id"])
+
+
+def iter_occurrence_dates(series: dict, start: datetime, end: datetime = None):
+    """Yield the datetimes of the occurrences of the recurrence rule in [start, end).
+
+    The exceptions and overrides of the series are not applied.
+    """
+    recurrence = series["recurrence"]
+    interval = recurrence.get("interval") or 1
+    first = series["date_time"]
+    last = series.get("last_occurrence")
+    by_weekday = set(recurrence.get("by_weekday") or [])
+
+    if recurrence["freq"] == WEEKLY:
+        period = timedelta(weeks=interval)
+        base = first - timedelta(days=first.weekday())
+        offsets = [
+            timedelta(days=day) for day in sorted(by_weekday or [first.weekday()])
+        ]
+        by_weekday = None
+    else:
+        # every 7*n days, the occurrences all fall on the first one's week day
+        if by_weekday and interval % 7 == 0 and first.weekday() not in by_weekday:
+            return
+        period = timedelta(days=interval)
+        base = first
+        offsets = [timedelta()]
+
+    # skip the periods before the window
+    period_index = max(0, (start - base - offsets[-1]) // period)
+    while True:
+        period_start = base + period_index * period
+        for offset in offsets:
+            date_time = period_start + offset
+            if (end is not None and date_time >= end) or (
+                last is not None and date_time > last
+            ):
+                return
+            if date_time < first or date_time < start:
+                continue
+            if by_weekday and date_time.weekday() not in by_weekday:
+                continue
+            yield date_time
+        period_index += 1
+
+
+def count_steps(
+    origin: datetime, period: timedelta, low: datetime, high: datetime
+) -> int:
+    """ Return the number of datetimes origin + i * period in [low, high), i >= 0."""
+    first_index = max(0, -((origin - low) // period))
+    return max(0, -((origin - high) // period) - first_index)
+
+
+def count_occurrence_dates(series: dict, start: datetime, end: datetime) -> int:
+    """Return the number of datetimes of the recurrence rule in [start, end),
+    computed from the rule instead of iterating over them.
+
+    The exceptions and overrides of the series are not applied.
+    """
+    recurrence = series["recurrence"]
+    interval = recurrence.get("interval") or 1
+    first = series["date_time"]
+    last = series.get("last_occurrence")
+    by_weekday = set(recurrence.get("by_weekday") or [])
+    low = max(first, start)
+    high = end if last is None else min(end, last + MILLISECOND)
+    if low >= high:
+        return 0
+
+    if recurrence["freq"] == WEEKLY:
+        period = timedelta(weeks=interval)
+        base = first - timedelta(days=first.weekday())
+        return sum(
+            count_steps(base + timedelta(days=day), period, low, high)
+            for day in by_weekday or {first.weekday()}
+        )
+
+    period = timedelta(days=interval)
+    if not by_weekday or interval % 7 == 0:
+        # every 7*n days, the occurrences all fall on the first one's week day
+        if by_weekday and first.weekday() not in by_weekday:
+            return 0
+        return count_steps(first, period, low, high)
+
+    # the occurrences week days cycle every 7 periods
+    first_index = max(0, -((first - low) // period))
+    count = count_steps(first, period, low, high)
+    cycles = count // 7
+    return cycles * len(by_weekday) + sum(
+        1
+        for index in range(first_index + cycles * 7, first_index + count)
+        if (first + index * period).weekday() in by_weekday
+    )
+
+
+def count_series_occurrences(series: dict, start: datetime, end: datetime) -> int:
+    """ Return the number of occurrences of a series in [start, end)."""
+    exceptions = set(series["exceptions"])
+    overrides = {
+        override["original_date_time"]: override for override in series["overrides"]
+    }
+    moved = [
+        override.get("date_time") or date_time
+        for date_time, override in overrides.items()
+        if date_time not in exceptions
+    ]
+    removed = exceptions | overrides.keys()
+    return (
+        count_occurrence_dates(series, start, end)
+        - sum(
+            1
+            for date_time in removed
+            if start <= date_time < end and is_occurrence(series, date_time)
+        )
+        + sum(1 for date_time in moved if start <= date_time < end)
+    )
+
+
+def is_occurrence(series: dict, date_time: datetime) -> bool:
+    """ Check if a datetime is an occurrence of the recurrence rule."""
+    return any(iter_occurrence_dates(series, date_time, date_time + MILLISECOND))
+
+
+def compute_bounds(series: dict):
+    """Return the last occurrence of the recurrence rule and the datetimes range
+    of the occurrences, overrides included. Endless series have no last datetime.
+    """
+    recurrence = series["recurrence"]
+    last_occurrence = recurrence.get("until")
+    if recurrence.get("count"):
+        occurrence_dates = list(
+            islice(
+                iter_occurrence_dates(
+                    dict(series, last_occurrence=last_occurrence), series["date_time"]
+                ),
+                recurrence["count"],
+            )
+        )
+        if occurrence_dates:
+            last_occurrence = occurrence_dates[-1]
+
+    moved = [
+        override["date_time"]
+        for override in series["overrides"]
+        if override.get("date_time")
+    ]
+    first_date_time = min([series["date_time"]] + moved)
+    last_date_time = None if last_occurrence is None else max([last_occurrence] + moved)
+    return last_occurrence, first_date_time, last_date_time
+
+
+def occurrence_id(series: dict, date_time: datetime) -> str:
+    """Return the id of an occurrence.
+
+    It starts with the series id so that the occurrences and trainings ids
+    sort the same way as strings and as ObjectIds.
+    """
+    return "{}-{:%Y%m%dT%H%M%S}".format(series["id"], date_time)
+
+
+def occurrence(series: dict, date_time: datetime, override: dict = None) -> dict:
+    """ Return the training read model of an occurrence."""
+    training = {
+        "id": occurrence_id(series, date_time),
+        "series": str(series["id"]),
+        "category": series["category"],
+        "date_time": date_time,
+        "place": series["place"],
+        "nb_stages": series["nb_stages"],
+        "stages": series["stages"],
+        "tags": series["tags"],
+        "version": series["version"],
+    }
+    if override:
+        for field in OVERRIDDEN_FIELDS:
+            if override.get(field):
+                training[field] = override[field]
+        training["nb_stages"] = len(training["stages"])
+    return training
+
+
+def iter_series_occurrences(series: dict, start: datetime, end: datetime = None):
+    """ Yield the occurrences of a series in [start, end), sorted."""
+    exceptions = set(series["exceptions"])
+    overrides = {
+        override["original_date_time"]: override for override in series["overrides"]
+    }
+
+    natural = (
+        occurrence(series, date_time)
+        for date_time in iter_occurrence_dates(series, start, end)
+        if date_time not in exceptions and date_time not in overrides
+    )
+    overridden = sorted(
+        (
+            training
+            for training in (
+                occurrence(series, date_time, override)
+                for date_time, override in overrides.items()
+                if date_time not in exceptions
+            )
+            if start <= training["date_time"]
+            and (end is None or training["date_time"] < end)
+        ),
+        key=sort_key,
+    )
+    return heapq.merge(natural, overridden, key=sort_key)
+
+
+def iter_occurrences(all_series, start: datetime, end: datetime = None):
+    """ Yield the occurrences of all the series in [start, end), sorted."""
+    return heapq.merge(
+        *[iter_series_occurrences(series, start, end) for series in all_series],
+        key=sort_key,
+    )
+
+
+def iter_after(items, after: list):
+    """ Yield the sorted items placed after a (date_time, id) cursor."""
+    after = (to_utc(after[0]), after[1])
+    for item in items:
+        if sort_key(item) > after:
+            yield item
+
+
+def after_filter(after: list) -> dict:
+    """ Return the raw query selecting the trainings placed after a cursor."""
+    after_date_time, after_id = to_utc(after[0]), ObjectId(after[1][:24])
+    return {
+        "$or": [
+            {"date_time": {"$gt": after_date_time}},
+            {"date_time": after_date_time, "_id": {"$gt": after_id}},
+        ]
+    }
+
+
+def fetch_series(category: str, start: datetime, end: datetime = None) -> list:
+    """Return the read models of the series with occurrences in [start, end).
+
+    The series of all the categories are returned if category is None.
+    """
+    query = Q(last_date_time=None) | Q(last_date_time__gte=start)
+    if category is not None:
+        query &= Q(category=category)
+    if end is not None:
+        query &= Q(first_date_time__lt=end)
+
+    all_series = TrainingSeries.objects(query)  # pylint: disable=no-member
+    return [to_read_model(TrainingSeries, raw) for raw in all_series.as_pymongo()]
+
+
+def paginate_trainings(trainings, all_series: list, args: dict):
+    """Paginate the trainings merged with the occurrences of the series.
+
+    Items are sorted on (date_time, id), the page is selected with
+    page/page_size or with the cursor of the previous page, as in
+    backend.apihelpers.paginate_keyset. With series, the pages selected with
+    page/page_size are merged from the first item: the trainings are read by
+    batches and only the page is kept in memory, but the read time grows with
+    the page number. The cursor reads from the previous page.
+    """
+    page_size = args["page_size"]
+    start, end = to_utc(args["start"]), to_utc(args["end"])
+    headers = {}
+    skip = 0
+
+    trainings = trainings.order_by("date_time", "id")
+    if "after" in args:
+        check_cursor(args["after"], [datetime, str])
+        try:
+            trainings = trainings.filter(__raw__=after_filter(args["after"]))
+        except InvalidId:
+            abort(422, errors={"query": {"after": ["Invalid cursor."]}})
+        occurrences = iter_after(
+            iter_occurrences(all_series, max(start, to_utc(args["after"][0])), end),
+            args["after"],
+        )
+    else:
+        skip = (args["page"] - 1) * page_size
+        occurrences = iter_occurrences(all_series, start, end)
+        if args["count"]:
+            item_count = trainings.count() + sum(
+                count_series_occurrences(series, start, end) for series in all_series
+            )
+            headers.update(pagination_headers(args["page"], page_size, item_count))
+
+    # fetch one more item to know if there is a next page
+    if all_series:
+        # the skipped items are merged from the first one, and dropped as the
+        # trainings are read by batches
+        items = list(
+            islice(
+                heapq.merge(
+                    iter_fetch(
+                        trainings.limit(skip + page_size + 1),
+                        current_app.config["EXPORT_BATCH_SIZE"],
+                    ),
+                    occurrences,
+                    key=sort_key,
+                ),
+                skip,
+                skip + page_size + 1,
+            )
+        )
+    else:
+        items = fetch(trainings.skip(skip).limit(page_size + 1))
+
+    if len(items) > page_size:
+        items = items[:page_size]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(list(sort_key(items[-1])))
+
+    return items, headers
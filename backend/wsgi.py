@@ -0,0 +1,8 @@
+""" WSGI entry point of the production server.
+
+Run with gunicorn and its configuration (see gunicorn.conf.py):
+    CONFIG=base_config.yml gunicorn backend.wsgi:app
+"""
+from backend.app import create_app
+
+app = create_app()
@@ -0,0 +1,30 @@
+""" Gunicorn configuration of the production server (gunicorn extra).
+
+Loaded by default by gunicorn from the working directory:
+    CONFIG=base_config.yml gunicorn backend.wsgi:app
+"""
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+
+# gevent workers with websocket support: each worker serves many concurrent
+# long-polling and websocket clients.
+# Socket.IO long-polling needs sticky sessions: with more than one worker, a
+# sticky load balancer and a SOCKETIO_MESSAGE_QUEUE are required.
+worker_class = "geventwebsocket.gunicorn.workers.GeventWebSocketWorker"
+workers = int(os.getenv("GUNICORN_WORKERS", "1"))
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "1000"))
+
+# the app is loaded in each worker, after the fork: the gevent worker first
+# monkey-patches the standard library, so that the sockets, locks and queues
+# used by pymongo and socketio cooperate with greenlets. The configuration does
+# not patch it, the gunicorn master has already imported ssl and threading.
+preload_app = False
+
+# long-polling requests are held open up to the socketio ping interval
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = "-"
+errorlog = "-"
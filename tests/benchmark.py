@@ -0,0 +1,408 @@
+"""API benchmark on a large generated dataset.
+
+Seeds the configured database with the tests generators, then measures the
+latency percentiles and the throughput of the trainings endpoints through the
+Flask test client. The results are written as JSON, to compare the runs.
+
+The write requests only modify the trainings created by the benchmark, tagged
+"benchmark" and deleted after the run: the seeded dataset is left unchanged
+for the --no-seed runs.
+
+    CONFIG=tests/base_test_config.yml python -m tests.benchmark \
+        --exercises 10000 --trainings 200000 --output bench.json
+
+WARNING: the collections of the configured database are dropped.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from bson.objectid import ObjectId
+from pymongo import MongoClient, monitoring
+
+from backend.app import create_app
+from backend.config import load_config_as_object
+from tests.fill_date_base import create_exercise, create_stage, create_training
+
+SECTIONS = ["infield", "outfield", "pitching", "catching", "batting"]
+PLACES = ["Hawks Stadium", "Chateau Giron", "Cesson"]
+# the trainings dates are spread over this number of days around today
+DAYS_SPREAD = 365
+# documents inserted per query when seeding
+SEED_BATCH_SIZE = 5000
+# requests not measured, per endpoint
+WARMUP_REQUESTS = 10
+# tag of the trainings created by the benchmark
+BENCHMARK_TAG = "benchmark"
+# trainings created for the modify requests
+MODIFIED_TRAININGS = 100
+PERCENTILES = [50, 90, 95, 99]
+# explained query commands
+EXPLAINED_COMMANDS = {"find", "aggregate", "count"}
+# fields of the sent commands not accepted by the explain command
+SESSION_FIELDS = {"lsid", "$db", "$clusterTime", "$readPreference", "txnNumber"}
+
+
+def parse_args(argv=None):
+    """ Parse the command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark the API on a generated dataset."
+    )
+    parser.add_argument("--exercises", type=int, default=10000)
+    parser.add_argument("--trainings", type=int, default=200000)
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument(
+        "--requests", type=int, default=200, help="measured requests per endpoint"
+    )
+    parser.add_argument(
+        "--raw-reads",
+        action="store_true",
+        help="serve the reads from the raw documents (RAW_READS)",
+    )
+    parser.add_argument(
+        "--no-seed",
+        action="store_true",
+        help="reuse the database seeded with the same volumes",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="random generator seed")
+    parser.add_argument(
+        "--explain",
+        action="store_true",
+        help="add the execution stats of the queries of one request per endpoint",
+    )
+    parser.add_argument("--output", help="results JSON file, stdout by default")
+    return parser.parse_args(argv)
+
+
+def category_name(index: int) -> str:
+    """ Return the name of a generated category."""
+    return "{}U".format(index + 1)
+
+
+def object_id(prefix: int, index: int) -> str:
+    """ Return a deterministic ObjectId string."""
+    return "{:02x}{:022x}".format(prefix, index)
+
+
+def reference_date() -> datetime:
+    """ Return the date the trainings are generated around."""
+    return datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def random_stages(rng: random.Random, exercises: list) -> list:
+    """ Return 1 to 3 stages of 2 to 5 exercises."""
+    return [
+        create_stage(exercises=rng.sample(exercises, rng.randint(2, 5)))
+        for _ in range(rng.randint(1, 3))
+    ]
+
+
+def seed(database, args, rng: random.Random):
+    """ Drop and fill the exercises and trainings collections."""
+    for name in database.list_collection_names():
+        database[name].drop()
+
+    exercises = []
+    for index in range(args.exercises):
+        exercise = create_exercise(
+            object_id(1, index), section=SECTIONS[index % len(SECTIONS)]
+        )
+        exercise["name"] = "exercise {}".format(index)
+        exercise["dificulty"] = rng.randint(0, 5)
+        exercise["duration"] = rng.choice([10, 15, 20, 30, 45])
+        exercises.append(exercise)
+    for start in range(0, len(exercises), SEED_BATCH_SIZE):
+        database["exercise"].insert_many(
+            exercises[start : start + SEED_BATCH_SIZE], ordered=False
+        )
+
+    reference = reference_date()
+    batch = []
+    for index in range(args.trainings):
+        training = create_training(
+            stages=random_stages(rng, exercises),
+            date_time=reference
+            + timedelta(minutes=rng.randint(-DAYS_SPREAD * 1440, DAYS_SPREAD * 1440)),
+            category=category_name(index % args.categories),
+            place=rng.choice(PLACES),
+        )
+        training["_id"] = ObjectId(object_id(2, index))
+        batch.append(training)
+        if len(batch) == SEED_BATCH_SIZE:
+            database["training"].insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        database["training"].insert_many(batch, ordered=False)
+
+    return exercises
+
+
+def training_json(rng: random.Random, args, exercises: list) -> dict:
+    """ Return a random training, as sent to the API."""
+    stages = random_stages(rng, exercises)
+    return {
+        "category": category_name(rng.randrange(args.categories)),
+        "date_time": (
+            reference_date() + timedelta(days=rng.randint(-DAYS_SPREAD, DAYS_SPREAD))
+        ).isoformat(),
+        "place": rng.choice(PLACES),
+        "nb_stages": len(stages),
+        "tags": [BENCHMARK_TAG],
+        "stages": [
+            {
+                "nb_exercises": stage["nb_exercises"],
+                "exercises": [
+                    {"id": exercise_id} for exercise_id in stage["exercises"]
+                ],
+            }
+            for stage in stages
+        ],
+    }
+
+
+def create_modified_trainings(database, rng: random.Random, exercises: list):
+    """ Insert the trainings updated by the modify requests."""
+    trainings = []
+    for index in range(MODIFIED_TRAININGS):
+        training = create_training(
+            stages=random_stages(rng, exercises), date_time=reference_date()
+        )
+        training["_id"] = ObjectId(object_id(3, index))
+        training["tags"] = [BENCHMARK_TAG]
+        trainings.append(training)
+    database["training"].insert_many(trainings)
+
+
+def remove_created_trainings(database):
+    """ Delete the trainings created by the benchmark."""
+    database["training"].delete_many({"tags": BENCHMARK_TAG})
+
+
+def endpoints(args, rng: random.Random, exercises: list) -> dict:
+    """Return the benchmarked endpoints, as functions running one request with
+    the test client.
+    """
+    reference = reference_date()
+
+    def training_id():
+        return object_id(2, rng.randrange(args.trainings))
+
+    def list_trainings(client):
+        start = reference + timedelta(days=rng.randint(-DAYS_SPREAD, DAYS_SPREAD))
+        return client.get(
+            "/api/v1/trainings",
+            query_string={
+                "category": category_name(rng.randrange(args.categories)),
+                "start": start.isoformat(),
+                "end": (start + timedelta(days=30)).isoformat(),
+            },
+        )
+
+    def next_training(client):
+        return client.get(
+            "/api/v1/trainings/next",
+            query_string={"category": category_name(rng.randrange(args.categories))},
+        )
+
+    def get_training(client):
+        return client.get("/api/v1/trainings/" + training_id())
+
+    def create(client):
+        return client.put("/api/v1/trainings", json=training_json(rng, args, exercises))
+
+    def modify(client):
+        return client.post(
+            "/api/v1/trainings/" + object_id(3, rng.randrange(MODIFIED_TRAININGS)),
+            json=training_json(rng, args, exercises),
+        )
+
+    return {
+        "list": list_trainings,
+        "next": next_training,
+        "get": get_training,
+        "create": create,
+        "modify": modify,
+    }
+
+
+class QueryRecorder(monitoring.CommandListener):
+    """ Record the query commands sent while recording, to explain them."""
+
+    def __init__(self):
+        # recorded commands, None when not recording
+        self.commands = None
+
+    def started(self, event):
+        if self.commands is not None and event.command_name in EXPLAINED_COMMANDS:
+            self.commands.append(
+                {
+                    key: value
+                    for key, value in event.command.items()
+                    if key not in SESSION_FIELDS
+                }
+            )
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def plan_summary(plan: dict) -> list:
+    """ Return the stages of a plan, with their index if any."""
+    stages = [
+        plan["stage"]
+        + ("({})".format(plan["indexName"]) if "indexName" in plan else "")
+    ]
+    for input_plan in [plan.get("inputStage")] + plan.get("inputStages", []):
+        if input_plan:
+            stages += plan_summary(input_plan)
+    return stages
+
+
+def explain(client, request, recorder: QueryRecorder, database) -> list:
+    """Run an endpoint request, return the winning plans and execution stats of
+    its queries.
+    """
+    recorder.commands = []
+    request(client)
+    commands, recorder.commands = recorder.commands, None
+
+    explained = []
+    for command in commands:
+        result = database.command("explain", command, verbosity="executionStats")
+        stats = result["executionStats"]
+        explained.append(
+            {
+                "command": next(iter(command)),
+                "plan": plan_summary(result["queryPlanner"]["winningPlan"]),
+                "returned": stats["nReturned"],
+                "keys_examined": stats["totalKeysExamined"],
+                "docs_examined": stats["totalDocsExamined"],
+                "time_ms": stats["executionTimeMillis"],
+            }
+        )
+    return explained
+
+
+def percentile(latencies: list, rank: int) -> float:
+    """ Return a percentile of sorted latencies (nearest rank)."""
+    index = max(0, -(-len(latencies) * rank // 100) - 1)
+    return latencies[index]
+
+
+def measure(client, request, nb_requests: int) -> dict:
+    """ Run an endpoint requests, return its latencies stats in milliseconds."""
+    for _ in range(WARMUP_REQUESTS):
+        request(client)
+
+    latencies = []
+    errors = 0
+    start = time.perf_counter()
+    for _ in range(nb_requests):
+        request_start = time.perf_counter()
+        response = request(client)
+        latencies.append((time.perf_counter() - request_start) * 1000)
+        if response.status_code >= 400:
+            errors += 1
+    duration = time.perf_counter() - start
+
+    latencies.sort()
+    stats = {
+        "requests": nb_requests,
+        "errors": errors,
+        "throughput_rps": nb_requests / duration if duration else None,
+        "mean_ms": sum(latencies) / len(latencies) if latencies else None,
+        "max_ms": latencies[-1] if latencies else None,
+    }
+    for rank in PERCENTILES:
+        stats["p{}_ms".format(rank)] = (
+            percentile(latencies, rank) if latencies else None
+        )
+    return stats
+
+
+def main(argv=None):
+    """ Seed the database, run the benchmark and write the results."""
+    args = parse_args(argv)
+    rng = random.Random(args.seed)
+
+    conf = load_config_as_object(os.getenv("CONFIG", "tests/base_test_config.yml"))
+    conf.RAW_READS = args.raw_reads
+    database = MongoClient(conf.MONGODB_SETTINGS["host"]).get_database()
+
+    seed_start = time.perf_counter()
+    if args.no_seed:
+        exercises = [
+            {"_id": exercise["_id"]}
+            for exercise in database["exercise"].find({}, {"_id": 1})
+        ]
+    else:
+        exercises = seed(database, args, rng)
+    seed_duration = time.perf_counter() - seed_start
+
+    # the requests logs would be measured
+    for name in ("backend", "socketio", "engineio", "werkzeug"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    # listener of the app MongoClient, created by create_app
+    recorder = QueryRecorder()
+    monitoring.register(recorder)
+    app = create_app(conf)
+    client = app.test_client()
+
+    # the requests are the same with or without seeding, and the trainings
+    # left by an interrupted run are removed
+    rng = random.Random(args.seed)
+    remove_created_trainings(database)
+    create_modified_trainings(database, rng, exercises)
+    try:
+        requests = endpoints(args, rng, exercises)
+        results = {
+            name: measure(client, request, args.requests)
+            for name, request in requests.items()
+        }
+        # explained after the measures, not to change their requests
+        plans = (
+            {
+                name: explain(client, request, recorder, database)
+                for name, request in requests.items()
+            }
+            if args.explain
+            else None
+        )
+    finally:
+        remove_created_trainings(database)
+
+    report = {
+        "date": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "parameters": {
+            "exercises": args.exercises,
+            "trainings": args.trainings,
+            "categories": args.categories,
+            "requests": args.requests,
+            "raw_reads": args.raw_reads,
+            "seed": args.seed,
+        },
+        "seed_seconds": None if args.no_seed else seed_duration,
+        "results": results,
+        "plans": plans,
+    }
+
+    if args.output:
+        with open(args.output, "w") as outfile:
+            json.dump(report, outfile, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
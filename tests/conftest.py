@@ -1,17 +1,21 @@
 import os
 import pytest
 import pickle
-from pymongo import MongoClient
+from pymongo import MongoClient, monitoring
 
 from backend.app import create_app
 from backend.extension import socketio
 
 # from config import configs, Config
 from backend.config import load_config_as_object, Struct
+from tests.query_budget import query_counter, query_budget as budget
 
 if "CONFIG" not in os.environ:
     os.environ["CONFIG"] = "tests/base_test_config.yml"
 
+# count the commands of the MongoDB clients created from now on
+monitoring.register(query_counter)
+
 
 @pytest.fixture(scope="module")
 def cfg() -> str:
@@ -46,6 +50,12 @@ def ws_client(app):
     ws_client.disconnect()
 
 
+@pytest.fixture
+def query_budget():
+    """Context manager asserting the MongoDB commands and bytes budget of a block"""
+    return budget
+
+
 @pytest.fixture
 def mongo(conf):
     """Setup a mongoDB client"""
@@ -55,4 +65,3 @@ def mongo(conf):
         mongo[name].drop()
 
     return mongo
-
@@ -1,21 +1,23 @@
+import json
 from bson.objectid import ObjectId
 from datetime import datetime
 
 
-def test_put_exercise(client, mongo):
+def test_put_exercise(client, mongo, query_budget):
 
     # Create a new exercise
-    response = client.put(
-        "/api/v1/exercises/create",
-        json={
-            "name": "backhand rolling",
-            "section": "infield",
-            "dificulty": 3,
-            "duration": 30,
-            "description": "hit backhand rollings",
-            "video": "https://www.youtube.com/watch?v=J-nK0fZV7-8",
-        },
-    )
+    with query_budget(commands=2):
+        response = client.put(
+            "/api/v1/exercises/create",
+            json={
+                "name": "backhand rolling",
+                "section": "infield",
+                "dificulty": 3,
+                "duration": 30,
+                "description": "hit backhand rollings",
+                "video": "https://www.youtube.com/watch?v=J-nK0fZV7-8",
+            },
+        )
 
     data = response.get_json()
     assert response.status_code == 200
@@ -53,7 +55,7 @@ def test_put_exercise_invalid(client, mongo):
     assert data["status"] == "Unprocessable Entity"
 
 
-def test_get_list(client, mongo):
+def test_get_list(client, mongo, query_budget):
     """Should return exercises with specific IDs"""
 
     # init the collection
@@ -66,7 +68,8 @@ def test_get_list(client, mongo):
     )
 
     # get all exercises
-    response = client.get("/api/v1/exercises")
+    with query_budget(commands=2):
+        response = client.get("/api/v1/exercises")
 
     assert response.status_code == 200
     assert len(response.get_json()) == 3
@@ -144,6 +147,45 @@ def test_get_list_paging(client, mongo):
 
     assert response.status_code == 200
     assert len(response.get_json()) == 5
+    assert json.loads(response.headers["X-Pagination"])["total"] == 21
+
+
+def test_get_list_paging_cursor(client, mongo):
+    """Should walk through the exercises with the next page cursor"""
+    # init the collection
+    mongo["exercise"].insert_many(
+        [
+            create_exercise("507f1f77bcf86cd7994390{:02d}".format(i))
+            for i in range(1, 13)
+        ]
+    )
+
+    response = client.get("/api/v1/exercises?page_size=5&count=false")
+
+    assert response.status_code == 200
+    assert "X-Pagination" not in response.headers
+    exercises = response.get_json()
+    assert len(exercises) == 5
+    assert exercises[0]["id"] == "507f1f77bcf86cd799439001"
+
+    ids = [exercise["id"] for exercise in exercises]
+    while "X-Next-Cursor" in response.headers:
+        response = client.get(
+            "/api/v1/exercises?page_size=5&after=" + response.headers["X-Next-Cursor"]
+        )
+        assert response.status_code == 200
+        assert "X-Pagination" not in response.headers
+        ids += [exercise["id"] for exercise in response.get_json()]
+
+    assert ids == ["507f1f77bcf86cd7994390{:02d}".format(i) for i in range(1, 13)]
+
+
+def test_get_list_paging_invalid_cursor(client, mongo):
+    """Should reject an invalid cursor"""
+
+    response = client.get("/api/v1/exercises?after=invalid")
+
+    assert response.status_code == 422
 
 
 def test_get_list_section(client, mongo):
@@ -171,7 +213,7 @@ def test_get_list_section(client, mongo):
     assert exercises[1]["section"] == "outfield"
 
 
-def test_get_exercise_by_id(client, mongo):
+def test_get_exercise_by_id(client, mongo, query_budget):
     """Should return exercise for an specific ID"""
 
     # init the collection
@@ -187,14 +229,42 @@ def test_get_exercise_by_id(client, mongo):
     )
 
     # get exercise
-    response = client.get("/api/v1/exercises/507f1f77bcf86cd799439013")
+    with query_budget(commands=1):
+        response = client.get("/api/v1/exercises/507f1f77bcf86cd799439013")
 
     assert response.status_code == 200
     exercise = response.get_json()
     assert exercise["id"] == "507f1f77bcf86cd799439013"
 
 
-def test_remove_exercise_by_id(client, mongo):
+def test_get_exercise_etag(client, mongo):
+    """Should return 304 for an unchanged exercise or exercises list"""
+
+    # init the collection
+    mongo["exercise"].insert_many(
+        [
+            create_exercise("507f1f77bcf86cd799439011", section="infield"),
+            create_exercise("507f1f77bcf86cd799439012", section="outfield"),
+        ]
+    )
+
+    for url in ["/api/v1/exercises/507f1f77bcf86cd799439012", "/api/v1/exercises"]:
+        response = client.get(url)
+        assert response.status_code == 200
+        etag = response.headers["ETag"]
+
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.data == b""
+
+    # the list changes when an exercise is deleted
+    response = client.delete("/api/v1/exercises/507f1f77bcf86cd799439011")
+    response = client.get("/api/v1/exercises", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.get_json()) == 1
+
+
+def test_remove_exercise_by_id(client, mongo, query_budget):
     """Should return exercise for an specific ID"""
 
     # init the collection
@@ -210,7 +280,8 @@ def test_remove_exercise_by_id(client, mongo):
     )
 
     # delete exercise
-    response = client.delete("/api/v1/exercises/507f1f77bcf86cd799439013")
+    with query_budget(commands=3):
+        response = client.delete("/api/v1/exercises/507f1f77bcf86cd799439013")
 
     assert response.status_code == 200
 
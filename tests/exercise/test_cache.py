@@ -0,0 +1,116 @@
+from bson.objectid import ObjectId
+
+from backend.cache import ExerciseCache
+from backend.extension import exercise_cache
+from tests.fill_date_base import create_exercise
+
+
+def fill_collection(mongo):
+    mongo["exercise"].insert_many(
+        [
+            create_exercise("507f1f77bcf86cd799439011", section="infield"),
+            create_exercise("507f1f77bcf86cd799439012", section="outfield"),
+            create_exercise("507f1f77bcf86cd799439013", section="pitching"),
+        ]
+    )
+
+
+def test_get_exercise_cached(client, mongo):
+    fill_collection(mongo)
+
+    response = client.get("/api/v1/exercises/507f1f77bcf86cd799439012")
+    assert response.status_code == 200
+    assert exercise_cache.stats()["misses"] == 1
+
+    # served from the cache, even if removed from mongo by another process
+    mongo["exercise"].delete_many({})
+    response = client.get("/api/v1/exercises/507f1f77bcf86cd799439012")
+    assert response.status_code == 200
+    assert response.get_json()["id"] == "507f1f77bcf86cd799439012"
+    assert exercise_cache.stats()["hits"] == 1
+
+
+def test_list_cached_invalidated_on_write(client, mongo):
+    fill_collection(mongo)
+
+    response = client.get("/api/v1/exercises")
+    assert len(response.get_json()) == 3
+    response = client.get("/api/v1/exercises")
+    assert len(response.get_json()) == 3
+    assert exercise_cache.stats()["hits"] == 1
+
+    # delete through the API invalidates the list
+    response = client.delete("/api/v1/exercises/507f1f77bcf86cd799439013")
+    assert response.status_code == 200
+    response = client.get("/api/v1/exercises")
+    assert len(response.get_json()) == 2
+
+    # create through the API invalidates the list
+    response = client.put(
+        "/api/v1/exercises/create",
+        json={
+            "name": "backhand rolling",
+            "section": "infield",
+            "dificulty": 3,
+            "duration": 30,
+            "description": "hit backhand rollings",
+            "video": "https://www.youtube.com/watch?v=J-nK0fZV7-8",
+        },
+    )
+    assert response.status_code == 200
+    response = client.get("/api/v1/exercises")
+    assert len(response.get_json()) == 3
+
+
+def test_cache_ttl_and_size(app, mongo):
+    fill_collection(mongo)
+    ids = [
+        "507f1f77bcf86cd799439011",
+        "507f1f77bcf86cd799439012",
+        "507f1f77bcf86cd799439013",
+    ]
+
+    with app.app_context():
+        # least recently used entries are evicted
+        exercise_cache.max_size = 2
+        assert len(exercise_cache.get_many(ids)) == 3
+        assert exercise_cache.stats()["size"] == 2
+        exercise_cache.get_many(ids[1:])
+        assert exercise_cache.stats()["hits"] == 2
+
+        # expired entries are fetched again
+        exercise_cache.clear()
+        exercise_cache.ttl = -1
+        exercise_cache.get_many(ids)
+        assert len(exercise_cache.get_many(ids)) == 3
+        assert exercise_cache.stats()["hits"] == 0
+        assert exercise_cache.stats()["misses"] == 6
+
+
+def test_cache_invalidated_by_other_process(app, mongo):
+    fill_collection(mongo)
+    ids = [
+        "507f1f77bcf86cd799439011",
+        "507f1f77bcf86cd799439012",
+        "507f1f77bcf86cd799439013",
+    ]
+    # the cache of another worker
+    other_cache = ExerciseCache()
+
+    with app.app_context():
+        exercise_cache.sync_interval = 0
+        exercise_cache.clear()
+        assert len(exercise_cache.get_many(ids)) == 3
+        assert len(exercise_cache.get_many(ids)) == 3
+        assert exercise_cache.stats()["hits"] == 3
+
+        # the invalidation of the other worker drops all the entries
+        mongo["exercise"].delete_one({"_id": ObjectId(ids[2])})
+        other_cache.invalidate(ids[2])
+        assert list(exercise_cache.get_many(ids)) == ids[:2]
+        assert exercise_cache.stats()["misses"] == 6
+
+        # its own invalidation only drops the exercise
+        exercise_cache.invalidate(ids[0])
+        exercise_cache.get_many(ids[:2])
+        assert exercise_cache.stats()["hits"] == 4
@@ -0,0 +1,38 @@
+from tests.fill_date_base import create_exercise
+
+
+def exercise_events(ws_client):
+    return [
+        event["args"][0]
+        for event in ws_client.get_received("/ws/v1")
+        if event["name"] == "exercise"
+    ]
+
+
+def test_exercise_events(client, ws_client, mongo):
+    mongo["exercise"].insert_one(create_exercise("507f1f77bcf86cd799439011"))
+
+    # not subscribed
+    client.delete("/api/v1/exercises/507f1f77bcf86cd799439011")
+    assert exercise_events(ws_client) == []
+
+    ws_client.emit("subscribe", {"exercises": True}, namespace="/ws/v1")
+    response = client.put(
+        "/api/v1/exercises/create",
+        json={
+            "name": "backhand rolling",
+            "section": "infield",
+            "dificulty": 3,
+            "duration": 30,
+            "description": "hit backhand rollings",
+            "video": "https://www.youtube.com/watch?v=J-nK0fZV7-8",
+        },
+    )
+    assert response.status_code == 200
+    exercise_id = response.get_json()["id"]
+    assert exercise_events(ws_client) == [
+        {"action": "created", "id": exercise_id, "section": "infield", "version": 0}
+    ]
+
+    client.delete("/api/v1/exercises/" + exercise_id)
+    assert [event["action"] for event in exercise_events(ws_client)] == ["deleted"]
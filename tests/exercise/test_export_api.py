@@ -0,0 +1,45 @@
+import csv
+import io
+import json
+
+from tests.fill_date_base import create_exercise
+
+
+def test_export_ndjson(client, mongo):
+    fill_cololections(mongo)
+    response = client.get("/api/v1/exercises/export?section=infield")
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    exercises = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert [exercise["id"] for exercise in exercises] == [
+        "507f1f77bcf86cd799439011",
+        "507f1f77bcf86cd799439013",
+    ]
+    assert exercises[0]["duration"] == 30
+
+
+def test_export_csv(client, mongo):
+    fill_cololections(mongo)
+    response = client.get("/api/v1/exercises/export?format=csv")
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/csv"
+    rows = list(csv.DictReader(io.StringIO(response.data.decode())))
+    assert [row["id"] for row in rows] == [
+        "507f1f77bcf86cd799439011",
+        "507f1f77bcf86cd799439012",
+        "507f1f77bcf86cd799439013",
+    ]
+    assert rows[1]["section"] == "outfield"
+    assert rows[1]["dificulty"] == "3"
+
+
+def fill_cololections(mongo):
+    mongo["exercise"].insert_many(
+        [
+            create_exercise("507f1f77bcf86cd799439011", section="infield"),
+            create_exercise("507f1f77bcf86cd799439012", section="outfield"),
+            create_exercise("507f1f77bcf86cd799439013", section="infield"),
+        ]
+    )
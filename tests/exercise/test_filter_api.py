@@ -0,0 +1,184 @@
+import urllib
+
+from bson import ObjectId
+
+from backend.apihelpers import encode_cursor
+from backend.exercise.api_exercise import EXERCISE_SORTS, filter_exercises
+from backend.model.data_model import Exercise
+from tests.fill_date_base import create_exercise
+
+
+def list_exercises(client, **params):
+    return client.get("/api/v1/exercises?" + urllib.parse.urlencode(params))
+
+
+def fill_exercises(mongo):
+    exercises = [
+        ("507f1f77bcf86cd799439011", "infield", 1, 15),
+        ("507f1f77bcf86cd799439012", "infield", 3, 30),
+        ("507f1f77bcf86cd799439013", "outfield", 3, 20),
+        ("507f1f77bcf86cd799439014", "infield", 5, 45),
+        ("507f1f77bcf86cd799439015", "infield", 3, 10),
+        ("507f1f77bcf86cd799439016", "infield", 2, 30),
+    ]
+    documents = []
+    for _id, section, dificulty, duration in exercises:
+        exercise = create_exercise(_id, section=section)
+        exercise.update(dificulty=dificulty, duration=duration)
+        documents.append(exercise)
+    mongo["exercise"].insert_many(documents)
+    # the collections are dropped between the tests, the explain plans need the
+    # indexes
+    Exercise.ensure_indexes()
+
+
+def ids(response):
+    return [exercise["id"][-2:] for exercise in response.get_json()]
+
+
+def index_names(plan):
+    """ Return the names of the indexes scanned by an explained plan."""
+    if isinstance(plan, dict):
+        names = [plan["indexName"]] if plan.get("stage") == "IXSCAN" else []
+        for value in plan.values():
+            names += index_names(value)
+        return names
+    if isinstance(plan, list):
+        return [name for value in plan for name in index_names(value)]
+    return []
+
+
+def test_filter_exercises(client, mongo):
+    fill_exercises(mongo)
+
+    response = list_exercises(client, section="infield", dificulty_min=2)
+    assert response.status_code == 200
+    assert ids(response) == ["12", "14", "15", "16"]
+
+    response = list_exercises(
+        client, section="infield", dificulty_max=3, duration_min=15, duration_max=30
+    )
+    assert response.status_code == 200
+    assert ids(response) == ["11", "12", "16"]
+
+    response = list_exercises(client, dificulty_min=3, dificulty_max=3)
+    assert response.status_code == 200
+    assert ids(response) == ["12", "13", "15"]
+
+    assert list_exercises(client, dificulty_min=4, dificulty_max=3).status_code == 422
+    assert list_exercises(client, duration_min=40, duration_max=30).status_code == 422
+    assert list_exercises(client, dificulty_max=6).status_code == 422
+
+
+def test_sort_exercises(client, mongo):
+    fill_exercises(mongo)
+
+    # the ties are sorted by id
+    response = list_exercises(client, section="infield", sort="dificulty")
+    assert response.status_code == 200
+    assert ids(response) == ["11", "16", "12", "15", "14"]
+
+    # the ties of the descending sorts are sorted by descending id
+    response = list_exercises(client, section="infield", sort="-dificulty")
+    assert response.status_code == 200
+    assert ids(response) == ["14", "15", "12", "16", "11"]
+
+    response = list_exercises(client, sort="-duration", duration_max=30)
+    assert response.status_code == 200
+    assert ids(response) == ["16", "12", "13", "11", "15"]
+
+    assert list_exercises(client, sort="name").status_code == 422
+
+
+def test_sort_exercises_paging_cursor(client, mongo):
+    fill_exercises(mongo)
+
+    for sort in ("dificulty", "-dificulty", "duration", "-duration"):
+        expected = ids(list_exercises(client, sort=sort))
+        assert len(expected) == 6
+
+        params = {"sort": sort, "page_size": 2}
+        paged = []
+        while True:
+            response = list_exercises(client, **params)
+            assert response.status_code == 200
+            paged += ids(response)
+            if "X-Next-Cursor" not in response.headers:
+                break
+            params["after"] = response.headers["X-Next-Cursor"]
+        assert paged == expected
+
+        # page selection gives the same pages
+        response = list_exercises(client, sort=sort, page_size=2, page=2)
+        assert ids(response) == expected[2:4]
+
+    # the cursor of another sort is rejected, even with the same keys
+    cursor = list_exercises(client, sort="dificulty", page_size=2).headers[
+        "X-Next-Cursor"
+    ]
+    for sort in ("id", "-dificulty", "duration"):
+        response = list_exercises(client, sort=sort, after=cursor)
+        assert response.status_code == 422
+        assert response.get_json()["errors"]["query"]["after"] == ["Invalid cursor."]
+
+
+def test_sort_exercises_crafted_cursor(client, mongo):
+    fill_exercises(mongo)
+
+    _id = ObjectId("507f1f77bcf86cd799439012")
+    for values in [
+        # operators are not values
+        ["dificulty", {"$ne": None}, _id],
+        ["dificulty", 3, {"$where": "sleep(1000)"}],
+        # the values have the types of the sort keys
+        ["dificulty", "3", _id],
+        ["dificulty", True, _id],
+        ["dificulty", 3, str(_id)],
+        ["id", 3],
+    ]:
+        sort = values[0]
+        response = list_exercises(client, sort=sort, after=encode_cursor(values))
+        assert response.status_code == 422, values
+        assert response.get_json()["errors"]["query"]["after"] == ["Invalid cursor."]
+
+    response = list_exercises(
+        client, sort="dificulty", after=encode_cursor(["dificulty", 3, _id])
+    )
+    assert response.status_code == 200
+    assert ids(response) == ["13", "15", "14"]
+
+
+def stages(plan):
+    """ Return the stages of an explained plan."""
+    stage = [plan["stage"]]
+    if "inputStage" in plan:
+        stage += stages(plan["inputStage"])
+    for input_plan in plan.get("inputStages", []):
+        stage += stages(input_plan)
+    return stage
+
+
+def test_filter_exercises_index(client, mongo):
+    fill_exercises(mongo)
+
+    section_args = {"section": "infield", "dificulty_min": 2, "duration_max": 30}
+    for args, sort, index in [
+        (section_args, "id", "section_1__id_1"),
+        (section_args, "dificulty", "section_1_dificulty_1__id_1"),
+        (section_args, "-dificulty", "section_1_dificulty_1__id_1"),
+        (section_args, "duration", "section_1_duration_1__id_1"),
+        (section_args, "-duration", "section_1_duration_1__id_1"),
+        # all the sections
+        ({}, "id", "_id_"),
+        ({}, "dificulty", "dificulty_1__id_1"),
+        ({}, "-dificulty", "dificulty_1__id_1"),
+        ({}, "duration", "duration_1__id_1"),
+        ({}, "-duration", "duration_1__id_1"),
+    ]:
+        order = [attribute for _, attribute, _ in EXERCISE_SORTS[sort]]
+        plan = filter_exercises(args).order_by(*order).limit(3).explain()
+        winning_plan = plan["queryPlanner"]["winningPlan"]
+
+        # the index gives the order, the exercises are not sorted in memory
+        assert index_names(winning_plan) == [index], (args, sort)
+        assert "SORT" not in stages(winning_plan), (args, sort)
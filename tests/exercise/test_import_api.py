@@ -0,0 +1,113 @@
+import io
+import json
+
+from backend.apihelpers import iter_json_array
+
+EXERCISE = {
+    "name": "backhand rolling",
+    "section": "infield",
+    "dificulty": 3,
+    "duration": 30,
+    "description": "hit backhand rollings",
+    "video": "https://www.youtube.com/watch?v=J-nK0fZV7-8",
+}
+
+
+def test_import_json_array(app, client, mongo):
+    app.config["EXERCISE_IMPORT_BATCH_SIZE"] = 2
+    exercises = [dict(EXERCISE, name="exercise {}".format(i)) for i in range(5)]
+    # invalid exercise
+    del exercises[3]["dificulty"]
+
+    response = client.post("/api/v1/exercises/import", json=exercises)
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["inserted"] == 4
+    assert data["errors"] == [
+        {"index": 3, "errors": {"dificulty": ["Missing data for required field."]}}
+    ]
+
+    # verify creation in mongo DB
+    assert mongo["exercise"].count() == 4
+    names = sorted(exercise["name"] for exercise in mongo["exercise"].find())
+    assert names == ["exercise 0", "exercise 1", "exercise 2", "exercise 4"]
+
+
+def test_import_ndjson(client, mongo):
+    body = "\n".join(
+        [
+            json.dumps(EXERCISE),
+            "{not json",
+            "",
+            json.dumps(dict(EXERCISE, duration="long")),
+            json.dumps(EXERCISE),
+        ]
+    )
+
+    response = client.post(
+        "/api/v1/exercises/import", data=body, content_type="application/x-ndjson"
+    )
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["inserted"] == 2
+    # the records indexes, the errors give the lines
+    assert [error["index"] for error in data["errors"]] == [1, 2]
+    assert data["errors"][0]["errors"]["_schema"][0].endswith("at line 2 column 2.")
+    assert data["errors"][1]["errors"] == {"duration": ["Not a valid integer."]}
+    assert mongo["exercise"].count() == 2
+
+    # imported exercises are listed
+    response = client.get("/api/v1/exercises")
+    assert len(response.get_json()) == 2
+
+
+def test_import_invalid_json(client, mongo):
+    response = client.post(
+        "/api/v1/exercises/import",
+        data="[" + json.dumps(EXERCISE) + ", {",
+        content_type="application/json",
+    )
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["inserted"] == 1
+    assert data["errors"][0]["index"] == 1
+    assert mongo["exercise"].count() == 1
+
+
+class CountingStream(io.BytesIO):
+    def __init__(self, data):
+        super().__init__(data)
+        self.reads = 0
+
+    def read(self, size=-1):
+        self.reads += 1
+        return super().read(size)
+
+
+def test_import_stops_at_malformed_item():
+    body = "[{}, {{bad}}, {}]".format(
+        json.dumps(EXERCISE), ", ".join([json.dumps(EXERCISE)] * 1000)
+    )
+    stream = CountingStream(body.encode())
+
+    records = list(iter_json_array(stream, chunk_size=1024))
+
+    assert records[0] == (EXERCISE, None)
+    assert records[1][0] is None
+    assert records[1][1].startswith("Expecting property name enclosed in double quotes")
+    assert len(records) == 2
+    # the body after the malformed item is not read
+    assert stream.reads == 1
+
+    # an item split between chunks is read in full
+    stream = CountingStream("[{}]".format(json.dumps(EXERCISE)).encode())
+    assert list(iter_json_array(stream, chunk_size=7)) == [(EXERCISE, None)]
+
+    # an unterminated string is read up to the items size limit
+    stream = CountingStream(('["' + "x" * 10000).encode())
+    records = list(iter_json_array(stream, chunk_size=1024, max_item_size=4096))
+    assert records == [(None, "JSON array item longer than 4096 characters.")]
+    assert stream.reads == 5
@@ -0,0 +1,87 @@
+import json
+import urllib
+
+from bson import ObjectId
+
+from backend.apihelpers import encode_cursor
+from backend.model.data_model import Exercise
+from tests.fill_date_base import create_exercise
+
+
+def search(client, **params):
+    return client.get("/api/v1/exercises/search?" + urllib.parse.urlencode(params))
+
+
+def fill_exercises(mongo):
+    exercises = [
+        ("507f1f77bcf86cd799439011", "infield", "backhand rolling", "rollings"),
+        ("507f1f77bcf86cd799439012", "outfield", "grounders", "field rollings"),
+        ("507f1f77bcf86cd799439013", "outfield", "pop fly", "catch fly balls"),
+        ("507f1f77bcf86cd799439014", "infield", "forehand rolling", "rollings"),
+        ("507f1f77bcf86cd799439015", "infield", "double play", "turn two"),
+    ]
+    documents = []
+    for _id, section, name, description in exercises:
+        exercise = create_exercise(_id, section=section)
+        exercise.update(name=name, description=description)
+        documents.append(exercise)
+    mongo["exercise"].insert_many(documents)
+    # the collections are dropped between the tests, the search needs the text
+    # index
+    Exercise.ensure_indexes()
+
+
+def test_search_exercises(client, mongo):
+    fill_exercises(mongo)
+
+    response = search(client, q="rolling")
+    assert response.status_code == 200
+    exercises = response.get_json()
+    # the names matches rank first
+    assert [exercise["id"] for exercise in exercises] == [
+        "507f1f77bcf86cd799439011",
+        "507f1f77bcf86cd799439014",
+        "507f1f77bcf86cd799439012",
+    ]
+    assert exercises[0]["score"] > exercises[2]["score"]
+    assert json.loads(response.headers["X-Pagination"])["total"] == 3
+
+    response = search(client, q="rolling", section="outfield")
+    assert response.status_code == 200
+    assert [exercise["id"] for exercise in response.get_json()] == [
+        "507f1f77bcf86cd799439012"
+    ]
+
+    response = search(client, q="unknown")
+    assert response.status_code == 200
+    assert response.get_json() == []
+
+    assert search(client).status_code == 422
+
+
+def test_search_exercises_paging_cursor(client, mongo):
+    fill_exercises(mongo)
+    expected = search(client, q="rolling fly").get_json()
+    assert len(expected) == 4
+
+    params = {"q": "rolling fly", "page_size": 3}
+    response = search(client, **params)
+    assert response.status_code == 200
+    paged = response.get_json()
+
+    params["after"] = response.headers["X-Next-Cursor"]
+    response = search(client, **params)
+    assert response.status_code == 200
+    assert "X-Next-Cursor" not in response.headers
+    paged += response.get_json()
+    assert paged == expected
+
+    # page selection gives the same pages
+    del params["after"]
+    params["page"] = 2
+    assert search(client, **params).get_json() == expected[3:]
+
+    params["after"] = "invalid"
+    assert search(client, **params).status_code == 422
+    params["after"] = encode_cursor([{"$gt": 0}, ObjectId()])
+    assert search(client, **params).status_code == 422
@@ -63,3 +63,11 @@ def test_save_training(app, mongo):
 
         assert mongo["training"].count_documents({"nb_stages": 1}) == 1
 
+
+def test_training_indexes(app, mongo):
+    with app.app_context():
+        Training.ensure_indexes()
+
+        indexes = mongo["training"].index_information()
+        keys = [index["key"] for index in indexes.values()]
+        assert [("category", 1), ("date_time", 1), ("_id", 1)] in keys
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+
+from backend.extension import exercise_cache
+from tests.fill_date_base import create_exercise, create_training, create_stage
+
+
+def get_both_read_paths(app, client, url):
+    """Return the responses of the hydrated and of the raw read paths"""
+    app.config["RAW_READS"] = False
+    exercise_cache.clear()
+    hydrated = client.get(url)
+    app.config["RAW_READS"] = True
+    exercise_cache.clear()
+    raw = client.get(url)
+    return hydrated, raw
+
+
+def fill_collections(mongo):
+    exercises = [
+        create_exercise("507f1f77bcf86cd799439011", section="infield"),
+        create_exercise("507f1f77bcf86cd799439012", section="outfield"),
+    ]
+    # exercise without video
+    exercise = create_exercise("507f1f77bcf86cd799439013", section="pitching")
+    del exercise["video"]
+    exercises.append(exercise)
+    mongo["exercise"].insert_many(exercises)
+
+    trainings = [
+        create_training(
+            stages=[create_stage(exercises=exercises[:2])],
+            date_time=datetime.utcnow() + timedelta(days=i),
+        )
+        for i in range(1, 4)
+    ]
+    # training without tags
+    del trainings[0]["tags"]
+    mongo["training"].insert_many(trainings)
+
+
+def test_raw_reads_same_json(app, client, mongo):
+    fill_collections(mongo)
+    training_id = str(mongo["training"].find_one()["_id"])
+
+    for url in [
+        "/api/v1/exercises",
+        "/api/v1/exercises?section=infield",
+        "/api/v1/exercises/507f1f77bcf86cd799439013",
+        "/api/v1/trainings",
+        "/api/v1/trainings/next?category=18U",
+        "/api/v1/trainings/" + training_id,
+    ]:
+        hydrated, raw = get_both_read_paths(app, client, url)
+
+        assert hydrated.status_code == 200
+        assert raw.status_code == 200
+        assert hydrated.data == raw.data
+        assert hydrated.headers.get("X-Pagination") == raw.headers.get("X-Pagination")
+
+
+def test_raw_reads_not_found(app, client, mongo):
+    fill_collections(mongo)
+
+    hydrated, raw = get_both_read_paths(
+        app, client, "/api/v1/exercises/507f1f77bcf86cd799439099"
+    )
+
+    assert hydrated.status_code == 404
+    assert raw.status_code == 404
+    assert hydrated.data == raw.data
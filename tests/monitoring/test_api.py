@@ -0,0 +1,55 @@
+from pymongo.monitoring import (
+    ConnectionCheckedInEvent,
+    ConnectionCheckedOutEvent,
+    ConnectionCheckOutFailedEvent,
+    ConnectionCheckOutFailedReason,
+    ConnectionCheckOutStartedEvent,
+    ConnectionCreatedEvent,
+    PoolCreatedEvent,
+)
+
+from backend.extension import pool_monitor
+from backend.pool_monitor import PoolMonitor
+
+address = ("localhost", 27017)
+
+
+def test_pool_monitor_counters():
+    monitor = PoolMonitor()
+    monitor.pool_created(PoolCreatedEvent(address, {"maxPoolSize": 10}))
+    for connection_id in (1, 2):
+        monitor.connection_check_out_started(ConnectionCheckOutStartedEvent(address))
+        monitor.connection_created(ConnectionCreatedEvent(address, connection_id))
+        monitor.connection_checked_out(
+            ConnectionCheckedOutEvent(address, connection_id)
+        )
+    monitor.connection_checked_in(ConnectionCheckedInEvent(address, 1))
+    monitor.connection_check_out_started(ConnectionCheckOutStartedEvent(address))
+    monitor.connection_check_out_failed(
+        ConnectionCheckOutFailedEvent(address, ConnectionCheckOutFailedReason.TIMEOUT)
+    )
+
+    stats = monitor.stats()
+    assert stats["max_pool_size"] == 10
+    assert stats["pools"] == 1
+    assert stats["connections"] == 2
+    assert stats["checked_out"] == 1
+    assert stats["max_checked_out"] == 2
+    assert stats["check_outs"] == 2
+    assert stats["check_out_failures"] == 1
+    assert stats["timeouts"] == 1
+    assert 0 <= stats["mean_wait_ms"] <= stats["max_wait_ms"]
+
+    monitor.clear()
+    assert monitor.stats()["check_outs"] == 0
+
+
+def test_get_pool_stats(app, client):
+    # the listener is given to the app MongoClient
+    assert pool_monitor in app.config["MONGODB_SETTINGS"]["event_listeners"]
+
+    pool_monitor.connection_checked_out(ConnectionCheckedOutEvent(address, 1))
+    response = client.get("/api/v1/monitoring/pool")
+    assert response.status_code == 200
+    assert response.get_json()["check_outs"] == 1
+    assert response.get_json()["checked_out"] == 1
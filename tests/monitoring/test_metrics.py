@@ -0,0 +1,91 @@
+from types import SimpleNamespace
+
+import pytest
+from flask import Response
+
+from backend.extension import exercise_cache, metrics
+
+
+def test_metrics_requests(app, client):
+    assert metrics in app.config["MONGODB_SETTINGS"]["event_listeners"]
+    assert client.get("/api/v1/monitoring/pool").status_code == 200
+    assert client.get("/api/v1/unknown").status_code == 404
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain; version=0.0.4")
+    lines = response.get_data(as_text=True).splitlines()
+
+    assert "# TYPE http_request_duration_seconds histogram" in lines
+    labels = 'blueprint="monitoring",route="/api/v1/monitoring/pool",method="GET"'
+    assert "http_requests_total{" + labels + ',status="200"} 1' in lines
+    assert "http_request_duration_seconds_count{" + labels + "} 1" in lines
+    assert "http_request_duration_seconds_bucket{" + labels + ',le="+Inf"} 1' in lines
+    # no command issued
+    assert "http_request_mongodb_commands_bucket{" + labels + ',le="0"} 1' in lines
+    # the not found URLs share a route label
+    assert (
+        'http_requests_total{blueprint="",route="unmatched",method="GET",'
+        'status="404"} 1' in lines
+    )
+    assert "mongodb_pool_checked_out 0" in lines
+
+
+def test_metrics_unhandled_exception(app, client):
+    def fail():
+        raise ValueError("unhandled")
+
+    app.add_url_rule("/api/v1/fail", "fail", fail)
+    assert client.get("/api/v1/fail").status_code == 500
+    # raised to the test client when the exceptions are propagated
+    app.config["PROPAGATE_EXCEPTIONS"] = True
+    with pytest.raises(ValueError):
+        client.get("/api/v1/fail")
+
+    lines = client.get("/metrics").get_data(as_text=True).splitlines()
+    labels = 'blueprint="",route="/api/v1/fail",method="GET"'
+    assert "http_requests_total{" + labels + ',status="500"} 2' in lines
+    assert "http_request_duration_seconds_count{" + labels + "} 2" in lines
+
+
+def test_metrics_mongodb_commands(app):
+    with app.test_request_context("/api/v1/trainings"):
+        app.preprocess_request()
+        for command_name in ("find", "find", "getMore"):
+            metrics.succeeded(
+                SimpleNamespace(command_name=command_name, duration_micros=1500)
+            )
+        metrics.failed(SimpleNamespace(command_name="insert", duration_micros=500))
+        app.process_response(Response())
+
+    lines = metrics.render().splitlines()
+    labels = 'blueprint="training",route="/api/v1/trainings"'
+    assert "mongodb_commands_total{" + labels + ',command="find"} 2' in lines
+    assert "mongodb_commands_total{" + labels + ',command="getMore"} 1' in lines
+    assert "mongodb_command_failures_total{" + labels + ',command="insert"} 1' in lines
+    assert (
+        "mongodb_command_duration_seconds_total{" + labels + ',command="find"} 0.003'
+        in lines
+    )
+    # one request with 4 commands
+    assert (
+        "http_request_mongodb_commands_bucket{" + labels + ',method="GET",le="2"} 0'
+        in lines
+    )
+    assert (
+        "http_request_mongodb_commands_bucket{" + labels + ',method="GET",le="5"} 1'
+        in lines
+    )
+    assert "http_request_mongodb_commands_sum{" + labels + ',method="GET"} 4' in lines
+
+
+def test_metrics_exercise_cache(app, client):
+    with app.app_context():
+        exercise_cache.get_query({"page": 1}, lambda: [])
+        exercise_cache.get_query({"page": 1}, lambda: [])
+
+    lines = client.get("/metrics").get_data(as_text=True).splitlines()
+    assert "# TYPE exercise_cache_hits_total counter" in lines
+    assert "exercise_cache_hits_total 1" in lines
+    assert "exercise_cache_misses_total 1" in lines
+    assert "exercise_cache_entries 1" in lines
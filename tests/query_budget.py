@@ -0,0 +1,93 @@
+""" MongoDB commands budgets of the API tests.
+
+Set QUERY_BUDGET_REPORT to a file path to append the measured commands and
+bytes of every budgeted block to it (one JSON object per line), to measure
+the budgets against a real MongoDB server. The API tests only budget the
+commands until their bytes are measured on a real server.
+"""
+import json
+import os
+from contextlib import contextmanager
+
+import bson
+from pymongo.monitoring import CommandListener
+
+# commands not counted: indexes are created on the first use of a collection
+# and sessions are ended when the clients are closed
+IGNORED_COMMANDS = {"createIndexes", "endSessions"}
+
+
+class QueryCounter(CommandListener):
+    """Command listener recording the MongoDB commands of the counted blocks,
+    with their bytes sent and received (BSON sizes of the commands and replies).
+    """
+
+    def __init__(self):
+        # recorded commands by request id, None when not counting
+        self.commands = None
+
+    def start(self):
+        """ Start recording the commands."""
+        self.commands = {}
+
+    def stop(self) -> list:
+        """ Stop recording, return the recorded commands."""
+        commands, self.commands = self.commands, None
+        return list(commands.values())
+
+    def started(self, event):
+        if self.commands is not None and event.command_name not in IGNORED_COMMANDS:
+            self.commands[event.request_id] = {
+                "name": event.command_name,
+                "bytes": len(bson.encode(event.command)),
+            }
+
+    def succeeded(self, event):
+        if self.commands is not None and event.request_id in self.commands:
+            self.commands[event.request_id]["bytes"] += len(bson.encode(event.reply))
+
+    def failed(self, event):
+        pass
+
+
+# listener of all the MongoDB clients created by the tests
+query_counter = QueryCounter()
+
+
+def report_budget(recorded: list, commands: int, max_bytes: int = None):
+    """ Append the measures of a block to the QUERY_BUDGET_REPORT file, if set."""
+    path = os.getenv("QUERY_BUDGET_REPORT")
+    if not path:
+        return
+
+    measure = {
+        "test": os.getenv("PYTEST_CURRENT_TEST", "").split(" ")[0],
+        "commands": [command["name"] for command in recorded],
+        "bytes": sum(command["bytes"] for command in recorded),
+        "budget": {"commands": commands, "max_bytes": max_bytes},
+    }
+    with open(path, "a") as report:
+        report.write(json.dumps(measure) + "\n")
+
+
+@contextmanager
+def query_budget(commands: int, max_bytes: int = None):
+    """Fail if the block runs more MongoDB commands, or transfers more bytes,
+    than its budget.
+    """
+    query_counter.start()
+    try:
+        yield
+    finally:
+        recorded = query_counter.stop()
+        report_budget(recorded, commands, max_bytes)
+
+    names = [command["name"] for command in recorded]
+    assert len(recorded) <= commands, "{} MongoDB commands, budget {}: {}".format(
+        len(recorded), commands, names
+    )
+    if max_bytes is not None:
+        transferred = sum(command["bytes"] for command in recorded)
+        assert transferred <= max_bytes, "{} bytes, budget {}: {}".format(
+            transferred, max_bytes, names
+        )
@@ -0,0 +1,85 @@
+from datetime import datetime
+
+from tests.fill_date_base import create_exercise, create_training, create_stage
+
+
+def test_get_month(client, mongo):
+    fill_cololections(mongo)
+    response = client.get("/api/v1/calendar?category=18U&date=2020-04-15")
+
+    assert response.status_code == 200
+    calendar = response.get_json()
+    assert calendar["start"] == "2020-04-01"
+    assert calendar["end"] == "2020-04-30"
+
+    # grid from monday 2020-03-30 to sunday 2020-05-03
+    weeks = calendar["weeks"]
+    assert len(weeks) == 5
+    assert all(len(week) == 7 for week in weeks)
+    assert weeks[0][0]["date"] == "2020-03-30"
+    assert not weeks[0][0]["in_period"]
+    assert weeks[0][2]["in_period"]
+    assert weeks[-1][-1]["date"] == "2020-05-03"
+
+    days = {day["date"]: day for week in weeks for day in week}
+    assert days["2020-04-01"] == {
+        "date": "2020-04-01",
+        "in_period": True,
+        "nb_trainings": 2,
+        "minutes": 90,
+        "places": ["Chateau Giron", "Hawks Stadium"],
+    }
+    assert days["2020-04-02"]["nb_trainings"] == 1
+    assert days["2020-04-03"]["nb_trainings"] == 0
+    # other category
+    assert days["2020-04-04"]["nb_trainings"] == 0
+
+
+def test_get_week_utc_offset(client, mongo):
+    fill_cololections(mongo)
+    response = client.get(
+        "/api/v1/calendar?category=18U&date=2020-04-01&week=true&utc_offset=%2B02:00"
+    )
+
+    assert response.status_code == 200
+    calendar = response.get_json()
+    assert calendar["start"] == "2020-03-30"
+    assert calendar["end"] == "2020-04-05"
+    (week,) = calendar["weeks"]
+
+    # the 2020-04-01 23:30 UTC training is on 2020-04-02 at +02:00
+    assert [day["nb_trainings"] for day in week] == [0, 0, 1, 2, 0, 0, 0]
+
+
+def test_get_invalid_utc_offset(client, mongo):
+    response = client.get("/api/v1/calendar?category=18U&utc_offset=Europe/Paris")
+    assert response.status_code == 422
+
+
+def fill_cololections(mongo):
+
+    # init the exercises collection
+    exercises = [
+        create_exercise("507f1f77bcf86cd799439011", section="infield"),
+        create_exercise("507f1f77bcf86cd799439012", section="outfield"),
+    ]
+    mongo["exercise"].insert_many(exercises)
+
+    # init training collection
+    mongo["training"].insert_many(
+        [
+            create_training(
+                stages=[create_stage(exercises=exercises, duration=60)],
+                date_time=datetime(2020, 4, 1, 10),
+            ),
+            create_training(
+                stages=[create_stage(exercises=exercises, duration=30)],
+                date_time=datetime(2020, 4, 1, 23, 30),
+                place="Chateau Giron",
+            ),
+            create_training(stages=[], date_time=datetime(2020, 4, 2, 18)),
+            create_training(
+                stages=[], date_time=datetime(2020, 4, 4, 18), category="15U"
+            ),
+        ]
+    )
@@ -0,0 +1,79 @@
+import logging
+import os
+
+from backend.config import load_cached_config, load_config_as_object
+
+
+def test_mongodb_settings_merged(monkeypatch):
+    monkeypatch.setenv("MONGO_MAX_POOL_SIZE", "20")
+    monkeypatch.setenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "500")
+    conf = load_config_as_object("tests/base_test_config.yml")
+
+    settings = conf.MONGODB_SETTINGS
+    # from the test config
+    assert settings["host"] == "mongodb://localhost/backend"
+    # from the environment
+    assert settings["maxPoolSize"] == "20"
+    assert settings["waitQueueTimeoutMS"] == "500"
+    # from the default config
+    assert settings["minPoolSize"] == 0
+    assert settings["compressors"] is None
+
+
+def test_merged_files_with_references(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "anchors.yml").write_text("pool: &pool\n    maxPoolSize: 5\n")
+    (tmp_path / "db.yml").write_text(
+        "MONGODB_SETTINGS:\n    host: mongodb://db/backend\n    <<: *pool\n"
+    )
+    (tmp_path / "api.yml").write_text("API_TITLE: Merged\n")
+
+    conf = load_config_as_object("anchors.yml | db.yml, api.yml")
+    assert conf.MONGODB_SETTINGS["host"] == "mongodb://db/backend"
+    assert conf.MONGODB_SETTINGS["maxPoolSize"] == 5
+    assert conf.API_TITLE == "Merged"
+    # merged in memory
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "anchors.yml",
+        "api.yml",
+        "db.yml",
+    ]
+
+
+def test_cached_config(tmp_path):
+    config_file = tmp_path / "config.yml"
+    config_file.write_text("API_TITLE: Cached\n")
+    conf = load_config_as_object(str(config_file))
+
+    # reused, as a copy
+    hits = load_cached_config.cache_info().hits
+    conf.MONGODB_SETTINGS["connect"] = False
+    other = load_config_as_object(str(config_file))
+    assert load_cached_config.cache_info().hits == hits + 1
+    assert "connect" not in other.MONGODB_SETTINGS
+
+    # reloaded once modified
+    config_file.write_text("API_TITLE: Modified\n")
+    os.utime(config_file, ns=(0, 0))
+    assert load_config_as_object(str(config_file)).API_TITLE == "Modified"
+
+
+def test_env_vars_values_not_logged(monkeypatch):
+    monkeypatch.setenv("MONGO_URI", "mongodb://user:secret@db/backend")
+    records = []
+    handler = logging.Handler(logging.DEBUG)
+    handler.emit = records.append
+    logger = logging.getLogger("backend.config")
+    level = logger.level
+    logger.addHandler(handler)
+    logger.setLevel(logging.DEBUG)
+    try:
+        conf = load_config_as_object("tests/base_test_config.yml")
+    finally:
+        logger.removeHandler(handler)
+        logger.setLevel(level)
+
+    assert conf.MONGODB_SETTINGS["host"] == "mongodb://user:secret@db/backend"
+    messages = [record.getMessage() for record in records]
+    assert any("MONGO_URI" in message for message in messages)
+    assert not any("secret" in message for message in messages)
@@ -0,0 +1,104 @@
+import io
+import json
+import logging
+import threading
+
+import pytest
+
+from backend import logs
+from backend.app import create_app
+from backend.config import load_config_as_object
+
+
+@pytest.fixture
+def restore_logging():
+    """Restore the development logging configuration"""
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    levels = {
+        name: logging.getLogger(name).level for name in ["backend"] + logs.QUIET_LOGGERS
+    }
+
+    yield
+
+    logs.stop_listener()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+    for name, logger_level in levels.items():
+        logging.getLogger(name).setLevel(logger_level)
+
+
+def test_production_logging(mongo, restore_logging):
+    conf = load_config_as_object("tests/base_test_config.yml")
+    conf.LOGGING_PROFILE = "production"
+    create_app(conf)
+
+    root = logging.getLogger()
+    assert [type(handler) for handler in root.handlers] == [logs.LogQueueHandler]
+    assert logging.getLogger("socketio").level == logging.WARNING
+    assert logging.getLogger("engineio").level == logging.WARNING
+
+    stream = io.StringIO()
+    logs.configure_logging({"LOGGING_PROFILE": "production"}, stream=stream)
+    data = {"category": "18U"}
+    logger = logging.getLogger("backend.test")
+    logger.debug("data: %s", data)
+    logger.info("data: %s", data)
+    # the message is merged when the record is queued
+    data["category"] = "15U"
+    try:
+        raise ValueError("invalid")
+    except ValueError:
+        logger.exception("failed")
+    logs.stop_listener()
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [line["message"] for line in lines] == [
+        "data: {'category': '18U'}",
+        "failed",
+    ]
+    assert lines[0]["level"] == "INFO"
+    assert lines[0]["logger"] == "backend.test"
+    assert "ValueError: invalid" in lines[1]["exception"]
+
+
+def test_production_logging_thread(restore_logging, monkeypatch):
+    serialized = []
+    format_record = logs.JsonFormatter.format
+
+    def spy_format(self, record):
+        serialized.append((record.msg, record.args, threading.get_ident()))
+        return format_record(self, record)
+
+    monkeypatch.setattr(logs.JsonFormatter, "format", spy_format)
+    stream = io.StringIO()
+    logs.configure_logging({"LOGGING_PROFILE": "production"}, stream=stream)
+    logger = logging.getLogger("backend.test")
+    logger.warning("data: %s", 18, stack_info=True)
+    try:
+        raise ValueError("invalid")
+    except ValueError:
+        logger.exception("failed")
+    logs.stop_listener()
+
+    # merged by the request thread, serialized by the listener thread
+    assert [(msg, args) for msg, args, _ in serialized] == [
+        ("data: 18", None),
+        ("failed", None),
+    ]
+    assert all(ident != threading.get_ident() for _, _, ident in serialized)
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert lines[0]["message"] == "data: 18"
+    assert "test_production_logging_thread" in lines[0]["stack"]
+    assert "ValueError: invalid" in lines[1]["exception"]
+
+
+def test_development_logging(app):
+    assert not any(
+        isinstance(handler, logs.LogQueueHandler)
+        for handler in logging.getLogger().handlers
+    )
+    assert logging.getLogger("backend").isEnabledFor(logging.DEBUG)
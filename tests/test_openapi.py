@@ -0,0 +1,25 @@
+import json
+
+from backend.app import create_app, generate_openapi
+from backend.config import load_config_as_object
+from backend.extension import api
+
+
+def test_prebuilt_openapi_spec(tmp_path, mongo):
+    spec_file = tmp_path / "openapi.json"
+    generate_openapi(str(spec_file))
+    spec = json.loads(spec_file.read_text())
+    assert "/api/v1/trainings" in spec["paths"]
+
+    conf = load_config_as_object("tests/base_test_config.yml")
+    conf.OPENAPI_SPEC_FILE = str(spec_file)
+    client = create_app(conf).test_client()
+
+    # the views are not introspected
+    assert api.spec.to_dict()["paths"] == {}
+    response = client.get("/openapi.json")
+    assert response.status_code == 200
+    assert response.get_data(as_text=True) == spec_file.read_text()
+
+    # the API is served
+    assert client.get("/api/v1/monitoring/pool").status_code == 200
@@ -0,0 +1,36 @@
+from types import SimpleNamespace
+
+import pytest
+
+from tests.query_budget import query_counter
+
+
+def run_command(request_id: int, command_name: str):
+    query_counter.started(
+        SimpleNamespace(
+            request_id=request_id,
+            command_name=command_name,
+            command={command_name: "exercise"},
+        )
+    )
+    query_counter.succeeded(SimpleNamespace(request_id=request_id, reply={"ok": 1.0}))
+
+
+def test_query_budget(query_budget):
+    with query_budget(commands=2, max_bytes=200):
+        run_command(1, "find")
+        # not counted
+        run_command(2, "createIndexes")
+        run_command(3, "insert")
+
+    # not counted outside the blocks
+    run_command(4, "find")
+
+    with pytest.raises(AssertionError, match=r"3 MongoDB commands, budget 2"):
+        with query_budget(commands=2):
+            for request_id in range(3):
+                run_command(request_id, "find")
+
+    with pytest.raises(AssertionError, match=r"bytes, budget 10"):
+        with query_budget(commands=2, max_bytes=10):
+            run_command(1, "find")
@@ -0,0 +1,17 @@
+import runpy
+
+
+def test_wsgi_app():
+    from backend.wsgi import app
+
+    assert app.name == "backend"
+    # no connection opened before the gunicorn workers are forked
+    assert app.config["MONGODB_SETTINGS"]["connect"] is False
+
+
+def test_gunicorn_config():
+    config = runpy.run_path("gunicorn.conf.py")
+
+    assert config["worker_class"].startswith("geventwebsocket.")
+    # the worker monkey-patches the standard library before loading the app
+    assert config["preload_app"] is False
@@ -3,7 +3,7 @@ from datetime import datetime
 from tests.fill_date_base import create_exercise, create_training, create_stage
 
 
-def test_get_training(client, mongo):
+def test_get_training(client, mongo, query_budget):
 
     exercises = [
         create_exercise("507f1f77bcf86cd799439011", section="infield"),
@@ -27,7 +27,8 @@ def test_get_training(client, mongo):
     training_1 = mongo["training"].find_one()
     _id = str(training_1["_id"])
 
-    response = client.get("/api/v1/trainings/" + _id)
+    with query_budget(commands=2):
+        response = client.get("/api/v1/trainings/" + _id)
 
     assert response.status_code == 200
     # verify update in mongo DB
@@ -36,7 +37,48 @@ def test_get_training(client, mongo):
     assert training_1 == training
 
 
-def test_put_training(client, mongo):
+def test_get_training_expand_exercises(client, mongo):
+
+    exercises = [
+        create_exercise("507f1f77bcf86cd799439011", section="infield"),
+        create_exercise("507f1f77bcf86cd799439012", section="outfield"),
+    ]
+    # init the exercises collection
+    mongo["exercise"].insert_many(exercises)
+
+    # init training collection
+    stage = create_stage(exercises=exercises, duration=60)
+    training = create_training(stages=[stage], date_time=datetime.now())
+    _id = str(mongo["training"].insert_one(training).inserted_id)
+
+    response = client.get("/api/v1/trainings/" + _id)
+    assert response.status_code == 200
+    assert response.get_json()["stages"][0]["exercises"] == [
+        {"id": "507f1f77bcf86cd799439011"},
+        {"id": "507f1f77bcf86cd799439012"},
+    ]
+    etag = response.headers["ETag"]
+
+    response = client.get("/api/v1/trainings/" + _id + "?expand=exercises")
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    training = response.get_json()
+    assert training["nb_stages"] == 1
+    assert [exercise["section"] for exercise in training["stages"][0]["exercises"]] == [
+        "infield",
+        "outfield",
+    ]
+    assert training["stages"][0]["exercises"][0]["duration"] == 30
+
+    # the expanded training ETag is stable
+    response = client.get(
+        "/api/v1/trainings/" + _id + "?expand=exercises",
+        headers={"If-None-Match": response.headers["ETag"]},
+    )
+    assert response.status_code == 304
+
+
+def test_put_training(client, mongo, query_budget):
 
     # init the exercises collection
     mongo["exercise"].insert_many(
@@ -52,33 +94,34 @@ def test_put_training(client, mongo):
     date_time = datetime.now()
 
     # Create a new training
-    response = client.put(
-        "/api/v1/trainings",
-        json={
-            "category": "18U",
-            "date_time": date_time.isoformat(),
-            "place": "Hawks Stadium",
-            "nb_stages": 2,
-            "tags": ["15U", "infield", "oufield", "arm", "rollings"],
-            "stages": [
-                {
-                    "nb_exercises": 2,
-                    "exercises": [
-                        {"id": "507f1f77bcf86cd799439011"},
-                        {"id": "507f1f77bcf86cd799439012"},
-                    ],
-                },
-                {
-                    "nb_exercises": 3,
-                    "exercises": [
-                        {"id": "507f1f77bcf86cd799439013"},
-                        {"id": "507f1f77bcf86cd799439011"},
-                        {"id": "507f1f77bcf86cd799439015"},
-                    ],
-                },
-            ],
-        },
-    )
+    with query_budget(commands=2):
+        response = client.put(
+            "/api/v1/trainings",
+            json={
+                "category": "18U",
+                "date_time": date_time.isoformat(),
+                "place": "Hawks Stadium",
+                "nb_stages": 2,
+                "tags": ["15U", "infield", "oufield", "arm", "rollings"],
+                "stages": [
+                    {
+                        "nb_exercises": 2,
+                        "exercises": [
+                            {"id": "507f1f77bcf86cd799439011"},
+                            {"id": "507f1f77bcf86cd799439012"},
+                        ],
+                    },
+                    {
+                        "nb_exercises": 3,
+                        "exercises": [
+                            {"id": "507f1f77bcf86cd799439013"},
+                            {"id": "507f1f77bcf86cd799439011"},
+                            {"id": "507f1f77bcf86cd799439015"},
+                        ],
+                    },
+                ],
+            },
+        )
 
     assert response.status_code == 200
     # verify creation in mongo DB
@@ -95,9 +138,11 @@ def test_put_training(client, mongo):
     assert 2 == len(training["stages"][0]["exercises"])
     assert 3 == training["stages"][1]["nb_exercises"]
     assert 3 == len(training["stages"][1]["exercises"])
+    assert 30 == training["stages"][0]["duration"]
+    assert 30 == training["stages"][1]["duration"]
 
 
-def test_post_modify_training(client, mongo):
+def test_post_modify_training(client, mongo, query_budget):
 
     exercises = [
         create_exercise("507f1f77bcf86cd799439011", section="infield"),
@@ -129,20 +174,27 @@ def test_post_modify_training(client, mongo):
 
     date_time = datetime.now()
 
-    response = client.post(
-        "/api/v1/trainings/" + str(training_1["_id"]),
-        json={
-            "category": "15U",
-            "date_time": date_time.isoformat(),
-            "place": "Chateau Giron",
-            "nb_stages": 2,
-            "tags": ["15U", "infield", "oufield", "arm", "rollings"],
-            "stages": [
-                {"nb_exercises": 1, "exercises": [{"id": "507f1f77bcf86cd799439012"}]},
-                {"nb_exercises": 1, "exercises": [{"id": "507f1f77bcf86cd799439015"}]},
-            ],
-        },
-    )
+    with query_budget(commands=3):
+        response = client.post(
+            "/api/v1/trainings/" + str(training_1["_id"]),
+            json={
+                "category": "15U",
+                "date_time": date_time.isoformat(),
+                "place": "Chateau Giron",
+                "nb_stages": 2,
+                "tags": ["15U", "infield", "oufield", "arm", "rollings"],
+                "stages": [
+                    {
+                        "nb_exercises": 1,
+                        "exercises": [{"id": "507f1f77bcf86cd799439012"}],
+                    },
+                    {
+                        "nb_exercises": 1,
+                        "exercises": [{"id": "507f1f77bcf86cd799439015"}],
+                    },
+                ],
+            },
+        )
     assert response.status_code == 200
     # verify update in mongo DB
     assert mongo["training"].count() == 1
@@ -157,7 +209,7 @@ def test_post_modify_training(client, mongo):
     assert 1 == len(training["stages"][1]["exercises"])
 
 
-def test_delete_training(client, mongo):
+def test_delete_training(client, mongo, query_budget):
 
     exercises = [
         create_exercise("507f1f77bcf86cd799439011", section="infield"),
@@ -187,8 +239,101 @@ def test_delete_training(client, mongo):
     assert 6 == training_1["stages"][0]["nb_exercises"]
     assert 6 == len(training_1["stages"][0]["exercises"])
 
-    response = client.delete("/api/v1/trainings/" + str(training_1["_id"]))
+    with query_budget(commands=2):
+        response = client.delete("/api/v1/trainings/" + str(training_1["_id"]))
     assert response.status_code == 200
     # verify update in mongo DB
     assert mongo["training"].count() == 0
 
+
+def test_put_training_missing_exercises(client, mongo):
+
+    # init the exercises collection
+    mongo["exercise"].insert_many(
+        [
+            create_exercise("507f1f77bcf86cd799439011", section="infield"),
+            create_exercise("507f1f77bcf86cd799439012", section="outfield"),
+        ]
+    )
+
+    # Create a new training referencing unknown exercises
+    response = client.put(
+        "/api/v1/trainings",
+        json={
+            "category": "18U",
+            "date_time": datetime.now().isoformat(),
+            "place": "Hawks Stadium",
+            "nb_stages": 2,
+            "tags": [],
+            "stages": [
+                {
+                    "nb_exercises": 2,
+                    "exercises": [
+                        {"id": "507f1f77bcf86cd799439011"},
+                        {"id": "507f1f77bcf86cd799439098"},
+                    ],
+                },
+                {
+                    "nb_exercises": 2,
+                    "exercises": [
+                        {"id": "507f1f77bcf86cd799439012"},
+                        {"id": "507f1f77bcf86cd799439099"},
+                    ],
+                },
+            ],
+        },
+    )
+
+    assert response.status_code == 404
+    data = response.get_json()
+    assert data["errors"]["missing_exercises"] == [
+        "507f1f77bcf86cd799439098",
+        "507f1f77bcf86cd799439099",
+    ]
+    # verify nothing was created in mongo DB
+    assert mongo["training"].count() == 0
+
+
+def test_get_training_etag(client, mongo):
+
+    exercises = [
+        create_exercise("507f1f77bcf86cd799439011", section="infield"),
+        create_exercise("507f1f77bcf86cd799439012", section="outfield"),
+    ]
+    # init the exercises collection
+    mongo["exercise"].insert_many(exercises)
+
+    # init training collection
+    stage = create_stage(exercises=exercises, duration=60)
+    training = create_training(stages=[stage], date_time=datetime.now())
+    _id = str(mongo["training"].insert_one(training).inserted_id)
+
+    response = client.get("/api/v1/trainings/" + _id)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    # unchanged training
+    response = client.get("/api/v1/trainings/" + _id, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    # modified training
+    response = client.post(
+        "/api/v1/trainings/" + _id,
+        json={
+            "category": "15U",
+            "date_time": datetime.now().isoformat(),
+            "place": "Chateau Giron",
+            "nb_stages": 1,
+            "tags": [],
+            "stages": [
+                {"nb_exercises": 1, "exercises": [{"id": "507f1f77bcf86cd799439012"}]}
+            ],
+        },
+    )
+    assert response.status_code == 200
+    assert mongo["training"].find_one()["version"] == 1
+
+    response = client.get("/api/v1/trainings/" + _id, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.get_json()["place"] == "Chateau Giron"
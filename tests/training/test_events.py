@@ -0,0 +1,95 @@
+from datetime import datetime
+
+from tests.fill_date_base import create_exercise
+
+
+def training_json(category="18U"):
+    return {
+        "category": category,
+        "date_time": datetime(2020, 4, 1, 18).isoformat(),
+        "place": "Hawks Stadium",
+        "nb_stages": 1,
+        "tags": ["infield"],
+        "stages": [
+            {"nb_exercises": 1, "exercises": [{"id": "507f1f77bcf86cd799439011"}]}
+        ],
+    }
+
+
+def training_events(ws_client):
+    return [
+        event["args"][0]
+        for event in ws_client.get_received("/ws/v1")
+        if event["name"] == "training"
+    ]
+
+
+def test_subscribe(ws_client):
+    assert ws_client.emit(
+        "subscribe", {"category": "18U"}, namespace="/ws/v1", callback=True
+    ) == {"rooms": ["category/18U"]}
+    assert "errors" in ws_client.emit(
+        "subscribe", {}, namespace="/ws/v1", callback=True
+    )
+
+
+def test_training_events(client, ws_client, mongo):
+    mongo["exercise"].insert_one(create_exercise("507f1f77bcf86cd799439011"))
+    ws_client.emit("subscribe", {"category": "18U"}, namespace="/ws/v1")
+
+    # create
+    response = client.put("/api/v1/trainings", json=training_json())
+    assert response.status_code == 200
+    training_id = str(mongo["training"].find_one()["_id"])
+    assert training_events(ws_client) == [
+        {
+            "action": "created",
+            "id": training_id,
+            "category": "18U",
+            "date_time": "2020-04-01T18:00:00",
+            "version": 0,
+        }
+    ]
+
+    # other categories are not notified
+    client.put("/api/v1/trainings", json=training_json("15U"))
+    assert training_events(ws_client) == []
+
+    # moved to an other category, the previous one is notified
+    response = client.post(
+        "/api/v1/trainings/" + training_id, json=training_json("15U")
+    )
+    assert response.status_code == 200
+    assert response.get_json()["category"] == "15U"
+    assert [
+        (event["action"], event["category"], event["version"])
+        for event in training_events(ws_client)
+    ] == [("modified", "15U", 1)]
+
+    # unsubscribed
+    ws_client.emit("unsubscribe", {"category": "18U"}, namespace="/ws/v1")
+    client.post("/api/v1/trainings/" + training_id, json=training_json())
+    assert training_events(ws_client) == []
+
+    ws_client.emit("subscribe", {"category": "18U"}, namespace="/ws/v1")
+    client.delete("/api/v1/trainings/" + training_id)
+    assert [event["action"] for event in training_events(ws_client)] == ["deleted"]
+
+
+def test_training_series_events(client, ws_client, mongo):
+    mongo["exercise"].insert_one(create_exercise("507f1f77bcf86cd799439011"))
+    ws_client.emit("subscribe", {"category": "18U"}, namespace="/ws/v1")
+
+    response = client.put(
+        "/api/v1/trainings/series",
+        json=dict(training_json(), recurrence={"freq": "WEEKLY"}),
+    )
+    assert response.status_code == 200
+    events = ws_client.get_received("/ws/v1")
+    assert [event["name"] for event in events] == ["training_series"]
+    assert events[0]["args"][0] == {
+        "action": "created",
+        "id": response.get_json()["id"],
+        "category": "18U",
+        "version": 0,
+    }
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta, timezone
+import csv
+import io
+import json
+import urllib
+
+from tests.fill_date_base import create_exercise, create_training, create_stage
+
+
+# training dates
+date_1 = datetime.now(timezone.utc) - timedelta(days=400)
+date_2 = datetime.now(timezone.utc) - timedelta(days=100)
+date_3 = datetime.now(timezone.utc) + timedelta(hours=10)
+date_4 = datetime.now(timezone.utc) + timedelta(days=200)
+
+
+def export_url(**params):
+    params.setdefault("category", "18U")
+    params.setdefault("start", (date_1 + timedelta(days=1)).isoformat())
+    params.setdefault("end", (date_4 + timedelta(days=1)).isoformat())
+    return "/api/v1/trainings/export?" + urllib.parse.urlencode(params)
+
+
+def test_export_ndjson(client, mongo):
+    fill_cololections(mongo)
+    response = client.get(export_url())
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    assert response.is_streamed
+    trainings = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert [training["date_time"][:19] for training in trainings] == [
+        date.replace(tzinfo=None).isoformat()[:19] for date in (date_2, date_3, date_4)
+    ]
+    assert trainings[0]["stages"] == [
+        {
+            "duration": 60,
+            "nb_exercises": 2,
+            "exercises": ["507f1f77bcf86cd799439011", "507f1f77bcf86cd799439012"],
+        }
+    ]
+    assert trainings[0]["tags"] == ["tag1", "tag2", "tag3"]
+
+
+def test_export_csv(client, mongo):
+    fill_cololections(mongo)
+    response = client.get(export_url(format="csv", category="15U"))
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/csv"
+    assert response.headers["Content-Disposition"] == (
+        'attachment; filename="trainings.csv"'
+    )
+    rows = list(csv.DictReader(io.StringIO(response.data.decode())))
+    assert len(rows) == 1
+    assert rows[0]["category"] == "15U"
+    assert rows[0]["place"] == "Chateau Giron"
+    assert json.loads(rows[0]["tags"]) == ["tag1", "tag2", "tag3"]
+
+
+def test_export_invalid_format(client, mongo):
+    response = client.get(export_url(format="xml"))
+    assert response.status_code == 422
+
+
+def fill_cololections(mongo):
+
+    # init the exercises collection
+    exercises = [
+        create_exercise("507f1f77bcf86cd799439011", section="infield"),
+        create_exercise("507f1f77bcf86cd799439012", section="outfield"),
+    ]
+    mongo["exercise"].insert_many(exercises)
+
+    # init training collection
+    stage = create_stage(exercises=exercises, duration=60)
+    mongo["training"].insert_many(
+        [
+            create_training(stages=[stage], date_time=date)
+            for date in (date_1, date_2, date_3, date_4)
+        ]
+        + [
+            create_training(
+                stages=[], date_time=date_3, category="15U", place="Chateau Giron"
+            )
+        ]
+    )
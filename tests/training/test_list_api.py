@@ -1,6 +1,9 @@
 from datetime import datetime, timedelta, timezone
+import json
 import urllib
 
+import backend.training.series
+from backend.apihelpers import encode_cursor
 from tests.fill_date_base import create_exercise, create_training, create_stage
 
 
@@ -44,14 +47,15 @@ def test_get_list_all(client, mongo):
     ).replace(microsecond=0, tzinfo=None)
 
 
-def test_get_list(client, mongo):
+def test_get_list(client, mongo, query_budget):
     fill_cololections(mongo)
 
     url_params = urllib.parse.urlencode(
         {"category": "18U", "start": date_2.isoformat(), "end": date_6.isoformat()}
     )
 
-    response = client.get("/api/v1/trainings?" + url_params)
+    with query_budget(commands=3):
+        response = client.get("/api/v1/trainings?" + url_params)
 
     assert response.status_code == 200
     trainings = response.get_json()
@@ -74,6 +78,127 @@ def test_get_list(client, mongo):
     ).replace(microsecond=0, tzinfo=None)
 
 
+def test_get_list_paging_cursor(client, mongo):
+    fill_cololections(mongo)
+
+    url_params = urllib.parse.urlencode(
+        {
+            "category": "18U",
+            "start": date_1.isoformat(),
+            "end": date_8.isoformat(),
+            "page_size": 3,
+        }
+    )
+
+    response = client.get("/api/v1/trainings?" + url_params)
+
+    assert response.status_code == 200
+    assert json.loads(response.headers["X-Pagination"])["total"] == 7
+    trainings = response.get_json()
+    assert len(trainings) == 3
+
+    while "X-Next-Cursor" in response.headers:
+        response = client.get(
+            "/api/v1/trainings?"
+            + url_params
+            + "&after="
+            + response.headers["X-Next-Cursor"]
+        )
+        assert response.status_code == 200
+        trainings += response.get_json()
+
+    dates = [date_1, date_2, date_3, date_4, date_5, date_6, date_7]
+    assert len(trainings) == len(dates)
+    for date, training in zip(dates, trainings):
+        assert date.replace(microsecond=0, tzinfo=None) == datetime.fromisoformat(
+            training["date_time"]
+        ).replace(microsecond=0, tzinfo=None)
+
+    # the cursor values are checked before they are queried
+    for values in [[{"$ne": None}, "507f1f77bcf86cd799439011"], [date_1, 3]]:
+        response = client.get(
+            "/api/v1/trainings?" + url_params + "&after=" + encode_cursor(values)
+        )
+        assert response.status_code == 422
+
+
+def test_get_list_etag(client, mongo):
+    fill_cololections(mongo)
+
+    response = client.get("/api/v1/trainings")
+    assert response.status_code == 200
+
+    response = client.get(
+        "/api/v1/trainings", headers={"If-None-Match": response.headers["ETag"]}
+    )
+    assert response.status_code == 304
+
+
+def test_get_list_max_page_size(client, mongo):
+    response = client.get("/api/v1/trainings?page_size=1000")
+
+    assert response.status_code == 422
+
+
+def test_get_list_expand_exercises(client, mongo):
+    fill_cololections(mongo)
+
+    response = client.get("/api/v1/trainings?expand=exercises")
+    assert response.status_code == 200
+    trainings = response.get_json()
+    assert len(trainings) == 5
+    assert trainings[0]["stages"][0]["exercises"] == [
+        {
+            "id": "507f1f77bcf86cd799439015",
+            "name": "backhand rolling",
+            "section": "infield",
+            "dificulty": 3,
+            "duration": 30,
+        },
+        {
+            "id": "507f1f77bcf86cd799439016",
+            "name": "backhand rolling",
+            "section": "outfield",
+            "dificulty": 3,
+            "duration": 30,
+        },
+    ]
+
+    # stages are only listed when expanded
+    response = client.get("/api/v1/trainings")
+    assert "stages" not in response.get_json()[0]
+
+
+def test_get_list_projection(client, mongo, monkeypatch):
+    fill_cololections(mongo)
+    fetched = []
+    fetch = backend.training.series.fetch
+
+    def fetch_spy(queryset):
+        # the raw documents returned by the same query, with its projection
+        fetched.extend(queryset.clone().as_pymongo())
+        return fetch(queryset)
+
+    monkeypatch.setattr(backend.training.series, "fetch", fetch_spy)
+
+    response = client.get("/api/v1/trainings")
+    assert response.status_code == 200
+    assert len(fetched) == 5
+    # the stages and the other unlisted fields are not fetched
+    listed_fields = {"_id", "category", "date_time", "place", "version"}
+    for document in fetched:
+        assert "date_time" in document
+        assert set(document) <= listed_fields
+
+    fetched.clear()
+    response = client.get("/api/v1/trainings?expand=exercises")
+    assert response.status_code == 200
+    assert len(fetched) == 5
+    for document in fetched:
+        assert "stages" in document
+        assert set(document) <= listed_fields | {"stages"}
+
+
 def fill_cololections(mongo):
 
     # init the exercises collection
@@ -10,16 +10,50 @@ date_3 = datetime.now(timezone.utc) + timedelta(days=1)
 date_4 = datetime.now(timezone.utc) + timedelta(days=2)
 
 
-def test_get_next_training(client, mongo):
+def test_get_next_training(client, mongo, query_budget):
     fill_cololections(mongo)
+    with query_budget(commands=2):
+        response = client.get("/api/v1/trainings/next?category=18U")
+    assert response.status_code == 200
+    training = response.get_json()
+    assert date_3.replace(microsecond=0, tzinfo=None) == datetime.fromisoformat(
+        training["date_time"]
+    ).replace(microsecond=0, tzinfo=None)
+
+
+def test_get_next_training_category(client, mongo):
+    fill_cololections(mongo)
+    mongo["training"].insert_one(
+        create_training(
+            stages=[],
+            date_time=date_3 - timedelta(hours=1),
+            category="15U",
+            place="Chateau Giron",
+        )
+    )
+
+    response = client.get("/api/v1/trainings/next?category=15U")
+    assert response.status_code == 200
+    training = response.get_json()
+    assert training["category"] == "15U"
+    assert training["place"] == "Chateau Giron"
+
     response = client.get("/api/v1/trainings/next?category=18U")
     assert response.status_code == 200
     training = response.get_json()
+    assert training["category"] == "18U"
     assert date_3.replace(microsecond=0, tzinfo=None) == datetime.fromisoformat(
         training["date_time"]
     ).replace(microsecond=0, tzinfo=None)
 
 
+def test_get_next_training_none(client, mongo):
+    fill_cololections(mongo)
+    response = client.get("/api/v1/trainings/next?category=12U")
+    assert response.status_code == 200
+    assert response.get_json() == {}
+
+
 def fill_cololections(mongo):
 
     # init the exercises collection
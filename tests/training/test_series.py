@@ -0,0 +1,58 @@
+import random
+from datetime import datetime, timedelta
+
+from backend.training.series import (
+    DAILY,
+    WEEKLY,
+    compute_bounds,
+    count_series_occurrences,
+    iter_series_occurrences,
+)
+
+
+def random_series(rng):
+    first = datetime(2020, 1, 1, 18) + timedelta(days=rng.randrange(30))
+    recurrence = {
+        "freq": rng.choice([DAILY, WEEKLY]),
+        "interval": rng.choice([1, 2, 3, 7, 14]),
+        "by_weekday": rng.sample(range(7), rng.randrange(4)),
+    }
+    if rng.random() < 0.5:
+        recurrence["count"] = rng.randrange(1, 50)
+    elif rng.random() < 0.5:
+        recurrence["until"] = first + timedelta(days=rng.randrange(200))
+    series = {
+        "id": "5ecbe9b1b2a4d5a8fd2e5e11",
+        "category": "18U",
+        "date_time": first,
+        "place": "Hawks Stadium",
+        "nb_stages": 0,
+        "stages": [],
+        "tags": [],
+        "version": 0,
+        "recurrence": recurrence,
+        "exceptions": [first + timedelta(days=rng.randrange(60)) for _ in range(3)],
+        "overrides": [
+            {
+                "original_date_time": first + timedelta(days=rng.randrange(60)),
+                "date_time": rng.choice(
+                    [None, first + timedelta(days=rng.randrange(-5, 60), hours=1)]
+                ),
+            }
+            for _ in range(3)
+        ],
+    }
+    series["last_occurrence"] = compute_bounds(series)[0]
+    return series
+
+
+def test_count_series_occurrences():
+    rng = random.Random(0)
+    for _ in range(500):
+        series = random_series(rng)
+        start = datetime(2020, 1, 1) + timedelta(days=rng.randrange(60), hours=18)
+        end = start + timedelta(days=rng.randrange(1, 120), hours=rng.randrange(24))
+
+        assert count_series_occurrences(series, start, end) == sum(
+            1 for _ in iter_series_occurrences(series, start, end)
+        ), series
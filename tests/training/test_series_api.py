@@ -0,0 +1,208 @@
+from datetime import datetime, timedelta, timezone
+import json
+import urllib
+
+from tests.fill_date_base import create_exercise, create_training, create_stage
+
+
+# first occurrence of the series, tomorrow at 18:00 UTC
+first = (datetime.now(timezone.utc) + timedelta(days=1)).replace(
+    hour=18, minute=0, second=0, microsecond=0
+)
+
+
+def series_json(**kwargs):
+    series = {
+        "category": "18U",
+        "date_time": first.isoformat(),
+        "place": "Hawks Stadium",
+        "nb_stages": 1,
+        "tags": ["infield"],
+        "stages": [
+            {
+                "nb_exercises": 2,
+                "exercises": [
+                    {"id": "507f1f77bcf86cd799439011"},
+                    {"id": "507f1f77bcf86cd799439012"},
+                ],
+            }
+        ],
+        "recurrence": {"freq": "DAILY", "count": 10},
+    }
+    series.update(kwargs)
+    return series
+
+
+def list_dates(client, **params):
+    params.setdefault("start", (first - timedelta(hours=1)).isoformat())
+    params.setdefault("end", (first + timedelta(days=5)).isoformat())
+    response = client.get("/api/v1/trainings?" + urllib.parse.urlencode(params))
+    assert response.status_code == 200
+    return [
+        datetime.fromisoformat(training["date_time"]).replace(tzinfo=timezone.utc)
+        for training in response.get_json()
+    ]
+
+
+def test_list_series_occurrences(client, mongo):
+    fill_cololections(mongo)
+    response = client.put("/api/v1/trainings/series", json=series_json())
+    assert response.status_code == 200
+    assert mongo["training_series"].count_documents({}) == 1
+
+    # only the occurrences of the window are listed, merged with the trainings
+    assert list_dates(client) == [
+        first,
+        first + timedelta(hours=1),
+        first + timedelta(days=1),
+        first + timedelta(days=2),
+        first + timedelta(days=3),
+        first + timedelta(days=4),
+    ]
+
+    # other category
+    assert list_dates(client, category="15U") == []
+
+
+def test_list_series_exceptions_and_overrides(client, mongo):
+    fill_cololections(mongo)
+    response = client.put(
+        "/api/v1/trainings/series",
+        json=series_json(
+            recurrence={"freq": "WEEKLY", "by_weekday": [0, 2, 4, 6]},
+            exceptions=[first.isoformat()],
+            overrides=[
+                {
+                    "original_date_time": (first + timedelta(days=7)).isoformat(),
+                    "date_time": (first + timedelta(days=1, hours=2)).isoformat(),
+                    "place": "Chateau Giron",
+                }
+            ],
+        ),
+    )
+    assert response.status_code == 200
+    series = response.get_json()
+    assert series["version"] == 0
+
+    dates = list_dates(client, end=(first + timedelta(days=8)).isoformat())
+    assert first not in dates
+    assert first + timedelta(days=7) not in dates
+    assert first + timedelta(days=1, hours=2) in dates
+    assert first + timedelta(hours=1) in dates
+    assert dates == sorted(dates)
+    assert all(date.weekday() in [0, 2, 4, 6] for date in dates[2:])
+
+    # exceptions must be occurrences
+    response = client.post(
+        "/api/v1/trainings/series/" + series["id"],
+        json=series_json(exceptions=[(first + timedelta(hours=1)).isoformat()]),
+    )
+    assert response.status_code == 422
+    assert response.get_json()["errors"]["not_occurrences"] == [
+        (first + timedelta(hours=1)).replace(tzinfo=None).isoformat()
+    ]
+
+    response = client.post(
+        "/api/v1/trainings/series/" + series["id"], json=series_json()
+    )
+    assert response.status_code == 200
+    assert response.get_json()["version"] == 1
+    assert len(list_dates(client)) == 6
+
+    response = client.delete("/api/v1/trainings/series/" + series["id"])
+    assert response.status_code == 200
+    assert list_dates(client) == [first + timedelta(hours=1)]
+
+
+def test_list_series_paging_cursor(client, mongo):
+    fill_cololections(mongo)
+    client.put("/api/v1/trainings/series", json=series_json())
+    dates = list_dates(client)
+
+    url_params = {
+        "start": (first - timedelta(hours=1)).isoformat(),
+        "end": (first + timedelta(days=5)).isoformat(),
+        "page_size": 4,
+    }
+    response = client.get("/api/v1/trainings?" + urllib.parse.urlencode(url_params))
+    assert response.status_code == 200
+    assert json.loads(response.headers["X-Pagination"])["total"] == 6
+    paged = response.get_json()
+
+    url_params["after"] = response.headers["X-Next-Cursor"]
+    response = client.get("/api/v1/trainings?" + urllib.parse.urlencode(url_params))
+    assert response.status_code == 200
+    assert "X-Next-Cursor" not in response.headers
+    paged += response.get_json()
+
+    assert [
+        datetime.fromisoformat(training["date_time"]).replace(tzinfo=timezone.utc)
+        for training in paged
+    ] == dates
+
+    # page selection gives the same pages
+    del url_params["after"]
+    url_params["page"] = 2
+    response = client.get("/api/v1/trainings?" + urllib.parse.urlencode(url_params))
+    assert response.get_json() == paged[4:]
+
+    url_params.update(page=11, page_size=100)
+    response = client.get("/api/v1/trainings?" + urllib.parse.urlencode(url_params))
+    assert response.status_code == 200
+    assert response.get_json() == []
+
+
+def test_list_series_far_page(client, mongo):
+    fill_cololections(mongo)
+    recurrence = {"freq": "DAILY", "count": 1200}
+    response = client.put(
+        "/api/v1/trainings/series",
+        json=series_json(category="12U", recurrence=recurrence),
+    )
+    assert response.status_code == 200
+
+    # the pages after the first thousand items are merged too
+    dates = list_dates(
+        client,
+        category="12U",
+        end=(first + timedelta(days=1300)).isoformat(),
+        page=12,
+        page_size=100,
+    )
+    assert dates == [first + timedelta(days=day) for day in range(1100, 1200)]
+
+
+def test_next_training_series(client, mongo):
+    fill_cololections(mongo)
+    client.put(
+        "/api/v1/trainings/series", json=series_json(category="12U", exceptions=[])
+    )
+
+    response = client.get("/api/v1/trainings/next?category=12U")
+    assert response.status_code == 200
+    training = response.get_json()
+    assert datetime.fromisoformat(training["date_time"]) == first.replace(tzinfo=None)
+
+    # a training before the first occurrence comes first
+    response = client.get("/api/v1/trainings/next?category=18U")
+    assert response.status_code == 200
+    training = response.get_json()
+    assert datetime.fromisoformat(training["date_time"]) == (
+        first + timedelta(hours=1)
+    ).replace(tzinfo=None)
+
+
+def fill_cololections(mongo):
+
+    # init the exercises collection
+    exercises = [
+        create_exercise("507f1f77bcf86cd799439011", section="infield"),
+        create_exercise("507f1f77bcf86cd799439012", section="outfield"),
+    ]
+    mongo["exercise"].insert_many(exercises)
+
+    # init training collection
+    stage = create_stage(exercises=exercises, duration=60)
+    mongo["training"].insert_one(
+        create_training(stages=[stage], date_time=first + timedelta(hours=1))
+    )
@@ -0,0 +1,142 @@
+from datetime import datetime
+import urllib
+
+import backend.training.api_stats
+from tests.fill_date_base import create_exercise, create_training, create_stage
+
+
+def stats(client, **params):
+    params.setdefault("start", "2020-03-30")
+    params.setdefault("end", "2020-04-12")
+    response = client.get("/api/v1/trainings/stats?" + urllib.parse.urlencode(params))
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_get_stats(client, mongo):
+    fill_cololections(mongo)
+
+    assert stats(client) == [
+        {
+            "week": "2020-W14",
+            "category": "15U",
+            "nb_trainings": 1,
+            "minutes": 30,
+            "minutes_per_section": {"infield": 30},
+            "minutes_per_dificulty": {"3": 30},
+        },
+        {
+            "week": "2020-W14",
+            "category": "18U",
+            "nb_trainings": 2,
+            "minutes": 90,
+            "minutes_per_section": {"infield": 60, "outfield": 30, "pitching": 30},
+            "minutes_per_dificulty": {"3": 120},
+        },
+        {
+            "week": "2020-W15",
+            "category": "18U",
+            "nb_trainings": 1,
+            "minutes": 0,
+            "minutes_per_section": {},
+            "minutes_per_dificulty": {},
+        },
+    ]
+
+    assert [week["category"] for week in stats(client, category="15U")] == ["15U"]
+
+
+def test_get_stats_series(client, mongo):
+    fill_cololections(mongo)
+    response = client.put(
+        "/api/v1/trainings/series",
+        json={
+            "category": "12U",
+            "date_time": "2020-04-01T18:00:00",
+            "place": "Hawks Stadium",
+            "nb_stages": 1,
+            "stages": [
+                {"nb_exercises": 1, "exercises": [{"id": "507f1f77bcf86cd799439013"}]}
+            ],
+            "recurrence": {"freq": "WEEKLY", "count": 5},
+        },
+    )
+    assert response.status_code == 200
+
+    assert [
+        (week["week"], week["nb_trainings"], week["minutes_per_section"])
+        for week in stats(client, category="12U")
+    ] == [("2020-W14", 1, {"pitching": 30}), ("2020-W15", 1, {"pitching": 30})]
+
+
+def test_get_stats_invalid_exercise_id(client, mongo):
+    fill_cololections(mongo)
+    training = create_training(
+        stages=[
+            create_stage(
+                exercises=[create_exercise("507f1f77bcf86cd799439011")], duration=15
+            )
+        ],
+        date_time=datetime(2020, 4, 10, 18),
+        category="15U",
+    )
+    training["stages"][0]["exercises"].append("not an id")
+    mongo["training"].insert_one(training)
+
+    week = stats(client, category="15U")[1]
+    assert (week["week"], week["nb_trainings"], week["minutes"]) == ("2020-W15", 1, 15)
+    # the invalid exercise id matches no exercise
+    assert week["minutes_per_section"] == {"infield": 30}
+
+
+def test_get_stats_max_groups(client, mongo, monkeypatch):
+    fill_cololections(mongo)
+    # 3 (week, category) groups, 4 (week, category, section, dificulty) groups
+    monkeypatch.setattr(backend.training.api_stats, "TRAINING_STATS_MAX_GROUPS", 4)
+    assert len(stats(client)) == 3
+
+    # rejected, not truncated
+    monkeypatch.setattr(backend.training.api_stats, "TRAINING_STATS_MAX_GROUPS", 3)
+    response = client.get("/api/v1/trainings/stats?start=2020-03-30&end=2020-04-12")
+    assert response.status_code == 422
+
+
+def test_get_stats_max_period(client, mongo):
+    response = client.get("/api/v1/trainings/stats?start=2019-01-01&end=2020-04-01")
+    assert response.status_code == 422
+
+
+def fill_cololections(mongo):
+
+    # init the exercises collection
+    exercises = [
+        create_exercise("507f1f77bcf86cd799439011", section="infield"),
+        create_exercise("507f1f77bcf86cd799439012", section="outfield"),
+        create_exercise("507f1f77bcf86cd799439013", section="pitching"),
+    ]
+    mongo["exercise"].insert_many(exercises)
+
+    # init training collection
+    mongo["training"].insert_many(
+        [
+            create_training(
+                stages=[
+                    create_stage(exercises=exercises[:2], duration=30),
+                    create_stage(exercises=exercises[2:], duration=30),
+                ],
+                date_time=datetime(2020, 3, 30, 18),
+            ),
+            create_training(
+                stages=[create_stage(exercises=exercises[:1], duration=30)],
+                date_time=datetime(2020, 4, 5, 18),
+            ),
+            create_training(
+                stages=[create_stage(exercises=exercises[:1], duration=30)],
+                date_time=datetime(2020, 4, 2, 10),
+                category="15U",
+            ),
+            create_training(stages=[], date_time=datetime(2020, 4, 6, 18)),
+            # out of the period
+            create_training(stages=[], date_time=datetime(2020, 4, 13, 18)),
+        ]
+    )